@@ -2,10 +2,14 @@
 Admin configuration for accounts app.
 """
 
+import ipaddress
+
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db import transaction
 from django.utils.translation import gettext_lazy as _
 
+from config.admin import FastAdminMixin
 from .models import User, UserActivity
 
 
@@ -54,24 +58,48 @@ class UserAdmin(BaseUserAdmin):
     )
     
     readonly_fields = ('created_at', 'updated_at', 'last_login', 'date_joined')
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if 'avatar' in form.changed_data:
+            from apps.portfolios.derivatives import delete_derivatives, source_key
+            from .tasks import generate_avatar_derivatives
+            
+            previous = form.initial.get('avatar')
+            if previous:
+                # The old avatar's derivatives would otherwise stay in storage
+                key = source_key(previous)
+                transaction.on_commit(lambda: delete_derivatives(key))
+            if obj.avatar:
+                transaction.on_commit(lambda: generate_avatar_derivatives.delay(obj.id))
 
 
 @admin.register(UserActivity)
-class UserActivityAdmin(admin.ModelAdmin):
+class UserActivityAdmin(FastAdminMixin, admin.ModelAdmin):
     """Admin configuration for UserActivity model."""
     
     list_display = (
         'user', 'action', 'target_model', 'target_id', 
         'ip_address', 'created_at'
     )
-    list_filter = ('action', 'target_model', 'created_at')
-    search_fields = ('user__username', 'description', 'ip_address')
+    list_filter = ('action', 'target_model')
+    list_select_related = ('user',)
+    # Trigram-indexed on PostgreSQL; IP addresses are matched exactly below
+    search_fields = ('user__username', 'description')
     ordering = ('-created_at',)
+    date_hierarchy = 'created_at'
     readonly_fields = (
         'user', 'action', 'target_model', 'target_id', 
         'description', 'ip_address', 'user_agent', 'created_at'
     )
     
+    def get_search_results(self, request, queryset, search_term):
+        try:
+            ip = ipaddress.ip_address(search_term.strip())
+        except ValueError:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(ip_address=str(ip)), False
+    
     def has_add_permission(self, request):
         return False
     
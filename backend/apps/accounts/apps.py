@@ -13,3 +13,4 @@ class AccountsConfig(AppConfig):
     def ready(self):
         # Import rules to register them
         from . import rules  # noqa
+        from . import signals  # noqa
@@ -0,0 +1,18 @@
+"""
+Authentication backends for accounts app.
+"""
+
+from django.contrib.auth.backends import ModelBackend
+
+from .cache import get_cached_user
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that resolves the session user from the Redis snapshot
+    instead of querying the user table on every request.
+    """
+    
+    def get_user(self, user_id):
+        user = get_cached_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
@@ -0,0 +1,71 @@
+"""
+Cached user loading for authentication backends.
+
+``request.user`` is resolved on every request. Instead of fetching the
+whole user row from Postgres each time, a slim snapshot (no OAuth token
+columns) is kept in Redis under the user's id and rebuilt into a model
+instance with ``Model.from_db()``. Token fields stay deferred, so they are
+only loaded if something actually reads them, and ``save()`` on a snapshot
+never overwrites them.
+
+Snapshots are invalidated from the User post_save/post_delete signals and
+by ``User.objects.filter(...).update()`` (see ``UserQuerySet``); code that
+writes users without either, like ``bulk_create()``, calls
+``invalidate_cached_users()`` itself.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+# Large, sensitive or Celery-maintained columns that are never part of the snapshot
+DEFERRED_USER_FIELDS = ('hemis_access_token', 'hemis_refresh_token', 'hemis_token_expires_at')
+
+# Bump to drop every cached snapshot at once
+CACHE_VERSION = 1
+
+
+def user_cache_key(user_id):
+    return f'auth:user:v{CACHE_VERSION}:{user_id}'
+
+
+def snapshot_field_names():
+    User = get_user_model()
+    return [
+        f.attname for f in User._meta.concrete_fields
+        if f.name not in DEFERRED_USER_FIELDS
+    ]
+
+
+def get_cached_user(user_id):
+    """
+    Return the user with ``user_id`` (token fields deferred), or None.
+
+    Steady-state cost is one Redis GET and no database query.
+    """
+    User = get_user_model()
+    key = user_cache_key(user_id)
+    field_names = snapshot_field_names()
+
+    snapshot = cache.get(key)
+    # A snapshot written before a schema change is treated as a miss
+    if snapshot is None or snapshot.keys() != set(field_names):
+        snapshot = (
+            User._default_manager.filter(pk=user_id)
+            .values(*field_names)
+            .first()
+        )
+        if snapshot is None:
+            return None
+        cache.set(key, snapshot, getattr(settings, 'USER_CACHE_TIMEOUT', 300))
+
+    return User.from_db(DEFAULT_DB_ALIAS, field_names, [snapshot[name] for name in field_names])
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def invalidate_cached_users(user_ids):
+    cache.delete_many([user_cache_key(user_id) for user_id in user_ids])
@@ -0,0 +1,99 @@
+"""
+Management command to time the large admin changelists.
+
+Adds ``--activities`` activity rows spread over several years (rolled
+back afterwards) and requests the activity log, score history and
+assignment changelists, including date-hierarchy drilldowns and
+searches. Fails if any page takes longer than ``--max-ms``. Count
+estimates only apply on PostgreSQL; elsewhere the numbers show exact
+counting.
+"""
+
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.accounts.models import UserActivity
+
+User = get_user_model()
+
+PAGES = [
+    '/admin/accounts/useractivity/',
+    '/admin/accounts/useractivity/?created_at__year={year}',
+    '/admin/accounts/useractivity/?created_at__year={year}&created_at__month=3',
+    '/admin/accounts/useractivity/?q=10.0.1.7',
+    '/admin/accounts/useractivity/?q=benchmark',
+    '/admin/assignments/scorehistory/',
+    '/admin/assignments/assignment/',
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the activity log, score history and assignment admin changelists'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--activities', type=int, default=100000, help='Activity rows to add')
+        parser.add_argument('--max-ms', type=float, default=1000.0, help='Fail above this page time')
+
+    def handle(self, *args, **options):
+        overrides = {
+            'ALLOWED_HOSTS': ['testserver'],
+            'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            'STORAGES': {
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            },
+        }
+        slow = []
+        with override_settings(**overrides), transaction.atomic():
+            try:
+                admin = self._populate(options['activities'])
+                client = Client()
+                client.force_login(admin)
+                client.get('/admin/')  # warm the session and user caches
+
+                year = (timezone.now() - timedelta(days=365)).year
+                for page in PAGES:
+                    url = page.format(year=year)
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.perf_counter()
+                        response = client.get(url)
+                        elapsed = (time.perf_counter() - start) * 1000
+                    if response.status_code != 200:
+                        raise CommandError(f'{url} returned {response.status_code}')
+                    self.stdout.write(f'{elapsed:8.1f} ms {len(queries):3} queries  {url}')
+                    if elapsed > options['max_ms']:
+                        slow.append(url)
+            finally:
+                transaction.set_rollback(True)
+
+        if slow:
+            raise CommandError(f'Slower than {options["max_ms"]} ms: {", ".join(slow)}')
+        self.stdout.write(self.style.SUCCESS('OK: admin changelists within budget'))
+
+    def _populate(self, count):
+        admin = User.objects.create_superuser(
+            username='__admin_benchmark__', email='admin-benchmark@example.com', password=None, role='superadmin'
+        )
+        now = timezone.now()
+        created = UserActivity.objects.bulk_create([
+            UserActivity(
+                user=admin, action=UserActivity.ACTION_UPDATE, target_model='Assignment',
+                description=f'benchmark activity {i}', ip_address=f'10.0.{i % 4}.{i % 250}',
+            )
+            for i in range(count)
+        ], batch_size=5000)
+        # created_at is auto_now_add: spread the rows over ~4 years, one block per month
+        pks = sorted(activity.pk for activity in created)
+        step = max(1, len(pks) // 48)
+        for month, start in enumerate(range(0, len(pks), step)):
+            UserActivity.objects.filter(
+                pk__gte=pks[start], pk__lte=pks[min(start + step, len(pks)) - 1]
+            ).update(created_at=now - timedelta(days=30 * month))
+        return admin
@@ -0,0 +1,74 @@
+"""
+Management command to measure the cost of the instrumentation middleware.
+
+Replays authenticated GETs against an endpoint with and without
+``InstrumentationMiddleware`` in MIDDLEWARE, alternating rounds so
+drift affects both modes alike, and fails if the instrumented median
+per-request time is more than ``--max-overhead`` percent higher.
+"""
+
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+User = get_user_model()
+
+MIDDLEWARE_PATH = 'config.instrumentation.InstrumentationMiddleware'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark request overhead of the instrumentation middleware'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='GET requests per round')
+        parser.add_argument('--rounds', type=int, default=5, help='Rounds per mode')
+        parser.add_argument('--path', default='/api/accounts/me/', help='Endpoint to request')
+        parser.add_argument('--max-overhead', type=float, default=10.0, help='Fail above this percentage')
+
+    def handle(self, *args, **options):
+        with_middleware = [MIDDLEWARE_PATH] + [m for m in settings.MIDDLEWARE if m != MIDDLEWARE_PATH]
+        without_middleware = with_middleware[1:]
+        overrides = {
+            'ALLOWED_HOSTS': ['testserver'],
+            'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            # Measure recording, not the slow request log
+            'INSTRUMENTATION_SLOW_REQUEST_MS': 10 ** 6,
+        }
+
+        user = User.objects.create_user(
+            username='__instrumentation_benchmark__', email='instrumentation-benchmark@example.com',
+            role='teacher',
+        )
+        timings = {'off': [], 'on': []}
+        try:
+            with override_settings(**overrides):
+                for _ in range(options['rounds']):
+                    for mode, middleware in (('off', without_middleware), ('on', with_middleware)):
+                        with override_settings(MIDDLEWARE=middleware):
+                            timings[mode].append(self._run(user, options['path'], options['requests']))
+        finally:
+            user.delete()
+
+        off, on = statistics.median(timings['off']), statistics.median(timings['on'])
+        overhead = (on - off) / off * 100
+        self.stdout.write(f'without middleware: {off * 1000:7.3f} ms/request')
+        self.stdout.write(f'with middleware:    {on * 1000:7.3f} ms/request ({overhead:+.1f}%)')
+        if overhead > options['max_overhead']:
+            raise CommandError(f'Instrumentation overhead {overhead:.1f}% above {options["max_overhead"]}%')
+        self.stdout.write(self.style.SUCCESS('OK: instrumentation overhead within budget'))
+
+    def _run(self, user, path, count):
+        client = Client()
+        client.force_login(user)
+        client.get(path)  # warm up
+
+        start = time.perf_counter()
+        for _ in range(count):
+            response = client.get(path)
+            if response.status_code != 200:
+                raise CommandError(f'{path} returned {response.status_code}')
+        return (time.perf_counter() - start) / count
@@ -0,0 +1,129 @@
+"""
+Management command to compare JSON encoders on real endpoint payloads.
+
+Requests each endpoint once as a temporary superadmin, captures the data
+handed to ``config.fastjson.dumps`` (JsonResponse and the DRF renderer
+both go through it) and times encoding that data with the stdlib and with
+orjson. A synthetic assignment list is always included so the numbers are
+meaningful on an empty database.
+"""
+
+import datetime
+import decimal
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from config import fastjson
+
+User = get_user_model()
+
+DEFAULT_PATHS = [
+    '/api/assignments/list/?page_size=100',
+    '/api/assignments/score-history/?page_size=100',
+    '/api/analytics/reports/?page_size=100',
+    '/api/portfolios/?page_size=100',
+    '/api/assignments/v2/categories/',
+]
+
+
+def synthetic_assignments(rows):
+    """An assignment-list-shaped payload with datetimes and Decimals."""
+    now = timezone.now()
+    return {
+        'assignments': [{
+            'id': i,
+            'title': f'Topshiriq {i}',
+            'description': 'Ilmiy maqola tayyorlash ' * 4,
+            'teacher': {'id': i % 50, 'username': f'teacher{i % 50}', 'full_name': f'Teacher {i % 50}'},
+            'category': {'id': i % 8, 'name': f'Kategoriya {i % 8}', 'color': '#3B82F6'},
+            'required_quantity': 5,
+            'completed_quantity': i % 6,
+            'progress_percentage': (i % 6) * 20,
+            'score': decimal.Decimal('12.50'),
+            'deadline': now + datetime.timedelta(days=i % 30),
+            'status': 'active',
+            'is_overdue': False,
+            'created_at': now,
+        } for i in range(rows)],
+        'pagination': {'page': 1, 'page_size': rows, 'total_pages': 1, 'total_count': rows},
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark stdlib json vs orjson encoding of the largest API payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='Endpoints to capture (defaults to the large list views)')
+        parser.add_argument('--iterations', type=int, default=200, help='Encodes per payload and backend')
+        parser.add_argument('--rows', type=int, default=1000, help='Rows in the synthetic assignment list')
+        parser.add_argument(
+            '--locmem',
+            action='store_true',
+            help='Use an in-process cache instead of Redis (no server needed)',
+        )
+
+    def handle(self, *args, **options):
+        if fastjson.orjson is None:
+            self.stderr.write('orjson is not installed; only the stdlib backend is available')
+            return
+
+        overrides = {'ALLOWED_HOSTS': ['testserver']}
+        if options['locmem']:
+            overrides['CACHES'] = {
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+            }
+
+        payloads = [(f'synthetic list ({options["rows"]} rows)', synthetic_assignments(options['rows']))]
+        with override_settings(**overrides):
+            payloads += self._capture(options['paths'] or DEFAULT_PATHS)
+
+        self.stdout.write(f'{"payload":<48} {"bytes":>9} {"stdlib ms":>10} {"orjson ms":>10} {"speedup":>8}')
+        for label, data in payloads:
+            stdlib = self._time(data, 'stdlib', options['iterations'])
+            fast = self._time(data, 'orjson', options['iterations'])
+            with override_settings(JSON_BACKEND='orjson'):
+                size = len(fastjson.dumps(data))
+            self.stdout.write(
+                f'{label[:48]:<48} {size:>9} {stdlib * 1000:>10.3f} {fast * 1000:>10.3f} {stdlib / fast:>7.1f}x'
+            )
+
+    def _capture(self, paths):
+        """Request each path and return (path, data passed to dumps) pairs."""
+        user = User.objects.create_user(
+            username='__json_benchmark__', email='json-benchmark@example.com', role=User.ROLE_SUPERADMIN
+        )
+        captured = []
+        original_dumps = fastjson.dumps
+        try:
+            client = Client()
+            client.force_login(user)
+            for path in paths:
+                seen = []
+
+                def capturing_dumps(data):
+                    seen.append(data)
+                    return original_dumps(data)
+
+                with mock.patch.object(fastjson, 'dumps', capturing_dumps):
+                    response = client.get(path)
+                if response.status_code != 200 or not seen:
+                    self.stderr.write(f'{path}: skipped (status {response.status_code})')
+                    continue
+                captured.append((path, seen[-1]))
+        finally:
+            user.delete()
+        return captured
+
+    def _time(self, data, backend, iterations):
+        """Mean seconds per encode of ``data`` with ``backend``."""
+        with override_settings(JSON_BACKEND=backend):
+            fastjson.dumps(data)
+            start = time.perf_counter()
+            for _ in range(iterations):
+                fastjson.dumps(data)
+            return (time.perf_counter() - start) / iterations
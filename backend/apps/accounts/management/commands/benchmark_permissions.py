@@ -0,0 +1,73 @@
+"""
+Management command to measure authorization overhead on a list page.
+
+Runs entirely in memory (no database access): compares calling
+rules.has_perm() per object against the memoized and batched helpers.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+import rules
+
+from apps.accounts.middleware import RoleBasedAccessMiddleware
+from apps.accounts.permissions import check_perm, portfolio_permissions
+from apps.portfolios.models import Portfolio
+
+User = get_user_model()
+
+PERMISSIONS = [
+    'portfolios.change_portfolio',
+    'portfolios.delete_portfolio',
+    'portfolios.approve_portfolio',
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-object vs batched portfolio permission checks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--objects', type=int, default=100, help='Portfolios per page')
+        parser.add_argument('--iterations', type=int, default=200, help='Pages to evaluate')
+
+    def handle(self, *args, **options):
+        count = options['objects']
+        iterations = options['iterations']
+
+        for role in ('teacher', 'admin', 'superadmin'):
+            user = User(id=1, username=f'bench_{role}', role=role)
+            portfolios = [Portfolio(id=i, teacher_id=1 + (i % 3)) for i in range(count)]
+
+            naive = self._time(iterations, lambda: [
+                rules.has_perm(perm, user, p) for p in portfolios for perm in PERMISSIONS
+            ])
+
+            # Repeat checks within one request hit the per-user cache
+            cached = self._time(iterations, lambda: [
+                check_perm(user, perm, p) for p in portfolios for perm in PERMISSIONS
+            ])
+
+            batched = self._time(iterations, lambda: portfolio_permissions(user, portfolios, PERMISSIONS))
+
+            # Sanity check: all strategies agree
+            expected = {p.pk: {perm: rules.has_perm(perm, user, p) for perm in PERMISSIONS} for p in portfolios}
+            assert portfolio_permissions(user, portfolios, PERMISSIONS) == expected
+
+            self.stdout.write(
+                f'{role:<10} per page of {count}: rules {naive:8.1f} us | '
+                f'memoized (repeat) {cached:8.1f} us | batched {batched:8.1f} us'
+            )
+
+        middleware = RoleBasedAccessMiddleware(lambda request: None)
+        paths = ['/api/portfolios/', '/auth/login/', '/media/derivatives/x.jpg', '/api/analytics/dashboard/']
+        public = self._time(iterations * 100, lambda: [middleware._is_public_url(p) for p in paths])
+        self.stdout.write(f'public URL match: {public / len(paths):.2f} us per path')
+
+    def _time(self, iterations, func):
+        """Average wall time per call in microseconds."""
+        func()  # warm up
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        return (time.perf_counter() - start) / iterations * 1e6
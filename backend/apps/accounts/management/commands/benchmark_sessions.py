@@ -0,0 +1,77 @@
+"""
+Management command to compare session write modes on authenticated GETs.
+
+Logs a temporary user in with the test client, replays GET requests
+against an API endpoint and reports throughput and session store writes
+with SESSION_SAVE_EVERY_REQUEST on (old behaviour) and with lazy refresh.
+"""
+
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.utils.module_loading import import_string
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark authenticated GET throughput with eager vs lazy session saves'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='GET requests per mode')
+        parser.add_argument('--path', default='/api/accounts/me/', help='Endpoint to request')
+        parser.add_argument(
+            '--locmem',
+            action='store_true',
+            help='Use an in-process cache instead of Redis (no server needed)',
+        )
+
+    def handle(self, *args, **options):
+        overrides = {'ALLOWED_HOSTS': ['testserver']}
+        if options['locmem']:
+            overrides['CACHES'] = {
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+            }
+
+        user = User.objects.create_user(
+            username='__session_benchmark__', email='session-benchmark@example.com', role='teacher'
+        )
+        try:
+            with override_settings(**overrides):
+                for label, save_every in (('eager (every request)', True), ('lazy refresh', False)):
+                    with override_settings(SESSION_SAVE_EVERY_REQUEST=save_every):
+                        rate, writes = self._run(user, options['path'], options['requests'])
+                    self.stdout.write(
+                        f'{label:<22} {rate:8.1f} req/s, {writes} session writes '
+                        f'for {options["requests"]} requests'
+                    )
+        finally:
+            user.delete()
+
+    def _run(self, user, path, count):
+        client = Client()
+        client.force_login(user)
+        client.get(path)  # warm up
+
+        store = import_string(f'{settings.SESSION_ENGINE}.SessionStore')
+        original_save = store.save
+        writes = 0
+
+        def counting_save(session, *args, **kwargs):
+            nonlocal writes
+            writes += 1
+            return original_save(session, *args, **kwargs)
+
+        with mock.patch.object(store, 'save', counting_save):
+            start = time.perf_counter()
+            for _ in range(count):
+                response = client.get(path)
+                if response.status_code != 200:
+                    raise RuntimeError(f'{path} returned {response.status_code}')
+            elapsed = time.perf_counter() - start
+
+        return count / elapsed, writes
@@ -1,12 +1,16 @@
 """
-Role-based access control middleware.
+Role-based access control and session refresh middleware.
 """
 
-from django.http import JsonResponse
+import re
+import time
+from django.conf import settings
 from django.shortcuts import redirect
 from django.urls import reverse
 import logging
 
+from config.fastjson import JsonResponse
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,6 +27,7 @@ class RoleBasedAccessMiddleware:
         '/accounts/signup/',
         '/static/',
         '/media/',
+        '/metrics',  # guarded by its own IP/token check
     ]
     
     # URLs restricted by role
@@ -38,6 +43,10 @@ class RoleBasedAccessMiddleware:
     
     def __init__(self, get_response):
         self.get_response = get_response
+        # One anchored alternation instead of a startswith() loop per request
+        self.public_url_re = re.compile(
+            '|'.join(re.escape(url) for url in self.PUBLIC_URLS)
+        )
     
     def __call__(self, request):
         # Check if URL is public
@@ -62,7 +71,42 @@ class RoleBasedAccessMiddleware:
     
     def _is_public_url(self, path):
         """Check if the URL is public."""
-        for public_url in self.PUBLIC_URLS:
-            if path.startswith(public_url):
-                return True
-        return False
+        return self.public_url_re.match(path) is not None
+
+
+class SessionRefreshMiddleware:
+    """
+    Sliding session expiry without rewriting the session on every request.
+    
+    With SESSION_SAVE_EVERY_REQUEST off, SessionMiddleware only saves
+    modified sessions. This middleware marks an existing session as
+    modified once every SESSION_REFRESH_INTERVAL seconds, which saves it
+    and pushes back its expiry (and the cookie's). A session then expires
+    after at most SESSION_COOKIE_AGE of inactivity, give or take one interval.
+    
+    Must be placed after SessionMiddleware.
+    """
+    
+    REFRESHED_AT_KEY = '_refreshed_at'
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.interval = getattr(settings, 'SESSION_REFRESH_INTERVAL', 15 * 60)
+    
+    def __call__(self, request):
+        response = self.get_response(request)
+        
+        session = getattr(request, 'session', None)
+        if session is None or session.modified:
+            return response
+        
+        now = int(time.time())
+        refreshed_at = session.get(self.REFRESHED_AT_KEY)
+        # Never create a session just to refresh it (checked after loading,
+        # since an expired cookie leaves the session without a key)
+        if session.session_key is None:
+            return response
+        if refreshed_at is None or now - refreshed_at >= self.interval:
+            session[self.REFRESHED_AT_KEY] = now
+        
+        return response
@@ -4,11 +4,32 @@ Supports role-based access control with Hemis OAuth 2.0 integration.
 """
 
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 
 
-class UserManager(BaseUserManager):
+class UserQuerySet(models.QuerySet):
+    """User queryset that keeps the cached request.user snapshots fresh."""
+    
+    def update(self, **kwargs):
+        """
+        UPDATE that also drops the snapshots of the updated users, so e.g.
+        ``.update(is_active=False)`` locks them out on the next request.
+        """
+        from .cache import DEFERRED_USER_FIELDS, invalidate_cached_users
+        
+        if set(kwargs) <= set(DEFERRED_USER_FIELDS):
+            return super().update(**kwargs)
+        
+        user_ids = list(self.values_list('pk', flat=True))
+        rows = super().update(**kwargs)
+        invalidate_cached_users(user_ids)
+        # Also after commit, so a concurrent request cannot re-cache the old row
+        transaction.on_commit(lambda: invalidate_cached_users(user_ids))
+        return rows
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
     """Custom user manager for User model."""
     
     def create_user(self, username, email=None, password=None, **extra_fields):
@@ -244,6 +265,7 @@ class UserActivity(models.Model):
         indexes = [
             models.Index(fields=['user', 'action']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['ip_address']),
         ]
     
     def __str__(self):
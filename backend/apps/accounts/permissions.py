@@ -3,12 +3,68 @@ Permission decorators and mixins for role-based access control.
 """
 
 from functools import wraps
-from django.http import JsonResponse
 from django.shortcuts import redirect
 from django.contrib.auth.mixins import AccessMixin
 from django.core.exceptions import PermissionDenied
 import rules
 
+from config.fastjson import JsonResponse
+
+
+def check_perm(user, permission, obj=None):
+    """
+    rules.has_perm() memoized for the lifetime of the user instance.
+    
+    request.user is loaded fresh for every request, so the cache is
+    effectively per-request: repeated checks in a view (and the
+    permission flags in its response) evaluate each rule only once.
+    """
+    cache = getattr(user, '_perm_cache', None)
+    if cache is None:
+        cache = user._perm_cache = {}
+    key = (permission, None) if obj is None else (permission, type(obj), obj.pk)
+    try:
+        return cache[key]
+    except KeyError:
+        result = cache[key] = rules.has_perm(permission, user, obj)
+        return result
+
+
+def portfolio_permissions(user, portfolios, permissions=None):
+    """
+    Batched object-level permissions for a page of portfolios.
+    
+    Resolves every (portfolio, permission) pair from the compiled role
+    table instead of calling rules once per object.
+    
+    Returns:
+        dict: {portfolio_id: {permission: bool}}
+    """
+    from .rules import PORTFOLIO_OBJECT_PERMISSIONS
+    
+    permissions = permissions or list(PORTFOLIO_OBJECT_PERMISSIONS)
+    if not user.is_authenticated:
+        return {p.pk: dict.fromkeys(permissions, False) for p in portfolios}
+    
+    # Role-granted permissions are identical for every object
+    granted = {}
+    owner_only = []
+    for perm in permissions:
+        roles, owner_allowed = PORTFOLIO_OBJECT_PERMISSIONS[perm]
+        if user.role in roles:
+            granted[perm] = True
+        elif owner_allowed:
+            owner_only.append(perm)
+        else:
+            granted[perm] = False
+    
+    owned = dict(granted, **dict.fromkeys(owner_only, True))
+    not_owned = dict(granted, **dict.fromkeys(owner_only, False))
+    return {
+        p.pk: dict(owned if p.teacher_id == user.id else not_owned)
+        for p in portfolios
+    }
+
 
 def role_required(*required_roles):
     """
@@ -74,7 +130,7 @@ def permission_required(permission):
                     'code': 'UNAUTHORIZED'
                 }, status=401)
             
-            if not rules.has_perm(permission, request.user):
+            if not check_perm(request.user, permission):
                 return JsonResponse({
                     'error': 'Permission denied',
                     'code': 'FORBIDDEN',
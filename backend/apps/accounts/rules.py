@@ -37,46 +37,53 @@ def is_portfolio_owner(user, portfolio):
     return user.is_authenticated and portfolio.teacher_id == user.id
 
 
-@rules.predicate
-def can_view_portfolio(user, portfolio):
-    """Check if user can view the portfolio."""
-    if not user.is_authenticated:
-        return False
-    if user.role == 'superadmin':
-        return True
-    if user.role == 'admin':
+# Object-level portfolio permissions, compiled into a lookup table:
+# perm -> (roles allowed on every portfolio, whether the owner is allowed).
+# The predicates below and the batched checks in permissions.py both read
+# this table, so list views can resolve a whole page without calling rules.
+PORTFOLIO_OBJECT_PERMISSIONS = {
+    'portfolios.view_portfolio': (frozenset({'superadmin', 'admin'}), True),
+    'portfolios.change_portfolio': (frozenset({'superadmin'}), True),
+    'portfolios.delete_portfolio': (frozenset({'superadmin'}), True),
+    'portfolios.approve_portfolio': (frozenset({'superadmin', 'admin'}), False),
+}
+
+
+def portfolio_permission_granted(perm, user, teacher_id):
+    """Resolve a portfolio permission from the role table and ownership."""
+    roles, owner_allowed = PORTFOLIO_OBJECT_PERMISSIONS[perm]
+    if user.role in roles:
         return True
-    return portfolio.teacher_id == user.id
-
-
-@rules.predicate
-def can_edit_portfolio(user, portfolio):
-    """Check if user can edit the portfolio."""
-    if not user.is_authenticated:
-        return False
-    if user.role == 'superadmin':
-        return True
-    # Only owner can edit their own portfolio
-    return portfolio.teacher_id == user.id
-
-
-@rules.predicate
-def can_delete_portfolio(user, portfolio):
-    """Check if user can delete the portfolio."""
-    if not user.is_authenticated:
-        return False
-    if user.role == 'superadmin':
-        return True
-    # Only owner can delete their own portfolio
-    return portfolio.teacher_id == user.id
-
-
-@rules.predicate
-def can_approve_portfolio(user, portfolio):
-    """Check if user can approve/reject the portfolio."""
-    if not user.is_authenticated:
-        return False
-    return user.role in ['superadmin', 'admin']
+    return owner_allowed and teacher_id == user.id
+
+
+def _portfolio_predicate(perm, name, doc):
+    def predicate(user, portfolio):
+        if not user.is_authenticated:
+            return False
+        teacher_id = portfolio.teacher_id if portfolio is not None else None
+        return portfolio_permission_granted(perm, user, teacher_id)
+    predicate.__name__ = name
+    predicate.__doc__ = doc
+    return rules.predicate(predicate)
+
+
+can_view_portfolio = _portfolio_predicate(
+    'portfolios.view_portfolio', 'can_view_portfolio',
+    "Check if user can view the portfolio."
+)
+can_edit_portfolio = _portfolio_predicate(
+    'portfolios.change_portfolio', 'can_edit_portfolio',
+    "Check if user can edit the portfolio (superadmin or owner)."
+)
+can_delete_portfolio = _portfolio_predicate(
+    'portfolios.delete_portfolio', 'can_delete_portfolio',
+    "Check if user can delete the portfolio (superadmin or owner)."
+)
+can_approve_portfolio = _portfolio_predicate(
+    'portfolios.approve_portfolio', 'can_approve_portfolio',
+    "Check if user can approve/reject the portfolio."
+)
 
 
 # Permission rules for User model
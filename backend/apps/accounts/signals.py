@@ -0,0 +1,18 @@
+"""
+Signal handlers for accounts app.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import invalidate_cached_user
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def invalidate_user_snapshot(sender, instance, **kwargs):
+    """Drop the cached auth snapshot whenever a user row changes."""
+    invalidate_cached_user(instance.pk)
+    # Also after commit, so a concurrent request cannot re-cache the old row
+    transaction.on_commit(lambda: invalidate_cached_user(instance.pk))
@@ -0,0 +1,34 @@
+"""
+Celery tasks for accounts app.
+"""
+
+from celery import shared_task
+from django.contrib.auth import get_user_model
+import logging
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+@shared_task(bind=True, max_retries=2, ignore_result=True)
+def generate_avatar_derivatives(self, user_id):
+    """
+    Render thumbnail/preview derivatives for a user's avatar.
+    
+    Args:
+        user_id: ID of the user
+    """
+    from apps.portfolios.derivatives import ensure_all_derivatives, source_key
+    
+    user = User.objects.filter(id=user_id).only('id', 'avatar').first()
+    if user is None or not user.avatar:
+        return []
+    
+    try:
+        generated = ensure_all_derivatives(user.avatar, source_key(user.avatar))
+    except Exception as exc:
+        logger.error(f"Failed to render avatar derivatives for user {user_id}: {exc}")
+        raise self.retry(exc=exc, countdown=30)
+    
+    return list(generated)
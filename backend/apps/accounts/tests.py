@@ -0,0 +1,101 @@
+"""
+Tests for the accounts app.
+"""
+
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from apps.portfolios.derivatives import derivative_name, ensure_all_derivatives, source_key
+
+from .tasks import generate_avatar_derivatives
+
+User = get_user_model()
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def png(color=(30, 30, 200)):
+    from PIL import Image
+
+    output = io.BytesIO()
+    Image.new('RGB', (300, 300), color).save(output, format='PNG')
+    return ContentFile(output.getvalue())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AvatarTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='teacher', email='teacher@example.com', role=User.ROLE_TEACHER)
+        self.user.avatar.save('avatar.png', png())
+
+    def test_avatar_is_sent_after_login_and_revalidated(self):
+        url = reverse('accounts:user_avatar', args=[self.user.pk, 'thumb'])
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        self.client.force_login(self.user)
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_changing_the_avatar_deletes_the_old_derivatives(self):
+        old = User.objects.get(pk=self.user.pk).avatar  # what the admin form holds as initial
+        old_key = source_key(old)
+        ensure_all_derivatives(old, old_key)
+        self.user.avatar.save('avatar.png', png((0, 200, 0)), save=False)
+        form = mock.Mock(changed_data=['avatar'], initial={'avatar': old})
+
+        with mock.patch.object(generate_avatar_derivatives, 'delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            admin.site._registry[User].save_model(RequestFactory().post('/'), self.user, form, True)
+
+        self.assertFalse(default_storage.exists(derivative_name(old_key, 'thumb')))
+        delay.assert_called_once_with(self.user.pk)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CachedUserBackendTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='teacher', email='teacher@example.com', role=User.ROLE_TEACHER)
+
+    def test_sessions_from_the_plain_model_backend_stay_logged_in(self):
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+
+        self.assertEqual(self.client.get(reverse('accounts:current_user')).status_code, 200)
+
+    def test_queryset_deactivation_logs_the_user_out(self):
+        self.client.force_login(self.user, backend='apps.accounts.backends.CachedModelBackend')
+        self.assertEqual(self.client.get(reverse('accounts:current_user')).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        self.assertEqual(self.client.get(reverse('accounts:current_user')).status_code, 401)
@@ -15,4 +15,5 @@ urlpatterns = [
     path('users/', views.UserListView.as_view(), name='user_list'),
     path('users/stats/', views.UserStatsView.as_view(), name='user_stats'),
     path('users/<int:user_id>/', views.UserDetailView.as_view(), name='user_detail'),
+    path('users/<int:user_id>/avatar/<str:size>/', views.UserAvatarView.as_view(), name='user_avatar'),
 ]
@@ -4,19 +4,34 @@ Views for accounts app.
 
 import json
 from django.db import models
-from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
 from django.views import View
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_protect
 from django.contrib.auth import get_user_model
 
+from config.downloads import protected_file_response
+from config.fastjson import JsonResponse
 from .permissions import superadmin_required, admin_required, role_required
 from .models import UserActivity
 
 User = get_user_model()
 
 
+def avatar_urls(user):
+    """Avatar thumbnail/preview endpoint URLs (None if the user has no avatar)."""
+    from apps.portfolios.derivatives import get_sizes
+    
+    return {
+        f'avatar_{size}_url': reverse('accounts:user_avatar', kwargs={
+            'user_id': user.id, 'size': size,
+        }) if user.avatar else None
+        for size in get_sizes()
+    }
+
+
 class UserListView(View):
     """
     List all users (Super Admin only).
@@ -234,6 +249,7 @@ class CurrentUserView(View):
             'position': user.position,
             'bio': user.bio,
             'phone_number': user.phone_number,
+            **avatar_urls(user),
             'permissions': {
                 'can_manage_users': user.can_manage_users,
                 'can_approve_portfolios': user.can_approve_portfolios,
@@ -307,3 +323,34 @@ class UserStatsView(View):
             'active': active_count,
             'inactive': total - active_count
         })
+
+
+class UserAvatarView(View):
+    """
+    Send a resized avatar, through protected_file_response().
+    GET /api/accounts/users/<id>/avatar/<size>/
+    """
+    
+    def get(self, request, user_id, size):
+        from apps.portfolios.derivatives import derivative_file, ensure_derivative, get_sizes, source_key
+        
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Not authenticated'}, status=401)
+        
+        if size not in get_sizes():
+            return JsonResponse({'error': f"Invalid size. Valid: {', '.join(get_sizes())}"}, status=400)
+        
+        user = User.objects.filter(id=user_id).only('id', 'avatar').first()
+        if user is None or not user.avatar:
+            return JsonResponse({'error': 'Avatar not found'}, status=404)
+        
+        name = ensure_derivative(user.avatar, size, source_key(user.avatar))
+        if name is None:
+            return JsonResponse({'error': 'Avatar could not be rendered'}, status=404)
+        
+        response = protected_file_response(
+            request, derivative_file(user.avatar, name), filename=f'{size}.jpg', as_attachment=False
+        )
+        # Same URL for every avatar the user uploads: revalidate each time
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
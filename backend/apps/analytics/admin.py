@@ -4,7 +4,7 @@ Admin configuration for analytics app.
 
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Report, DashboardWidget, AnalyticsCache
+from .models import Report, ReportPayload, DashboardWidget, AnalyticsCache
 
 
 @admin.register(Report)
@@ -16,7 +16,7 @@ class ReportAdmin(admin.ModelAdmin):
     list_filter = ['report_type', 'format', 'status', 'created_at']
     search_fields = ['title', 'created_by__username', 'created_by__first_name']
     readonly_fields = [
-        'data', 'file_size', 'created_at', 'completed_at', 
+        'payload_size', 'file_size', 'created_at', 'completed_at', 
         'processing_time', 'error_message'
     ]
     date_hierarchy = 'created_at'
@@ -31,7 +31,7 @@ class ReportAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
         ('Natija', {
-            'fields': ('data', 'file', 'file_size'),
+            'fields': ('payload_size', 'file', 'file_size'),
             'classes': ('collapse',)
         }),
         ('Meta', {
@@ -63,6 +63,13 @@ class ReportAdmin(admin.ModelAdmin):
         return '-'
     file_link.short_description = 'Fayl'
     
+    def payload_size(self, obj):
+        payload = ReportPayload.objects.filter(report_id=obj.pk).only('codec', 'raw_size').first()
+        if payload:
+            return f"{payload.raw_size} B ({payload.codec})"
+        return '-'
+    payload_size.short_description = 'Ma\'lumotlar hajmi'
+    
     def processing_time(self, obj):
         if obj.processing_time:
             return f"{obj.processing_time:.2f} sekund"
@@ -9,3 +9,7 @@ class AnalyticsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.analytics'
     verbose_name = 'Analytics & Reports'
+    
+    def ready(self):
+        """Import signals when app is ready."""
+        import apps.analytics.signals  # noqa
@@ -0,0 +1,134 @@
+"""
+Management command to measure report payload storage size and latency.
+
+Generates a yearly-report-shaped payload, compresses it with every
+available codec, then stores ``--reports`` copies (rolled back afterwards)
+and times the report list, the streamed detail endpoint and, for
+comparison, loading every listed payload eagerly as the list used to.
+"""
+
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+
+from config import fastjson
+from apps.analytics import payloads
+from apps.analytics.models import Report, ReportStatus
+
+User = get_user_model()
+
+
+def yearly_payload(teachers):
+    """Daily per-teacher activity for a year plus the usual summaries."""
+    start = date(date.today().year - 1, 1, 1)
+    return {
+        'overview': {'portfolios': teachers * 12, 'assignments': teachers * 30, 'teachers': teachers},
+        'portfolios': {
+            'by_status': [{'status': s, 'count': random.randint(0, 500)} for s in ('pending', 'approved', 'rejected')],
+            'by_teacher': [{
+                'teacher_id': t,
+                'teacher_name': f'Teacher {t}',
+                'department': f'Kafedra {t % 40}',
+                'daily': [{
+                    'date': (start + timedelta(days=d)).isoformat(),
+                    'submitted': random.randint(0, 3),
+                    'approved': random.randint(0, 2),
+                } for d in range(365)],
+            } for t in range(teachers)],
+        },
+        'assignments': {
+            'by_month': [{
+                'month': (start + timedelta(days=31 * m)).isoformat(),
+                'total': random.randint(100, 900),
+                'completed': random.randint(50, 500),
+                'overdue': random.randint(0, 100),
+            } for m in range(12)],
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark compressed report payload size and list/detail latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teachers', type=int, default=100, help='Teachers in the yearly payload')
+        parser.add_argument('--reports', type=int, default=20, help='Reports to store (one list page)')
+        parser.add_argument('--repeat', type=int, default=5, help='Requests per measured endpoint')
+
+    def handle(self, *args, **options):
+        data = yearly_payload(options['teachers'])
+        raw = fastjson.dumps(data)
+        self.stdout.write(f'yearly payload: {len(raw) / 1024 / 1024:.2f} MB of JSON')
+
+        codecs = [payloads.CODEC_ZLIB] + ([payloads.CODEC_ZSTD] if payloads.zstandard else [])
+        for codec in codecs:
+            start = time.perf_counter()
+            _, blob, _ = payloads.compress(data, codec)
+            compressed = time.perf_counter()
+            payloads.decompress(codec, blob)
+            done = time.perf_counter()
+            self.stdout.write(
+                f'{codec:<5} {len(blob) / 1024:9.1f} KB ({len(raw) / len(blob):5.1f}x), '
+                f'compress {(compressed - start) * 1000:7.1f} ms, load {(done - compressed) * 1000:7.1f} ms'
+            )
+
+        overrides = {
+            'ALLOWED_HOSTS': ['testserver'],
+            'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        }
+        with override_settings(**overrides), transaction.atomic():
+            try:
+                self._measure_endpoints(data, options)
+            finally:
+                transaction.set_rollback(True)
+
+    def _measure_endpoints(self, data, options):
+        user = User.objects.create_user(
+            username='__report_benchmark__', email='report-benchmark@example.com', role='superadmin'
+        )
+        reports = []
+        for i in range(options['reports']):
+            report = Report(
+                title=f'Yillik hisobot {i}', report_type='yearly_report',
+                status=ReportStatus.COMPLETED, created_by=user,
+            )
+            report.data = data
+            report.save()
+            reports.append(report)
+
+        client = Client()
+        client.force_login(user)
+        client.get('/api/accounts/me/')  # warm the session and user caches
+
+        list_ms = self._time(lambda: client.get(f'/api/analytics/reports/?per_page={options["reports"]}'), options)
+        eager_ms = self._time(
+            lambda: [r.data for r in Report.objects.filter(pk__in=[r.pk for r in reports])], options
+        )
+
+        def first_chunk():
+            return next(iter(client.get(f'/api/analytics/reports/{reports[0].pk}/').streaming_content))
+
+        def full_body():
+            return b''.join(client.get(f'/api/analytics/reports/{reports[0].pk}/').streaming_content)
+
+        first_ms = self._time(first_chunk, options)
+        full_ms = self._time(full_body, options)
+
+        self.stdout.write(f'list of {options["reports"]:<3} projected        {list_ms:8.1f} ms')
+        self.stdout.write(f'list of {options["reports"]:<3} eager payloads   {eager_ms:8.1f} ms (previous behaviour)')
+        self.stdout.write(f'detail first chunk            {first_ms:8.1f} ms')
+        self.stdout.write(f'detail full stream            {full_ms:8.1f} ms')
+
+    def _time(self, func, options):
+        """Median milliseconds of ``func`` over ``--repeat`` runs."""
+        timings = []
+        for _ in range(options['repeat']):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings)[len(timings) // 2]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:48
+
+import json
+import zlib
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def move_data_to_payloads(apps, schema_editor):
+    """Compress existing Report.data into ReportPayload rows (zlib)."""
+    Report = apps.get_model('analytics', 'Report')
+    ReportPayload = apps.get_model('analytics', 'ReportPayload')
+    for report_id, data in Report.objects.exclude(data={}).values_list('id', 'data').iterator():
+        raw = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+        ReportPayload.objects.create(
+            report_id=report_id, codec='zlib', blob=zlib.compress(raw, 6), raw_size=len(raw),
+        )
+
+
+def move_payloads_to_data(apps, schema_editor):
+    Report = apps.get_model('analytics', 'Report')
+    ReportPayload = apps.get_model('analytics', 'ReportPayload')
+    for payload in ReportPayload.objects.iterator():
+        if payload.codec == 'zstd':
+            import zstandard
+            raw = zstandard.ZstdDecompressor().decompress(bytes(payload.blob), max_output_size=payload.raw_size)
+        else:
+            raw = zlib.decompress(bytes(payload.blob))
+        Report.objects.filter(id=payload.report_id).update(data=json.loads(raw))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportPayload',
+            fields=[
+                ('report', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='payload', serialize=False, to='analytics.report', verbose_name='Hisobot')),
+                ('codec', models.CharField(max_length=10, verbose_name='Siqish usuli')),
+                ('blob', models.BinaryField(verbose_name="Ma'lumotlar")),
+                ('raw_size', models.PositiveBigIntegerField(default=0, verbose_name='Asl hajmi')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Yangilangan vaqt')),
+            ],
+            options={
+                'verbose_name': "Hisobot ma'lumotlari",
+                'verbose_name_plural': "Hisobot ma'lumotlari",
+            },
+        ),
+        migrations.RunPython(move_data_to_payloads, move_payloads_to_data),
+        migrations.RemoveField(
+            model_name='report',
+            name='data',
+        ),
+    ]
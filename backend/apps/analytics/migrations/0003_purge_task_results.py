@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:10
+
+from django.db import migrations
+
+# Celery results now go to Redis (or are not stored at all); nothing reads
+# the rows the django-db backend accumulated
+RESULT_MODELS = ['TaskResult', 'GroupResult', 'ChordCounter']
+
+
+def purge_task_results(apps, schema_editor):
+    models = [apps.get_model('django_celery_results', name) for name in RESULT_MODELS]
+    if schema_editor.connection.vendor == 'postgresql':
+        # TRUNCATE returns the space at once, unlike DELETE + autovacuum
+        tables = ', '.join(schema_editor.quote_name(model._meta.db_table) for model in models)
+        schema_editor.execute(f'TRUNCATE TABLE {tables}')
+        return
+    for model in models:
+        model.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_report_payload'),
+        ('django_celery_results', '0014_alter_taskresult_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(purge_task_results, migrations.RunPython.noop),
+    ]
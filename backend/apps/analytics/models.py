@@ -7,6 +7,8 @@ from django.db import models
 from django.conf import settings
 from django.utils import timezone
 
+from . import payloads
+
 
 class ReportType(models.TextChoices):
     PORTFOLIO_SUMMARY = 'portfolio_summary', 'Portfolio Summary'
@@ -59,8 +61,8 @@ class Report(models.Model):
     date_to = models.DateField(null=True, blank=True, verbose_name='Tugash sanasi')
     filters = models.JSONField(default=dict, blank=True, verbose_name='Filterlar')
     
-    # Result
-    data = models.JSONField(default=dict, blank=True, verbose_name='Ma\'lumotlar')
+    # Result (the payload itself is stored compressed in ReportPayload,
+    # see the ``data`` property)
     file = models.FileField(
         upload_to='reports/%Y/%m/', 
         null=True, 
@@ -88,6 +90,27 @@ class Report(models.Model):
     def __str__(self):
         return f"{self.title} ({self.get_report_type_display()})"
     
+    @property
+    def data(self):
+        """Hisobot natijasi (birinchi murojaatda yuklanadi)"""
+        if not hasattr(self, '_data'):
+            payload = None
+            if self.pk is not None:
+                payload = ReportPayload.objects.filter(report_id=self.pk).first()
+            self._data = payload.load() if payload else {}
+        return self._data
+    
+    @data.setter
+    def data(self, value):
+        self._data = value
+        self._data_changed = True
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if getattr(self, '_data_changed', False):
+            ReportPayload.store(self, self._data)
+            self._data_changed = False
+    
     @property
     def processing_time(self):
         """Hisobot yaratish vaqti (sekundlarda)"""
@@ -106,6 +129,50 @@ class Report(models.Model):
             return f"{self.file_size / (1024 * 1024):.1f} MB"
 
 
+class ReportPayload(models.Model):
+    """Compressed report result, kept out of the report row"""
+    report = models.OneToOneField(
+        Report,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='payload',
+        verbose_name='Hisobot'
+    )
+    codec = models.CharField(max_length=10, verbose_name='Siqish usuli')
+    blob = models.BinaryField(verbose_name='Ma\'lumotlar')
+    raw_size = models.PositiveBigIntegerField(default=0, verbose_name='Asl hajmi')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Yangilangan vaqt')
+    
+    class Meta:
+        verbose_name = 'Hisobot ma\'lumotlari'
+        verbose_name_plural = 'Hisobot ma\'lumotlari'
+    
+    def __str__(self):
+        return f"{self.report_id}: {self.raw_size} -> {len(self.blob)} B ({self.codec})"
+    
+    @classmethod
+    def store(cls, report, data):
+        """Compress ``data`` and save it as the report's payload"""
+        codec, blob, raw_size = payloads.compress(data)
+        cls.objects.update_or_create(
+            report=report,
+            defaults={'codec': codec, 'blob': blob, 'raw_size': raw_size},
+        )
+    
+    def load(self):
+        return payloads.decompress(self.codec, self.blob)
+    
+    def iter_json(self):
+        """
+        Payload JSON bytes, decompressed chunk by chunk.
+        
+        Only decompression is streamed: the compressed blob has already
+        been loaded with the row. Its decompressed JSON, often many times
+        larger, is never held in memory whole.
+        """
+        return payloads.iter_decompressed(self.codec, self.blob)
+
+
 class DashboardWidget(models.Model):
     """Dashboard widget configuration"""
     WIDGET_TYPES = [
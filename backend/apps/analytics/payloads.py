@@ -0,0 +1,87 @@
+"""
+Compressed report payloads.
+
+Report results are stored out of row in ``ReportPayload`` as compressed
+JSON. ``settings.REPORT_PAYLOAD_CODEC`` picks the codec for new payloads:
+
+- ``zstd``: zstandard (default, needs the ``zstandard`` package)
+- ``zlib``: zlib from the standard library (fallback)
+
+The codec is stored with each payload, so both stay readable.
+"""
+
+import functools
+import logging
+import zlib
+
+from django.conf import settings
+
+from config import fastjson
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+CODEC_ZSTD = 'zstd'
+CODEC_ZLIB = 'zlib'
+
+CHUNK_SIZE = 64 * 1024
+
+
+def default_codec():
+    codec = getattr(settings, 'REPORT_PAYLOAD_CODEC', CODEC_ZSTD)
+    if codec == CODEC_ZSTD and zstandard is None:
+        _warn_missing_zstandard()
+        return CODEC_ZLIB
+    return codec
+
+
+@functools.cache
+def _warn_missing_zstandard():
+    logger.warning("zstandard o'rnatilmagan, hisobotlar zlib bilan siqiladi. pip install zstandard")
+
+
+def compress(data, codec=None):
+    """
+    Serialize and compress a report payload.
+
+    Returns:
+        (codec, compressed bytes, uncompressed size)
+    """
+    codec = codec or default_codec()
+    raw = fastjson.dumps(data)
+    if codec == CODEC_ZSTD:
+        blob = zstandard.ZstdCompressor(level=6).compress(raw)
+    else:
+        blob = zlib.compress(raw, 6)
+    return codec, blob, len(raw)
+
+
+def iter_decompressed(codec, blob, chunk_size=CHUNK_SIZE):
+    """
+    Yield the payload's JSON bytes chunk by chunk. ``blob`` is the whole
+    compressed payload; only its decompressed form is streamed.
+    """
+    blob = bytes(blob)  # memoryview on PostgreSQL
+    if codec == CODEC_ZSTD:
+        reader = zstandard.ZstdDecompressor().stream_reader(blob)
+        while chunk := reader.read(chunk_size):
+            yield chunk
+        return
+
+    decompressor = zlib.decompressobj()
+    for start in range(0, len(blob), chunk_size):
+        chunk = decompressor.decompress(blob[start:start + chunk_size])
+        if chunk:
+            yield chunk
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+
+def decompress(codec, blob):
+    """Load a payload back into Python objects."""
+    return fastjson.loads(b''.join(iter_decompressed(codec, blob)))
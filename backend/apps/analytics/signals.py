@@ -0,0 +1,15 @@
+"""
+Signal handlers for the analytics app.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from config.conditional import bump_versions
+from .models import DashboardWidget
+
+
+@receiver([post_save, post_delete], sender=DashboardWidget)
+def invalidate_dashboard_widgets_version(sender, instance, **kwargs):
+    """Invalidate ETags of the dashboard widget configuration."""
+    bump_versions('dashboard_widgets')
@@ -8,6 +8,8 @@ from django.utils import timezone
 from django.core.files.base import ContentFile
 import traceback
 
+from config.celery import PRIORITY_SCHEDULED
+
 
 @shared_task
 def generate_report(report_id):
@@ -86,7 +88,7 @@ def generate_report(report_id):
         return f"Report {report_id} failed: {str(e)}"
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def cleanup_old_reports(days=30):
     """
     Clean up old reports and their files.
@@ -110,7 +112,7 @@ def cleanup_old_reports(days=30):
     return f"Deleted {deleted_count} old reports"
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def cleanup_expired_cache():
     """
     Clean up expired cache entries.
@@ -122,7 +124,7 @@ def cleanup_expired_cache():
     return f"Cleaned up {count} expired cache entries"
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def refresh_dashboard_cache():
     """
     Refresh dashboard cache periodically.
@@ -146,7 +148,7 @@ def refresh_dashboard_cache():
     return "Dashboard cache refreshed"
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def generate_monthly_report():
     """
     Generate automatic monthly report.
@@ -177,12 +179,12 @@ def generate_monthly_report():
     )
     
     # Generate report
-    generate_report.delay(report.id)
+    generate_report.apply_async((report.id,), priority=PRIORITY_SCHEDULED)
     
     return f"Monthly report {report.id} created for {last_month.strftime('%Y-%m')}"
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def generate_yearly_report():
     """
     Generate automatic yearly report.
@@ -211,6 +213,6 @@ def generate_yearly_report():
         created_by=superadmin,
     )
     
-    generate_report.delay(report.id)
+    generate_report.apply_async((report.id,), priority=PRIORITY_SCHEDULED)
     
     return f"Yearly report {report.id} created for {last_year}"
@@ -0,0 +1,122 @@
+"""
+Tests for the analytics app.
+"""
+
+import zlib
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from apps.analytics.tasks import refresh_dashboard_cache
+from apps.assignments.tasks import send_assignment_notification
+from config import metrics, task_metrics
+from config.instrumentation import InstrumentationMiddleware
+
+from . import payloads
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class ReportPayloadCodecTests(SimpleTestCase):
+    data = {'overview': {'total': 3, 'title': "Oylik hisobot"}, 'rows': list(range(100))}
+
+    def test_zlib_round_trip(self):
+        codec, blob, raw_size = payloads.compress(self.data, payloads.CODEC_ZLIB)
+        self.assertEqual(codec, 'zlib')
+        # The label matches the container: a plain zlib stream
+        self.assertEqual(len(zlib.decompress(blob)), raw_size)
+        self.assertEqual(payloads.decompress(codec, blob), self.data)
+
+    def test_zstd_round_trip(self):
+        if payloads.zstandard is None:
+            self.skipTest('zstandard is not installed')
+        codec, blob, raw_size = payloads.compress(self.data, payloads.CODEC_ZSTD)
+        self.assertEqual(payloads.decompress(codec, blob), self.data)
+
+    def test_streamed_chunks_join_to_payload(self):
+        codec, blob, raw_size = payloads.compress(self.data, payloads.CODEC_ZLIB)
+        chunks = list(payloads.iter_decompressed(codec, memoryview(blob), chunk_size=16))
+        self.assertEqual(len(b''.join(chunks)), raw_size)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, METRICS_WORKER_SNAPSHOT_TTL=3 * 24 * 60 * 60)
+class TaskMetricsTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.registry = metrics.Registry()
+        patcher = mock.patch.multiple(metrics, registry=self.registry, inc=self.registry.inc,
+                                      observe=self.registry.observe)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def overlaps(self, task):
+        return self.registry.counters.get(('celery_task_overlaps_total', (('task', task.name),)), 0)
+
+    def test_overlaps_are_counted_for_periodic_tasks_only(self):
+        for task in (refresh_dashboard_cache, send_assignment_notification):
+            task_metrics.task_started(task_id=f'{task.name}-1', task=task)
+            task_metrics.task_started(task_id=f'{task.name}-2', task=task)
+
+        self.assertTrue(task_metrics.tracks_overlaps(refresh_dashboard_cache))
+        self.assertEqual(self.overlaps(refresh_dashboard_cache), 1)
+        self.assertFalse(task_metrics.tracks_overlaps(send_assignment_notification))
+        self.assertEqual(self.overlaps(send_assignment_notification), 0)
+
+    def test_opt_in_tracks_overlaps(self):
+        with mock.patch.object(send_assignment_notification, 'track_overlaps', True, create=True):
+            self.assertTrue(task_metrics.tracks_overlaps(send_assignment_notification))
+
+    def test_every_finished_task_is_published_with_the_worker_ttl(self):
+        with mock.patch.object(metrics, 'publish') as publish:
+            for task_id in ('1', '2'):
+                task_metrics.task_started(task_id=task_id, task=send_assignment_notification)
+                task_metrics.task_finished(task_id=task_id, task=send_assignment_notification, state='SUCCESS')
+            task_metrics.task_failed(sender=send_assignment_notification, exception=ValueError())
+
+        self.assertEqual(publish.call_args_list, [mock.call(ttl=3 * 24 * 60 * 60)] * 3)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, METRICS_ALLOWED_IPS=['127.0.0.1'])
+class MetricsEndpointTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.registry = metrics.Registry()
+        patcher = mock.patch.multiple(metrics, registry=self.registry, inc=self.registry.inc,
+                                      observe=self.registry.observe)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def scrape(self):
+        return metrics.metrics_view(RequestFactory().get('/metrics')).content.decode()
+
+    def test_each_process_is_its_own_series(self):
+        self.registry.inc('reports_built_total', (('kind', 'excel'),), 3)
+        metrics.publish()
+        other_registry = metrics.Registry()
+        other_registry.inc('reports_built_total', (('kind', 'excel'),), 2)
+        with mock.patch('os.getpid', return_value=1), mock.patch.object(metrics, 'registry', other_registry):
+            other = metrics._process_key()
+            metrics.publish()
+
+        body = self.scrape()
+        process = metrics._process_key()[len(metrics.PROCESS_KEY_PREFIX):]
+        self.assertIn(f'reports_built_total{{kind="excel",process="{process}"}} 3', body)
+        self.assertIn(f'reports_built_total{{kind="excel",process="{other[len(metrics.PROCESS_KEY_PREFIX):]}"}} 2', body)
+
+        # The other process going away ends its series; this one does not drop
+        cache.delete(other)
+        self.assertIn(f'reports_built_total{{kind="excel",process="{process}"}} 3', self.scrape())
+        self.assertEqual(metrics.collect()[0][('reports_built_total', (('kind', 'excel'),))], 3)
+
+    def test_unknown_methods_share_one_label(self):
+        middleware = InstrumentationMiddleware(lambda request: HttpResponse())
+        for method in ('GET', 'BREW', 'PROPFIND'):
+            response = middleware(RequestFactory().generic(method, '/'))
+
+        methods = sorted(dict(labels)['method'] for _, labels in self.registry.histograms)
+        self.assertEqual(methods, ['GET', 'OTHER'])
+        self.assertNotIn('Server-Timing', response)
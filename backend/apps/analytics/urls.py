@@ -31,4 +31,7 @@ urlpatterns = [
     
     # Cache management
     path('cache/', views.CacheManagementView.as_view(), name='cache_management'),
+    
+    # Background tasks
+    path('tasks/', views.TaskMetricsView.as_view(), name='task_metrics'),
 ]
@@ -5,7 +5,6 @@ Dashboard and reports API endpoints.
 
 import json
 from datetime import datetime
-from django.http import JsonResponse
 from django.views import View
 from django.utils import timezone
 from django.utils.decorators import method_decorator
@@ -14,7 +13,12 @@ from django.views.decorators.csrf import csrf_protect
 from apps.accounts.permissions import admin_required, superadmin_required
 from apps.accounts.views import get_client_ip
 from apps.accounts.models import UserActivity
-from .models import Report, ReportStatus, ReportFormat, DashboardWidget, AnalyticsCache
+from config.celery import PRIORITY_INTERACTIVE
+from config.conditional import condition_on_versions
+from config.fastjson import JsonResponse, StreamingJsonResponse
+from config.downloads import protected_file_response
+from config.task_metrics import task_summary
+from .models import Report, ReportPayload, ReportStatus, ReportFormat, DashboardWidget, AnalyticsCache
 from .services import AnalyticsService
 from .exporters import get_exporter
 
@@ -53,6 +57,8 @@ class DashboardWidgetsView(View):
     Get dashboard widgets configuration for current user
     """
     
+    # Widgets are filtered by role, which is part of every ETag
+    @method_decorator(condition_on_versions(lambda request: ['dashboard_widgets']))
     def get(self, request):
         if not request.user.is_authenticated:
             return JsonResponse({'error': 'Authentication required'}, status=401)
@@ -215,7 +221,11 @@ class ReportListView(View):
         end = start + per_page
         
         total = reports.count()
-        reports = reports[start:end]
+        reports = reports.select_related('created_by').only(
+            'id', 'title', 'report_type', 'format', 'status', 'file', 'file_size',
+            'created_at', 'completed_at',
+            'created_by__id', 'created_by__username', 'created_by__first_name', 'created_by__last_name',
+        )[start:end]
         
         data = [{
             'id': r.id,
@@ -226,8 +236,8 @@ class ReportListView(View):
             'status': r.status,
             'status_display': r.get_status_display(),
             'created_by': r.created_by.get_full_name() or r.created_by.username,
-            'created_at': r.created_at.isoformat(),
-            'completed_at': r.completed_at.isoformat() if r.completed_at else None,
+            'created_at': r.created_at,
+            'completed_at': r.completed_at,
             'file_size': r.file_size_display,
             'has_file': bool(r.file),
         } for r in reports]
@@ -269,9 +279,9 @@ class ReportListView(View):
             created_by=request.user,
         )
         
-        # Generate report async (or sync for now)
+        # Generate report async, ahead of scheduled reports on the reports queue
         from .tasks import generate_report
-        generate_report.delay(report.id)
+        generate_report.apply_async((report.id,), priority=PRIORITY_INTERACTIVE)
         
         # Log activity
         UserActivity.objects.create(
@@ -305,15 +315,15 @@ class ReportDetailView(View):
             return JsonResponse({'error': 'Authentication required'}, status=401)
         
         try:
-            report = Report.objects.get(id=report_id)
+            report = Report.objects.select_related('created_by').get(id=report_id)
         except Report.DoesNotExist:
             return JsonResponse({'error': 'Report not found'}, status=404)
         
         # Check permission
-        if request.user.role not in ['admin', 'superadmin'] and report.created_by != request.user:
+        if request.user.role not in ['admin', 'superadmin'] and report.created_by_id != request.user.id:
             return JsonResponse({'error': 'Permission denied'}, status=403)
         
-        return JsonResponse({
+        body = {
             'id': report.id,
             'title': report.title,
             'report_type': report.report_type,
@@ -324,7 +334,6 @@ class ReportDetailView(View):
             'date_from': report.date_from.isoformat() if report.date_from else None,
             'date_to': report.date_to.isoformat() if report.date_to else None,
             'filters': report.filters,
-            'data': report.data if report.status == 'completed' else None,
             'file_url': report.file.url if report.file else None,
             'file_size': report.file_size_display,
             'created_by': {
@@ -335,7 +344,16 @@ class ReportDetailView(View):
             'completed_at': report.completed_at.isoformat() if report.completed_at else None,
             'processing_time': report.processing_time,
             'error_message': report.error_message if report.status == 'failed' else None,
-        })
+        }
+        
+        if report.status != 'completed':
+            return JsonResponse({**body, 'data': None})
+        
+        # Stream the stored JSON as it is decompressed instead of loading it
+        payload = ReportPayload.objects.filter(report_id=report.pk).first()
+        if payload is None:
+            return JsonResponse({**body, 'data': {}})
+        return StreamingJsonResponse(body, 'data', payload.iter_json())
     
     @method_decorator(csrf_protect)
     def delete(self, request, report_id):
@@ -396,10 +414,9 @@ class ReportDownloadView(View):
         if report.status != 'completed':
             return JsonResponse({'error': 'Report is not ready yet'}, status=400)
         
-        # If file exists, return it
+        # If file exists, hand it to the web server
         if report.file:
-            from django.http import FileResponse
-            return FileResponse(report.file.open('rb'), as_attachment=True)
+            return protected_file_response(request, report.file)
         
         # Otherwise generate on-the-fly
         if not report.data:
@@ -482,3 +499,20 @@ class CacheManagementView(View):
             'message': 'Cache cleared successfully',
             'pattern': key_pattern or 'all',
         })
+
+
+# ==================== BACKGROUND TASKS ====================
+
+class TaskMetricsView(View):
+    """
+    GET /api/analytics/tasks/
+    Celery task runtimes, queue lag, retries, failures and overlapping
+    runs across all workers (SuperAdmin only)
+    """
+    
+    @method_decorator(superadmin_required)
+    def get(self, request):
+        return JsonResponse({
+            'generated_at': timezone.now(),
+            'tasks': task_summary(),
+        })
@@ -2,12 +2,14 @@
 Admin configuration for assignments app.
 """
 
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 
 from .models import Category, Assignment, AssignmentProgress, ScoreHistory
+from config.admin import FastAdminMixin
+from . import bulk
 
 
 @admin.register(Category)
@@ -84,7 +86,7 @@ class AssignmentProgressInline(admin.TabularInline):
 
 
 @admin.register(Assignment)
-class AssignmentAdmin(admin.ModelAdmin):
+class AssignmentAdmin(FastAdminMixin, admin.ModelAdmin):
     """Admin configuration for Assignment model."""
     
     list_display = (
@@ -93,6 +95,7 @@ class AssignmentAdmin(admin.ModelAdmin):
         'status_badge', 'priority_badge'
     )
     list_filter = ('status', 'priority', 'category', 'use_custom_score', 'deadline', 'created_at')
+    list_select_related = ('teacher', 'category')
     search_fields = ('teacher__username', 'teacher__first_name', 'teacher__last_name', 'title')
     ordering = ('-created_at',)
     date_hierarchy = 'deadline'
@@ -207,68 +210,61 @@ class AssignmentAdmin(admin.ModelAdmin):
             obj.assigned_by = request.user
         super().save_model(request, obj, form, change)
     
-    actions = ['mark_completed', 'mark_cancelled', 'extend_deadline_1_month']
+    actions = [
+        'mark_completed', 'mark_cancelled', 'extend_deadline_1_month',
+        'enable_double_score', 'reset_to_default_score',
+    ]
+    
+    # Selections above this run as a Celery job
+    BULK_ASYNC_THRESHOLD = 500
+    
+    def changelist_view(self, request, extra_context=None):
+        for job in bulk.pop_user_jobs(request.user.pk):
+            if job['finished']:
+                self.message_user(
+                    request, f"{job['action']}: {job['done']} assignments processed.", messages.SUCCESS
+                )
+            else:
+                self.message_user(
+                    request, f"{job['action']}: {job['done']}/{job['total']} assignments processed...", messages.INFO
+                )
+        return super().changelist_view(request, extra_context)
+    
+    def _run_bulk_action(self, request, queryset, action, done_message):
+        """Run ``action`` set-based, on a Celery worker for large selections."""
+        ids = list(queryset.values_list('pk', flat=True))
+        if len(ids) > self.BULK_ASYNC_THRESHOLD:
+            bulk.start_job(action, ids, request.user.pk)
+            self.message_user(
+                request,
+                f'{len(ids)} assignments queued for "{action}". Progress is shown on this page.',
+                messages.INFO,
+            )
+            return
+        count = bulk.run(action, ids, user_id=request.user.pk)
+        self.message_user(request, done_message.format(count=count))
     
     @admin.action(description=_('Mark as completed'))
     def mark_completed(self, request, queryset):
-        for assignment in queryset:
-            assignment.mark_completed()
-        self.message_user(request, f'{queryset.count()} assignments marked as completed.')
+        self._run_bulk_action(request, queryset, bulk.MARK_COMPLETED, '{count} assignments marked as completed.')
     
     @admin.action(description=_('Mark as cancelled'))
     def mark_cancelled(self, request, queryset):
-        queryset.update(status=Assignment.STATUS_CANCELLED)
-        self.message_user(request, f'{queryset.count()} assignments cancelled.')
+        self._run_bulk_action(request, queryset, bulk.MARK_CANCELLED, '{count} assignments cancelled.')
     
     @admin.action(description=_('Extend deadline by 1 month'))
     def extend_deadline_1_month(self, request, queryset):
-        from datetime import timedelta
-        for assignment in queryset:
-            assignment.deadline += timedelta(days=30)
-            assignment.check_and_update_status()
-        self.message_user(request, f'{queryset.count()} deadlines extended by 1 month.')
+        self._run_bulk_action(request, queryset, bulk.EXTEND_DEADLINE, '{count} deadlines extended by 1 month.')
     
     @admin.action(description=_('Enable custom score (2x bonus)'))
     def enable_double_score(self, request, queryset):
-        for assignment in queryset:
-            old_value = f"custom={assignment.use_custom_score}, multiplier={assignment.score_multiplier}"
-            assignment.use_custom_score = True
-            assignment.custom_max_score = assignment.category.default_score * 2
-            assignment.score_multiplier = 1.0
-            assignment.score_note = "Admin tomonidan 2x bonus berildi"
-            assignment.save()
-            
-            # Log score change
-            ScoreHistory.objects.create(
-                assignment=assignment,
-                action='custom_score_enabled',
-                old_value=old_value,
-                new_value=f"custom_max={assignment.custom_max_score}",
-                note="Bulk action: 2x bonus",
-                changed_by=request.user
-            )
-        self.message_user(request, f'{queryset.count()} assignments given 2x bonus.')
+        self._run_bulk_action(request, queryset, bulk.ENABLE_DOUBLE_SCORE, '{count} assignments given 2x bonus.')
     
     @admin.action(description=_('Reset to default score'))
     def reset_to_default_score(self, request, queryset):
-        for assignment in queryset:
-            old_value = f"custom={assignment.use_custom_score}, max={assignment.custom_max_score}"
-            assignment.use_custom_score = False
-            assignment.custom_max_score = None
-            assignment.custom_min_score = None
-            assignment.score_multiplier = 1.0
-            assignment.score_note = ""
-            assignment.save()
-            
-            ScoreHistory.objects.create(
-                assignment=assignment,
-                action='custom_score_disabled',
-                old_value=old_value,
-                new_value="default",
-                note="Bulk action: Reset to default",
-                changed_by=request.user
-            )
-        self.message_user(request, f'{queryset.count()} assignments reset to default score.')
+        self._run_bulk_action(
+            request, queryset, bulk.RESET_TO_DEFAULT_SCORE, '{count} assignments reset to default score.'
+        )
 
 
 @admin.register(AssignmentProgress)
@@ -280,6 +276,7 @@ class AssignmentProgressAdmin(admin.ModelAdmin):
         'counted', 'graded_by', 'created_at'
     )
     list_filter = ('counted', 'created_at', 'graded_at')
+    list_select_related = ('assignment__teacher', 'assignment__category', 'portfolio__teacher', 'graded_by')
     search_fields = ('assignment__teacher__username', 'assignment__category__name')
     ordering = ('-created_at',)
     
@@ -320,11 +317,13 @@ class AssignmentProgressAdmin(admin.ModelAdmin):
 
 
 @admin.register(ScoreHistory)
-class ScoreHistoryAdmin(admin.ModelAdmin):
+class ScoreHistoryAdmin(FastAdminMixin, admin.ModelAdmin):
     """Admin configuration for ScoreHistory model."""
     
     list_display = ('assignment', 'action', 'old_value', 'new_value', 'changed_by', 'created_at')
-    list_filter = ('action', 'created_at')
+    list_filter = ('action',)
+    list_select_related = ('assignment__teacher', 'assignment__category', 'changed_by')
     search_fields = ('assignment__teacher__username', 'note')
     ordering = ('-created_at',)
+    date_hierarchy = 'created_at'
     readonly_fields = ('assignment', 'progress', 'action', 'old_value', 'new_value', 'note', 'changed_by', 'created_at')
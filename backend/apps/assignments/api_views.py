@@ -8,9 +8,12 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
+from django.utils.functional import cached_property
 from django.db.models import Count, Avg, Q
 
 from apps.accounts.permissions import IsAdminOrSuperAdmin, IsOwnerOrAdmin
+from config.conditional import condition_on_versions
+from .cache import assignment_scopes, category_scopes
 from .models import Category, Assignment, AssignmentProgress
 from .serializers import (
     CategorySerializer, CategoryListSerializer,
@@ -22,7 +25,24 @@ from .serializers import (
 )
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class VersionedReadMixin:
+    """
+    list/retrieve send version-derived ETags and answer If-None-Match
+    with 304 before querying (see config/conditional.py).
+    """
+    version_scopes = None
+    version_bucket = None
+    
+    def list(self, request, *args, **kwargs):
+        view = condition_on_versions(self.version_scopes, self.version_bucket)(super().list)
+        return view(request, *args, **kwargs)
+    
+    def retrieve(self, request, *args, **kwargs):
+        view = condition_on_versions(self.version_scopes, self.version_bucket)(super().retrieve)
+        return view(request, *args, **kwargs)
+
+
+class CategoryViewSet(VersionedReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for Category CRUD operations.
     
@@ -37,13 +57,14 @@ class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
+    version_scopes = staticmethod(category_scopes)
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'name_uz', 'name_en', 'name_ru', 'description']
     ordering_fields = ['name', 'order', 'created_at']
     ordering = ['order', 'name']
     
     def get_queryset(self):
-        queryset = Category.objects.all()
+        queryset = Category.objects.with_assignment_stats()
         
         # Show only active categories for non-admin users
         if not (self.request.user.is_superadmin or self.request.user.is_admin):
@@ -73,17 +94,18 @@ class CategoryViewSet(viewsets.ModelViewSet):
     def assignments(self, request, pk=None):
         """Get all assignments for a category."""
         category = self.get_object()
-        assignments = Assignment.objects.filter(category=category)
+        now = timezone.now()
+        assignments = Assignment.objects.filter(category=category).for_list(now)
         
         # Filter by teacher's own assignments if not admin
         if not (request.user.is_superadmin or request.user.is_admin):
             assignments = assignments.filter(teacher=request.user)
         
-        serializer = AssignmentListSerializer(assignments, many=True)
+        serializer = AssignmentListSerializer(assignments, many=True, context={'now': now})
         return Response(serializer.data)
 
 
-class AssignmentViewSet(viewsets.ModelViewSet):
+class AssignmentViewSet(VersionedReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for Assignment CRUD operations.
     
@@ -97,6 +119,8 @@ class AssignmentViewSet(viewsets.ModelViewSet):
     
     queryset = Assignment.objects.all()
     permission_classes = [IsAuthenticated]
+    version_scopes = staticmethod(assignment_scopes)
+    version_bucket = 300
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'status', 'priority', 'teacher']
     search_fields = ['title', 'description']
@@ -104,9 +128,12 @@ class AssignmentViewSet(viewsets.ModelViewSet):
     ordering = ['-created_at']
     
     def get_queryset(self):
-        queryset = Assignment.objects.select_related(
-            'category', 'teacher', 'created_by'
-        ).prefetch_related('progress_items')
+        if self.action == 'list':
+            queryset = Assignment.objects.for_list(self.request_now)
+        else:
+            queryset = Assignment.objects.select_related(
+                'category', 'teacher', 'assigned_by'
+            ).prefetch_related('progress_items')
         
         # Teachers can only see their own assignments
         if self.request.user.role == 'teacher':
@@ -143,6 +170,16 @@ class AssignmentViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    @cached_property
+    def request_now(self):
+        """One timestamp for every row of the response."""
+        return timezone.now()
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['now'] = self.request_now
+        return context
+    
     def get_serializer_class(self):
         if self.action == 'list':
             return AssignmentListSerializer
@@ -224,9 +261,11 @@ class AssignmentViewSet(viewsets.ModelViewSet):
         """Get current user's assignments."""
         queryset = Assignment.objects.filter(
             teacher=request.user
-        ).select_related('category', 'created_by')
+        ).for_list(self.request_now)
         
-        serializer = AssignmentListSerializer(queryset, many=True)
+        serializer = AssignmentListSerializer(
+            queryset, many=True, context=self.get_serializer_context()
+        )
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'])
@@ -242,7 +281,7 @@ class AssignmentViewSet(viewsets.ModelViewSet):
             )
         
         # Check if assignment is still open
-        if assignment.status in ['completed', 'cancelled']:
+        if assignment.status in [Assignment.STATUS_COMPLETED, Assignment.STATUS_CANCELLED]:
             return Response(
                 {'error': 'Bu topshiriq yakunlangan'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -251,22 +290,20 @@ class AssignmentViewSet(viewsets.ModelViewSet):
         serializer = AssignmentProgressCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
+        # Saving the item counts it and moves the assignment's status in one
+        # conditional UPDATE (Assignment.apply_completed_delta)
         progress = AssignmentProgress.objects.create(
             assignment=assignment,
             **serializer.validated_data
         )
         
-        # Update assignment status
-        assignment.status = 'in_progress'
-        assignment.save()
-        
         return Response(
             AssignmentProgressSerializer(progress).data,
             status=status.HTTP_201_CREATED
         )
 
 
-class AssignmentProgressViewSet(viewsets.ModelViewSet):
+class AssignmentProgressViewSet(VersionedReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for AssignmentProgress CRUD operations.
     """
@@ -274,6 +311,7 @@ class AssignmentProgressViewSet(viewsets.ModelViewSet):
     queryset = AssignmentProgress.objects.all()
     serializer_class = AssignmentProgressSerializer
     permission_classes = [IsAuthenticated]
+    version_scopes = staticmethod(assignment_scopes)
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['assignment', 'counted']
     ordering_fields = ['created_at', 'raw_score']
@@ -0,0 +1,268 @@
+"""
+Set-based bulk actions on assignments.
+
+The admin actions used to loop over the selection, calling save() or
+check_and_update_status() per row; every row paid the pre_save SELECT,
+the post_save handlers and its own email. Here each action works on
+chunks of ids with UPDATE statements, inserts ScoreHistory with
+bulk_create, invalidates the caches once and sends one email per teacher.
+
+Large selections run as the ``run_assignment_bulk_action`` Celery task.
+Its progress is kept in the cache so the admin can show it.
+"""
+
+import logging
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import send_mass_mail
+from django.db import models, transaction
+from django.utils import timezone
+
+from .cache import bump_assignment_versions
+from .models import Assignment, Category, ScoreHistory
+from .rescoring import schedule_rescore
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+JOB_TIMEOUT = 60 * 60
+
+MARK_COMPLETED = 'mark_completed'
+MARK_CANCELLED = 'mark_cancelled'
+EXTEND_DEADLINE = 'extend_deadline_1_month'
+ENABLE_DOUBLE_SCORE = 'enable_double_score'
+RESET_TO_DEFAULT_SCORE = 'reset_to_default_score'
+
+
+def _mark_completed(ids, user_id, now):
+    queryset = Assignment.objects.filter(pk__in=ids).exclude(status=Assignment.STATUS_COMPLETED)
+    changes = list(queryset.values_list('pk', 'status'))
+    queryset.update(status=Assignment.STATUS_COMPLETED, completed_at=now, updated_at=now)
+    return len(ids), [(pk, old, Assignment.STATUS_COMPLETED) for pk, old in changes]
+
+
+def _mark_cancelled(ids, user_id, now):
+    Assignment.objects.filter(pk__in=ids).update(status=Assignment.STATUS_CANCELLED, updated_at=now)
+    return len(ids), []
+
+
+def _extend_deadline(ids, user_id, now):
+    queryset = Assignment.objects.filter(pk__in=ids)
+    queryset.update(deadline=models.F('deadline') + timedelta(days=30), updated_at=now)
+
+    # check_and_update_status() against the new deadlines
+    reaches_required = models.Q(completed_quantity__gte=models.F('required_quantity'))
+    changed = queryset.exclude(status=Assignment.STATUS_CANCELLED).annotate(
+        new_status=models.Case(
+            models.When(reaches_required, then=models.Value(Assignment.STATUS_COMPLETED)),
+            models.When(status=Assignment.STATUS_COMPLETED, then=models.F('status')),
+            models.When(deadline__lt=now, then=models.Value(Assignment.STATUS_OVERDUE)),
+            models.When(status=Assignment.STATUS_OVERDUE, then=models.Value(Assignment.STATUS_ACTIVE)),
+            default=models.F('status'),
+            output_field=models.CharField(),
+        ),
+    ).exclude(new_status=models.F('status'))
+    changes = list(changed.values_list('pk', 'status', 'new_status'))
+
+    by_status = defaultdict(list)
+    for pk, old, new in changes:
+        by_status[new].append(pk)
+    for status, pks in by_status.items():
+        fields = {'status': status}
+        if status == Assignment.STATUS_COMPLETED:
+            fields['completed_at'] = now
+        Assignment.objects.filter(pk__in=pks).update(**fields)
+    return len(ids), changes
+
+
+def _enable_double_score(ids, user_id, now):
+    queryset = Assignment.objects.filter(pk__in=ids)
+    old_values = list(queryset.values_list('pk', 'use_custom_score', 'score_multiplier'))
+    double_default = Category.objects.filter(pk=models.OuterRef('category_id')).values('default_score')[:1]
+    queryset.update(
+        use_custom_score=True,
+        custom_max_score=models.Subquery(double_default) * 2,
+        score_multiplier=1.0,
+        score_note="Admin tomonidan 2x bonus berildi",
+        updated_at=now,
+    )
+    new_max = dict(queryset.values_list('pk', 'custom_max_score'))
+    ScoreHistory.objects.bulk_create([
+        ScoreHistory(
+            assignment_id=pk,
+            action='custom_score_enabled',
+            old_value=f"custom={custom}, multiplier={multiplier}",
+            new_value=f"custom_max={new_max[pk]}",
+            note="Bulk action: 2x bonus",
+            changed_by_id=user_id,
+        )
+        for pk, custom, multiplier in old_values
+    ])
+    schedule_rescore(assignment_ids=list(ids), changed_by_id=user_id)
+    return len(old_values), []
+
+
+def _reset_to_default_score(ids, user_id, now):
+    queryset = Assignment.objects.filter(pk__in=ids)
+    old_values = list(queryset.values_list('pk', 'use_custom_score', 'custom_max_score'))
+    queryset.update(
+        use_custom_score=False,
+        custom_max_score=None,
+        custom_min_score=None,
+        score_multiplier=1.0,
+        score_note="",
+        updated_at=now,
+    )
+    ScoreHistory.objects.bulk_create([
+        ScoreHistory(
+            assignment_id=pk,
+            action='custom_score_disabled',
+            old_value=f"custom={custom}, max={custom_max}",
+            new_value="default",
+            note="Bulk action: Reset to default",
+            changed_by_id=user_id,
+        )
+        for pk, custom, custom_max in old_values
+    ])
+    schedule_rescore(assignment_ids=list(ids), changed_by_id=user_id)
+    return len(old_values), []
+
+
+ACTIONS = {
+    MARK_COMPLETED: _mark_completed,
+    MARK_CANCELLED: _mark_cancelled,
+    EXTEND_DEADLINE: _extend_deadline,
+    ENABLE_DOUBLE_SCORE: _enable_double_score,
+    RESET_TO_DEFAULT_SCORE: _reset_to_default_score,
+}
+
+
+def run(action, ids, user_id=None, job_id=None):
+    """
+    Apply ``action`` to the assignments ``ids`` chunk by chunk.
+
+    Returns:
+        Number of assignments processed
+    """
+    ids = list(ids)
+    handler = ACTIONS[action]
+    now = timezone.now()
+    done = 0
+    changes = []
+    for start in range(0, len(ids), CHUNK_SIZE):
+        with transaction.atomic():
+            count, chunk_changes = handler(ids[start:start + CHUNK_SIZE], user_id, now)
+        done += count
+        changes += chunk_changes
+        if job_id:
+            _update_job(job_id, done=done)
+
+    if ids:
+        bump_assignment_versions()
+    notify_status_changes(changes)
+    if job_id:
+        _update_job(job_id, done=done, finished=True)
+    return done
+
+
+def notify_status_changes(changes):
+    """
+    Email each teacher once about all of their assignments whose status
+    changed. ``changes`` holds (assignment id, old status, new status).
+    """
+    if not changes:
+        return
+    transitions = {pk: (old, new) for pk, old, new in changes}
+    labels = dict(Assignment.STATUS_CHOICES)
+
+    by_teacher = defaultdict(list)
+    assignments = Assignment.objects.filter(pk__in=transitions).select_related('teacher').only(
+        'title', 'teacher__email', 'teacher__username', 'teacher__first_name', 'teacher__last_name'
+    )
+    for assignment in assignments:
+        if assignment.teacher and assignment.teacher.email:
+            by_teacher[assignment.teacher].append(assignment)
+
+    messages = []
+    for teacher, items in by_teacher.items():
+        lines = '\n'.join(
+            f'- "{a.title}": {labels.get(transitions[a.pk][0], transitions[a.pk][0])} -> '
+            f'{labels.get(transitions[a.pk][1], transitions[a.pk][1])}'
+            for a in items
+        )
+        messages.append((
+            f'Topshiriqlar holati o\'zgardi ({len(items)} ta)',
+            f'''
+Hurmatli {teacher.get_full_name() or teacher.username},
+
+Quyidagi topshiriqlaringiz holati o'zgardi:
+
+{lines}
+
+Tizimga kirib, batafsil ma'lumot olishingiz mumkin.
+
+Hurmat bilan,
+Portfolio Tizimi
+            '''.strip(),
+            settings.DEFAULT_FROM_EMAIL,
+            [teacher.email],
+        ))
+    if not messages:
+        return
+    try:
+        send_mass_mail(messages)
+    except Exception:
+        # The status changes are committed; a mail outage must not undo them
+        logger.exception('Could not send %d assignment status emails', len(messages))
+
+
+# ==================== FONDAGI ISHLAR (JOBS) ====================
+
+def _job_key(job_id):
+    return f'assignments:bulk_job:{job_id}'
+
+
+def _user_jobs_key(user_id):
+    return f'assignments:bulk_jobs:user:{user_id}'
+
+
+def _update_job(job_id, **fields):
+    job = cache.get(_job_key(job_id))
+    if job is not None:
+        job.update(fields)
+        cache.set(_job_key(job_id), job, JOB_TIMEOUT)
+
+
+def start_job(action, ids, user_id):
+    """Queue ``action`` on a Celery worker and track its progress."""
+    from .tasks import run_assignment_bulk_action
+
+    ids = list(ids)
+    job_id = uuid.uuid4().hex
+    cache.set(_job_key(job_id), {
+        'id': job_id, 'action': action, 'total': len(ids), 'done': 0, 'finished': False,
+    }, JOB_TIMEOUT)
+    jobs = cache.get(_user_jobs_key(user_id)) or []
+    cache.set(_user_jobs_key(user_id), jobs + [job_id], JOB_TIMEOUT)
+
+    transaction.on_commit(lambda: run_assignment_bulk_action.delay(action, ids, user_id, job_id))
+    return job_id
+
+
+def pop_user_jobs(user_id):
+    """
+    The user's tracked jobs. Finished jobs are returned once and then
+    forgotten; running ones stay listed.
+    """
+    job_ids = cache.get(_user_jobs_key(user_id)) or []
+    if not job_ids:
+        return []
+    jobs = [job for job in cache.get_many([_job_key(j) for j in job_ids]).values()]
+    running = [job['id'] for job in jobs if not job['finished']]
+    if running != job_ids:
+        cache.set(_user_jobs_key(user_id), running, JOB_TIMEOUT)
+    return jobs
@@ -0,0 +1,64 @@
+"""
+Version scopes and cached payloads for assignments and categories.
+
+Categories change rarely but the category picker is loaded with every
+form. The list payload is cached per version and served with an ETag
+derived from the same version, so unchanged lists cost the client a 304
+and the server a single Redis GET.
+
+Scopes (see config/conditional.py):
+- ``categories``: category rows and their assignment counts
+- ``assignments``: any assignment/progress change (admin lists)
+- ``assignments:teacher:<id>``: one teacher's assignments
+- ``assignments:bulk``: queryset updates that touch many teachers at once
+"""
+
+from config.conditional import get_versions, bump_versions
+
+CATEGORY_LIST_TIMEOUT = 60 * 60
+TEACHER_DASHBOARD_TIMEOUT = 60 * 60
+
+
+def get_category_version():
+    return get_versions(['categories'])[0]
+
+
+def bump_category_version():
+    bump_versions('categories')
+
+
+def category_list_key(version, variant):
+    return f'assignments:categories:list:v{version}:{variant}'
+
+
+def bump_assignment_versions(teacher_id=None):
+    """
+    Invalidate assignment lists. Without ``teacher_id`` (queryset updates)
+    every teacher's lists are invalidated through the bulk scope.
+    """
+    teacher_scope = f'assignments:teacher:{teacher_id}' if teacher_id else 'assignments:bulk'
+    bump_versions('assignments', 'categories', teacher_scope)
+
+
+def assignment_scopes(request, *args, **kwargs):
+    """
+    Scopes for assignment/progress reads: all for admins, own for teachers,
+    plus categories, whose names and scores the payloads embed.
+    """
+    user = request.user
+    if user.is_superadmin or user.is_admin:
+        return ['assignments', 'categories']
+    return ['assignments:bulk', f'assignments:teacher:{user.pk}', 'categories']
+
+
+def category_scopes(request, *args, **kwargs):
+    return ['categories']
+
+
+# The dashboard shows the same assignment and category data
+teacher_dashboard_scopes = assignment_scopes
+
+
+def teacher_dashboard_key(request):
+    versions = '.'.join(str(v) for v in get_versions(teacher_dashboard_scopes(request)))
+    return f'assignments:dashboard:{request.user.pk}:v{versions}'
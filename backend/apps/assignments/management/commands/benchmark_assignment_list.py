@@ -0,0 +1,109 @@
+"""
+Management command to measure assignment list serialization per row.
+
+Creates a temporary data set (rolled back afterwards), serializes it with
+``AssignmentListSerializer`` over the plain queryset (per-row property
+calls, unused progress prefetch) and over ``Assignment.objects.for_list()``,
+and fails if the list path exceeds ``--max-row-us`` microseconds per row.
+"""
+
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.assignments.models import Assignment, Category
+from apps.assignments.serializers import AssignmentListSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-row cost of the assignment list serializer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--assignments', type=int, default=10000, help='Assignments to create')
+        parser.add_argument('--teachers', type=int, default=200)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument(
+            '--max-row-us',
+            type=float,
+            default=150.0,
+            help='Fail if the list path costs more than this many microseconds per row',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._populate(options)
+            try:
+                baseline = self._measure(
+                    Assignment.objects.select_related(
+                        'category', 'teacher', 'assigned_by'
+                    ).prefetch_related('progress_items'),
+                    context={},
+                )
+                now = timezone.now()
+                optimized = self._measure(Assignment.objects.for_list(now), context={'now': now})
+            finally:
+                transaction.set_rollback(True)
+
+        rows = options['assignments']
+        for label, (fetch, serialize, queries) in (('plain queryset', baseline), ('for_list()', optimized)):
+            self.stdout.write(
+                f'{label:<16} fetch {fetch * 1e6 / rows:7.1f} us/row, '
+                f'serialize {serialize * 1e6 / rows:7.1f} us/row, {queries} queries'
+            )
+
+        per_row = optimized[1] * 1e6 / rows
+        if per_row > options['max_row_us']:
+            raise CommandError(
+                f'List serialization costs {per_row:.1f} us/row (limit {options["max_row_us"]})'
+            )
+        self.stdout.write(self.style.SUCCESS(f'OK: {per_row:.1f} us/row <= {options["max_row_us"]}'))
+
+    def _populate(self, options):
+        now = timezone.now()
+        admin = User.objects.create_user(
+            username='__list_benchmark_admin__', email='list-benchmark@example.com', role='admin'
+        )
+        teachers = User.objects.bulk_create([
+            User(username=f'__list_benchmark_{i}__', email=f'list-benchmark-{i}@example.com',
+                 first_name='Teacher', last_name=str(i), role='teacher')
+            for i in range(options['teachers'])
+        ])
+        categories = Category.objects.bulk_create([
+            Category(name=f'__list_benchmark_{i}__', slug=f'list-benchmark-{i}',
+                     default_score=10 + i, min_score=0)
+            for i in range(options['categories'])
+        ])
+        Assignment.objects.bulk_create([
+            Assignment(
+                teacher=random.choice(teachers),
+                category=random.choice(categories),
+                assigned_by=admin,
+                title=f'Topshiriq {i}',
+                description='Ilmiy maqola tayyorlash ' * 20,
+                required_quantity=random.randint(1, 5),
+                completed_quantity=random.randint(0, 5),
+                deadline=now + timedelta(days=random.randint(-30, 60)),
+                status=random.choice(['active', 'completed', 'overdue']),
+                use_custom_score=i % 7 == 0,
+                custom_max_score=20 if i % 7 == 0 else None,
+            )
+            for i in range(options['assignments'])
+        ], batch_size=1000)
+
+    def _measure(self, queryset, context):
+        """Returns (fetch seconds, serialize seconds, query count)."""
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            rows = list(queryset)
+            fetched = time.perf_counter()
+            AssignmentListSerializer(rows, many=True, context=context).data
+            done = time.perf_counter()
+        return fetched - start, done - fetched, len(queries)
@@ -0,0 +1,103 @@
+"""
+Management command to time reweighting a category.
+
+Creates a category with ``--rows`` graded progress items (rolled back
+afterwards), changes its score weight and times the dry run and the real
+rescore, comparing a sample against ``Assignment.calculate_final_score``.
+Fails if rescoring takes longer than ``--max-seconds``.
+"""
+
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from apps.assignments.models import Assignment, AssignmentProgress, Category
+from apps.assignments.rescoring import rescore
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark set-based rescoring after a category weight change'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000, help='Graded progress rows in the category')
+        parser.add_argument('--assignments', type=int, default=2000)
+        parser.add_argument('--max-seconds', type=float, default=10.0, help='Fail above this rescoring time')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            try:
+                category = self._populate(options)
+                category.score_weight = Decimal('1.50')
+                category.save()
+
+                start = time.perf_counter()
+                preview = rescore(category_id=category.id, dry_run=True)
+                dry_run = time.perf_counter() - start
+
+                start = time.perf_counter()
+                summary = rescore(category_id=category.id)
+                elapsed = time.perf_counter() - start
+
+                mismatches = [
+                    progress.pk
+                    for progress in AssignmentProgress.objects.filter(
+                        assignment__category=category
+                    ).select_related('assignment__category').order_by('?')[:200]
+                    if progress.final_score != progress.assignment.calculate_final_score(progress.raw_score)
+                ]
+                leftover = rescore(category_id=category.id, dry_run=True)['rows']
+            finally:
+                transaction.set_rollback(True)
+
+        self.stdout.write(f'dry run: {preview["rows"]} rows would change ({dry_run:.2f} s)')
+        self.stdout.write(
+            f'rescore: {summary["rows"]} rows in {summary["assignments"]} assignments '
+            f'({elapsed:.2f} s, {summary["rows"] / max(elapsed, 1e-9):,.0f} rows/s)'
+        )
+        if mismatches or leftover:
+            raise CommandError(f'Stale scores after rescoring: {leftover} rows, sample mismatches {mismatches[:5]}')
+        if elapsed > options['max_seconds']:
+            raise CommandError(f'Rescoring took {elapsed:.2f} s (limit {options["max_seconds"]})')
+        self.stdout.write(self.style.SUCCESS(f'OK: {elapsed:.2f} s <= {options["max_seconds"]}'))
+
+    def _populate(self, options):
+        admin = User.objects.create_user(
+            username='__rescore_benchmark_admin__', email='rescore-benchmark@example.com', role='admin'
+        )
+        teachers = User.objects.bulk_create([
+            User(username=f'__rescore_benchmark_{i}__', email=f'rescore-benchmark-{i}@example.com', role='teacher')
+            for i in range(50)
+        ])
+        category = Category.objects.create(
+            name='__rescore_benchmark__', slug='rescore-benchmark', default_score=10, min_score=2,
+        )
+        deadline = timezone.now() + timedelta(days=30)
+        assignments = Assignment.objects.bulk_create([
+            Assignment(
+                teacher=random.choice(teachers), category=category, assigned_by=admin,
+                required_quantity=5, deadline=deadline,
+                use_custom_score=i % 5 == 0,
+                custom_max_score=20 if i % 5 == 0 else None,
+                score_multiplier=Decimal('1.25') if i % 3 == 0 else Decimal('1.00'),
+            )
+            for i in range(options['assignments'])
+        ], batch_size=1000)
+
+        rows = []
+        for i in range(options['rows']):
+            assignment = assignments[i % len(assignments)]
+            raw = random.randint(0, 25)
+            rows.append(AssignmentProgress(
+                assignment=assignment, counted=True, raw_score=raw,
+                final_score=assignment.calculate_final_score(raw),
+            ))
+        AssignmentProgress.objects.bulk_create(rows, batch_size=5000)
+        return category
@@ -0,0 +1,50 @@
+"""
+Management command to recompute stale progress final scores.
+
+Prints what would change with ``--dry-run``; otherwise rescoring runs in
+this process, or on a Celery worker with ``--async``.
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.assignments.rescoring import rescore
+from apps.assignments.tasks import rescore_progress
+
+
+class Command(BaseCommand):
+    help = 'Recompute AssignmentProgress.final_score from the current score settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--category', type=int, help='Only assignments of this category')
+        parser.add_argument('--assignment', type=int, action='append', dest='assignments',
+                            help='Only this assignment (repeatable)')
+        parser.add_argument('--dry-run', action='store_true', help='Show the diff without writing')
+        parser.add_argument('--async', action='store_true', dest='run_async', help='Queue a Celery task instead')
+        parser.add_argument('--note', help='ScoreHistory note')
+
+    def handle(self, *args, **options):
+        kwargs = {
+            'category_id': options['category'],
+            'assignment_ids': options['assignments'],
+            'note': options['note'],
+            'dry_run': options['dry_run'],
+        }
+        if options['run_async']:
+            result = rescore_progress.delay(**kwargs)
+            self.stdout.write(f'Queued rescore_progress task {result.id}')
+            return
+
+        summary = rescore(**kwargs)
+
+        for row in summary['sample']:
+            self.stdout.write(
+                f'progress {row["progress"]:>8} (assignment {row["assignment"]}): {row["old"]} -> {row["new"]}'
+            )
+        if summary['rows'] > len(summary['sample']):
+            self.stdout.write(f'... and {summary["rows"] - len(summary["sample"])} more')
+
+        verb = 'Would rescore' if summary['dry_run'] else 'Rescored'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {summary["rows"]} progress rows in {summary["assignments"]} assignments '
+            f'(total delta {summary["delta"]:+.2f})'
+        ))
@@ -3,11 +3,100 @@ Models for assignments and categories.
 Admin/SuperAdmin can create categories (tezis, esse, etc.) and assign tasks to teachers.
 """
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Concat, Greatest, Least, Trim
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+
+class CategoryQuerySet(models.QuerySet):
+    
+    def with_assignment_stats(self):
+        """Annotate assignment totals and status breakdowns in the same query."""
+        return self.annotate(
+            assignments_count=models.Count('assignments'),
+            active_assignments_count=models.Count(
+                'assignments', filter=models.Q(assignments__status='active')
+            ),
+            completed_assignments_count=models.Count(
+                'assignments', filter=models.Q(assignments__status='completed')
+            ),
+        )
+
+
+def _full_name(relation):
+    return Trim(Concat(
+        f'{relation}__first_name', models.Value(' '), f'{relation}__last_name',
+        output_field=models.CharField(),
+    ))
+
+
+class AssignmentQuerySet(models.QuerySet):
+    
+    # Columns list payloads read; description and file settings stay deferred
+    LIST_FIELDS = [
+        'id', 'title', 'status', 'priority', 'deadline', 'created_at',
+        'required_quantity', 'completed_quantity',
+        'use_custom_score', 'custom_max_score', 'custom_min_score',
+        'category__id', 'category__name', 'category__color',
+        'category__default_score', 'category__min_score',
+        'teacher__id', 'teacher__username', 'teacher__first_name', 'teacher__last_name',
+        'assigned_by__id', 'assigned_by__username', 'assigned_by__first_name', 'assigned_by__last_name',
+    ]
+    
+    def for_list(self, now=None, extra_fields=()):
+        """
+        Project list columns and compute overdue/progress/score in SQL.
+        
+        The annotations are picked up by the matching Assignment properties,
+        so one ``now`` applies to every row of the page.
+        """
+        now = now or timezone.now()
+        custom = models.Q(use_custom_score=True)
+        return self.select_related('category', 'teacher', 'assigned_by').only(
+            *self.LIST_FIELDS, *extra_fields
+        ).annotate(
+            list_is_overdue=models.Case(
+                models.When(status='completed', then=models.Value(False)),
+                models.When(deadline__lt=now, then=models.Value(True)),
+                default=models.Value(False),
+                output_field=models.BooleanField(),
+            ),
+            list_progress_percentage=models.Case(
+                models.When(required_quantity=0, then=models.Value(100)),
+                default=Least(
+                    models.Value(100),
+                    models.F('completed_quantity') * 100 / models.F('required_quantity'),
+                ),
+                output_field=models.IntegerField(),
+            ),
+            list_max_score=models.Case(
+                models.When(custom & models.Q(custom_max_score__isnull=False), then=models.F('custom_max_score')),
+                default=models.F('category__default_score'),
+            ),
+            list_min_score=models.Case(
+                models.When(custom & models.Q(custom_min_score__isnull=False), then=models.F('custom_min_score')),
+                default=models.F('category__min_score'),
+            ),
+            # Same as User.get_full_name()
+            list_teacher_name=_full_name('teacher'),
+            list_assigned_by_name=models.Case(
+                models.When(assigned_by__isnull=True, then=models.Value(None)),
+                default=_full_name('assigned_by'),
+            ),
+        )
+    
+    def for_detail(self):
+        """Related rows for the detail payload: two queries in total."""
+        return self.select_related('teacher', 'category', 'assigned_by').prefetch_related(
+            models.Prefetch(
+                'progress_items',
+                queryset=AssignmentProgress.objects.select_related('portfolio'),
+            ),
+        )
 
 
 class Category(models.Model):
@@ -119,6 +208,8 @@ class Category(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CategoryQuerySet.as_manager()
+    
     class Meta:
         verbose_name = _('category')
         verbose_name_plural = _('categories')
@@ -127,6 +218,21 @@ class Category(models.Model):
     def __str__(self):
         return self.name
     
+    @property
+    def assignment_stats(self):
+        """Totals from with_assignment_stats(), or one aggregate if not annotated."""
+        if not hasattr(self, 'assignments_count'):
+            return self.assignments.aggregate(
+                total=models.Count('id'),
+                active=models.Count('id', filter=models.Q(status='active')),
+                completed=models.Count('id', filter=models.Q(status='completed')),
+            )
+        return {
+            'total': self.assignments_count,
+            'active': self.active_assignments_count,
+            'completed': self.completed_assignments_count,
+        }
+    
     def get_localized_name(self, lang='uz'):
         """Get localized name based on language."""
         if lang == 'uz' and self.name_uz:
@@ -156,6 +262,8 @@ class Assignment(models.Model):
         (STATUS_CANCELLED, _('Cancelled')),
     ]
     
+    objects = AssignmentQuerySet.as_manager()
+    
     # Who is assigned
     teacher = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -296,14 +404,19 @@ class Assignment(models.Model):
             models.Index(fields=['teacher', 'status']),
             models.Index(fields=['deadline']),
             models.Index(fields=['category']),
+            models.Index(fields=['created_at']),
         ]
     
     def __str__(self):
         return f"{self.teacher.get_full_name()} - {self.category.name} ({self.required_quantity})"
     
+    # Properties below prefer the annotations of AssignmentQuerySet.for_list()
+    
     @property
     def is_overdue(self):
         """Check if assignment is overdue."""
+        if hasattr(self, 'list_is_overdue'):
+            return self.list_is_overdue
         if self.status == self.STATUS_COMPLETED:
             return False
         return timezone.now() > self.deadline
@@ -312,6 +425,8 @@ class Assignment(models.Model):
     @property
     def max_score(self):
         """Maksimal ballni qaytaradi (custom yoki category default)."""
+        if hasattr(self, 'list_max_score'):
+            return self.list_max_score
         if self.use_custom_score and self.custom_max_score is not None:
             return self.custom_max_score
         return self.category.default_score
@@ -319,6 +434,8 @@ class Assignment(models.Model):
     @property
     def min_score_value(self):
         """Minimal ballni qaytaradi."""
+        if hasattr(self, 'list_min_score'):
+            return self.list_min_score
         if self.use_custom_score and self.custom_min_score is not None:
             return self.custom_min_score
         return self.category.min_score
@@ -356,14 +473,18 @@ class Assignment(models.Model):
             raw_score: Baholangan ball (0 dan max_score gacha)
         
         Returns:
-            Og'irlik bilan hisoblangan final ball
+            Og'irlik bilan hisoblangan final ball (Decimal, 2 xona)
+        
+        Decimal va ROUND_HALF_UP bilan hisoblanadi, shuning uchun
+        rescoring.py dagi SQL hisobi bilan bir xil natija beradi.
         """
         if raw_score < self.min_score_value:
             raw_score = self.min_score_value
         if raw_score > self.max_score:
             raw_score = self.max_score
         
-        return round(raw_score * self.effective_weight, 2)
+        weight = Decimal(self.category.score_weight) * Decimal(self.score_multiplier)
+        return (Decimal(raw_score) * weight).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
 
     @property
     def remaining_quantity(self):
@@ -373,6 +494,8 @@ class Assignment(models.Model):
     @property
     def progress_percentage(self):
         """Get completion percentage."""
+        if hasattr(self, 'list_progress_percentage'):
+            return self.list_progress_percentage
         if self.required_quantity == 0:
             return 100
         return min(100, int((self.completed_quantity / self.required_quantity) * 100))
@@ -380,10 +503,13 @@ class Assignment(models.Model):
     @property
     def time_remaining(self):
         """Get time remaining until deadline."""
+        return self.time_remaining_at(timezone.now())
+    
+    def time_remaining_at(self, now):
+        """Time remaining until deadline as of ``now``."""
         if self.status == self.STATUS_COMPLETED:
             return timedelta(0)
         
-        now = timezone.now()
         if now > self.deadline:
             return timedelta(0)
         
@@ -392,7 +518,11 @@ class Assignment(models.Model):
     @property
     def time_remaining_display(self):
         """Get human-readable time remaining."""
-        remaining = self.time_remaining
+        return self.time_remaining_display_at(timezone.now())
+    
+    def time_remaining_display_at(self, now):
+        """Human-readable time remaining as of ``now``."""
+        remaining = self.time_remaining_at(now)
         
         if remaining.total_seconds() <= 0:
             return _("Muddat o'tgan")
@@ -424,11 +554,50 @@ class Assignment(models.Model):
     
     def increment_completed(self, count=1):
         """Increment completed quantity."""
-        self.completed_quantity += count
-        if self.completed_quantity >= self.required_quantity:
-            self.mark_completed()
-        else:
-            self.save()
+        self.apply_completed_delta(count)
+    
+    def apply_completed_delta(self, delta):
+        """
+        Add ``delta`` to completed_quantity and move the status in one
+        conditional UPDATE, so concurrent submissions never lose counts.
+        
+        Mirrors check_and_update_status(): reaching the required quantity
+        completes the assignment, otherwise the deadline decides between
+        overdue and active. Cancelled and completed assignments keep
+        their status. The in-memory fields are refreshed afterwards.
+        """
+        now = timezone.now()
+        reaches_required = models.Q(completed_quantity__gte=models.F('required_quantity') - delta)
+        keeps_status = models.Q(status__in=[self.STATUS_CANCELLED, self.STATUS_COMPLETED])
+        
+        type(self).objects.filter(pk=self.pk).update(
+            completed_quantity=Greatest(models.F('completed_quantity') + delta, 0),
+            status=models.Case(
+                models.When(keeps_status, then=models.F('status')),
+                models.When(reaches_required, then=models.Value(self.STATUS_COMPLETED)),
+                models.When(deadline__lt=now, then=models.Value(self.STATUS_OVERDUE)),
+                default=models.Value(self.STATUS_ACTIVE),
+            ),
+            completed_at=models.Case(
+                models.When(~keeps_status & reaches_required, then=models.Value(now)),
+                default=models.F('completed_at'),
+            ),
+            updated_at=now,
+        )
+        
+        old_status = self.status
+        self.status, self.completed_quantity, self.completed_at, self.updated_at = (
+            type(self).objects.filter(pk=self.pk).values_list(
+                'status', 'completed_quantity', 'completed_at', 'updated_at'
+            ).get()
+        )
+        
+        # update() sends no signals: notify and invalidate here
+        from .cache import bump_assignment_versions
+        from .signals import notify_status_change
+        bump_assignment_versions(teacher_id=self.teacher_id)
+        if self.status != old_status:
+            notify_status_change(self, old_status)
     
     def check_and_update_status(self):
         """Check and update status based on deadline and completion."""
@@ -553,18 +722,37 @@ class AssignmentProgress(models.Model):
             return None
         return round((self.raw_score / self.assignment.max_score) * 100, 1)
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'counted' in field_names:
+            instance._loaded_counted = instance.counted
+        return instance
+    
     def save(self, *args, **kwargs):
         # Auto-calculate final_score if raw_score is set
         if self.raw_score is not None and self.final_score is None:
             self.final_score = self.assignment.calculate_final_score(self.raw_score)
         
-        super().save(*args, **kwargs)
-        
-        # Update assignment completed quantity
-        if self.counted and self.portfolio:
-            counted_items = self.assignment.progress_items.filter(counted=True).count()
-            self.assignment.completed_quantity = counted_items
-            self.assignment.check_and_update_status()
+        with transaction.atomic():
+            if self._state.adding:
+                super().save(*args, **kwargs)
+                delta = 1 if self.counted else 0
+            else:
+                delta = 0
+                if self.counted != getattr(self, '_loaded_counted', None):
+                    # Flip the flag conditionally first: of several writers
+                    # making the same transition only one adjusts the counter
+                    if type(self).objects.filter(pk=self.pk).exclude(
+                        counted=self.counted
+                    ).update(counted=self.counted):
+                        delta = 1 if self.counted else -1
+                super().save(*args, **kwargs)
+            
+            # Update assignment completed quantity
+            if delta:
+                self.assignment.apply_completed_delta(delta)
+        self._loaded_counted = self.counted
 
 
 class ScoreHistory(models.Model):
@@ -616,6 +804,9 @@ class ScoreHistory(models.Model):
         verbose_name = _('score history')
         verbose_name_plural = _('score histories')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
     
     def __str__(self):
         return f"{self.assignment} - {self.action}"
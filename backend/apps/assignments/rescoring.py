@@ -0,0 +1,139 @@
+"""
+Set-based rescoring of AssignmentProgress.final_score.
+
+``Assignment.calculate_final_score()`` is expressed once as SQL
+(clamp raw_score into [min, max], multiply by category weight times
+assignment multiplier, round to 2 places). The engine selects the graded
+progress rows whose stored final_score differs from it, then fixes them
+batch by batch with one UPDATE and one ScoreHistory bulk insert per batch.
+Nothing is recomputed row by row in Python.
+"""
+
+from django.db import models, transaction
+from django.db.models.functions import Cast, Greatest, Least, Round
+
+from .cache import bump_assignment_versions
+from .models import Assignment, AssignmentProgress, ScoreHistory
+
+BATCH_SIZE = 5000
+SAMPLE_SIZE = 20
+
+
+def _final_score(prefix, raw_score):
+    """calculate_final_score() over the assignment reached through ``prefix``."""
+    custom = models.Q(**{f'{prefix}use_custom_score': True})
+    max_score = models.Case(
+        models.When(
+            custom & models.Q(**{f'{prefix}custom_max_score__isnull': False}),
+            then=models.F(f'{prefix}custom_max_score'),
+        ),
+        default=models.F(f'{prefix}category__default_score'),
+    )
+    min_score = models.Case(
+        models.When(
+            custom & models.Q(**{f'{prefix}custom_min_score__isnull': False}),
+            then=models.F(f'{prefix}custom_min_score'),
+        ),
+        default=models.F(f'{prefix}category__min_score'),
+    )
+    weight = models.F(f'{prefix}category__score_weight') * models.F(f'{prefix}score_multiplier')
+    return Cast(
+        Round(Least(Greatest(raw_score, min_score), max_score) * weight, 2),
+        models.DecimalField(max_digits=8, decimal_places=2),
+    )
+
+
+def stale_progress(category_id=None, assignment_ids=None):
+    """
+    Graded progress rows whose final_score no longer matches the current
+    score settings, annotated with ``new_final_score``.
+    """
+    queryset = AssignmentProgress.objects.filter(raw_score__isnull=False)
+    if category_id is not None:
+        queryset = queryset.filter(assignment__category_id=category_id)
+    if assignment_ids is not None:
+        queryset = queryset.filter(assignment_id__in=assignment_ids)
+    return queryset.annotate(
+        new_final_score=_final_score('assignment__', models.F('raw_score')),
+    ).filter(
+        models.Q(final_score__isnull=True) | ~models.Q(final_score=models.F('new_final_score'))
+    )
+
+
+def rescore(category_id=None, assignment_ids=None, changed_by_id=None, note=None,
+            dry_run=False, batch_size=BATCH_SIZE):
+    """
+    Recompute stale final scores.
+
+    With ``dry_run`` nothing is written; the summary then describes what
+    a real run would change.
+
+    Returns:
+        dict with the number of rows and assignments changed, the total
+        score delta and a sample of (progress, assignment, old, new) rows.
+    """
+    summary = {'dry_run': dry_run, 'rows': 0, 'assignments': 0, 'delta': 0.0, 'sample': []}
+    assignments = set()
+    last_pk = 0
+
+    while True:
+        with transaction.atomic():
+            batch = stale_progress(category_id, assignment_ids).filter(pk__gt=last_pk).order_by('pk')
+            if not dry_run:
+                batch = batch.select_for_update(of=('self',))
+            rows = list(batch.values_list('pk', 'assignment_id', 'final_score', 'new_final_score')[:batch_size])
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+
+            if not dry_run:
+                _apply(rows, changed_by_id, note)
+
+        summary['rows'] += len(rows)
+        for pk, assignment_id, old, new in rows:
+            assignments.add(assignment_id)
+            summary['delta'] += float(new) - float(old or 0)
+            if len(summary['sample']) < SAMPLE_SIZE:
+                summary['sample'].append({
+                    'progress': pk,
+                    'assignment': assignment_id,
+                    'old': None if old is None else float(old),
+                    'new': float(new),
+                })
+
+    summary['assignments'] = len(assignments)
+    summary['delta'] = round(summary['delta'], 2)
+    if summary['rows'] and not dry_run:
+        # Final scores are embedded in assignment payloads
+        bump_assignment_versions()
+    return summary
+
+
+def _apply(rows, changed_by_id, note):
+    """One UPDATE and one history insert for a locked batch."""
+    new_score = Assignment.objects.filter(pk=models.OuterRef('assignment_id')).annotate(
+        new_final_score=_final_score('', models.OuterRef('raw_score')),
+    ).values('new_final_score')[:1]
+    AssignmentProgress.objects.filter(pk__in=[row[0] for row in rows]).update(
+        final_score=models.Subquery(new_score),
+    )
+    ScoreHistory.objects.bulk_create([
+        ScoreHistory(
+            assignment_id=assignment_id,
+            progress_id=pk,
+            action='score_changed',
+            # SQLite hands the annotation back unquantized
+            old_value=None if old is None else f'{old:.2f}',
+            new_value=f'{new:.2f}',
+            note=note or 'Ball sozlamalari o\'zgargani uchun qayta hisoblandi',
+            changed_by_id=changed_by_id,
+        )
+        for pk, assignment_id, old, new in rows
+    ])
+
+
+def schedule_rescore(**kwargs):
+    """Queue rescore_progress once the score settings change is committed."""
+    from .tasks import rescore_progress
+    
+    transaction.on_commit(lambda: rescore_progress.delay(**kwargs))
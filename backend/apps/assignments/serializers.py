@@ -11,6 +11,8 @@ class CategorySerializer(serializers.ModelSerializer):
     """Serializer for Category model."""
     
     assignments_count = serializers.SerializerMethodField()
+    active_assignments_count = serializers.SerializerMethodField()
+    completed_assignments_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Category
@@ -18,12 +20,21 @@ class CategorySerializer(serializers.ModelSerializer):
             'id', 'name', 'name_uz', 'name_en', 'name_ru',
             'description', 'slug', 'icon', 'color', 'order',
             'default_score', 'min_score', 'score_weight',
-            'is_active', 'assignments_count', 'created_at', 'updated_at'
+            'is_active', 'assignments_count', 'active_assignments_count',
+            'completed_assignments_count', 'created_at', 'updated_at'
         ]
         read_only_fields = ['slug', 'created_at', 'updated_at']
     
+    # Counts come from Category.objects.with_assignment_stats(); the
+    # fallback covers instances created or saved within the request
     def get_assignments_count(self, obj):
-        return obj.assignments.count()
+        return obj.assignment_stats['total']
+    
+    def get_active_assignments_count(self, obj):
+        return obj.assignment_stats['active']
+    
+    def get_completed_assignments_count(self, obj):
+        return obj.assignment_stats['completed']
 
 
 class CategoryListSerializer(serializers.ModelSerializer):
@@ -79,24 +90,25 @@ class AssignmentProgressGradeSerializer(serializers.ModelSerializer):
 
 
 class AssignmentListSerializer(serializers.ModelSerializer):
-    """Serializer for assignment lists."""
+    """
+    Serializer for assignment lists.
+    
+    Expects ``Assignment.objects.for_list()`` rows, whose annotations back
+    the names, ``is_overdue``, ``progress_percentage`` and the score
+    fields, and a ``now`` in the context shared by every row.
+    """
     
     category_name = serializers.CharField(source='category.name', read_only=True)
-    teacher_name = serializers.CharField(
-        source='teacher.get_full_name', 
-        read_only=True
-    )
-    created_by_name = serializers.CharField(
-        source='created_by.get_full_name', 
-        read_only=True
-    )
+    teacher_name = serializers.SerializerMethodField()
+    created_by = serializers.PrimaryKeyRelatedField(source='assigned_by', read_only=True)
+    created_by_name = serializers.SerializerMethodField()
     time_remaining = serializers.SerializerMethodField()
-    is_overdue = serializers.SerializerMethodField()
-    progress_percentage = serializers.SerializerMethodField()
+    is_overdue = serializers.BooleanField(read_only=True)
+    progress_percentage = serializers.IntegerField(read_only=True)
     
     # Score fields
-    max_score = serializers.SerializerMethodField()
-    min_score_value = serializers.SerializerMethodField()
+    max_score = serializers.IntegerField(read_only=True)
+    min_score_value = serializers.IntegerField(read_only=True)
     has_custom_score = serializers.BooleanField(source='use_custom_score', read_only=True)
     
     class Meta:
@@ -111,20 +123,18 @@ class AssignmentListSerializer(serializers.ModelSerializer):
             'created_at'
         ]
     
-    def get_time_remaining(self, obj):
-        return obj.time_remaining
-    
-    def get_is_overdue(self, obj):
-        return obj.is_overdue
-    
-    def get_progress_percentage(self, obj):
-        return obj.progress_percentage
+    def get_teacher_name(self, obj):
+        if hasattr(obj, 'list_teacher_name'):
+            return obj.list_teacher_name
+        return obj.teacher.get_full_name()
     
-    def get_max_score(self, obj):
-        return obj.max_score
+    def get_created_by_name(self, obj):
+        if hasattr(obj, 'list_assigned_by_name'):
+            return obj.list_assigned_by_name
+        return obj.assigned_by.get_full_name() if obj.assigned_by else None
     
-    def get_min_score_value(self, obj):
-        return obj.min_score_value
+    def get_time_remaining(self, obj):
+        return obj.time_remaining_at(self.context.get('now') or timezone.now())
 
 
 class AssignmentDetailSerializer(serializers.ModelSerializer):
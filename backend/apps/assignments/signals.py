@@ -3,13 +3,14 @@ Signals for assignments app.
 Handles notifications when assignments are created or updated.
 """
 
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
 
-from .models import Assignment, AssignmentProgress
+from .models import Category, Assignment, AssignmentProgress
+from .cache import bump_category_version, bump_assignment_versions
 
 
 @receiver(post_save, sender=Assignment)
@@ -74,18 +75,26 @@ def assignment_status_changed_notification(sender, instance, created, **kwargs):
     Send notification when assignment status changes.
     """
     if not created and getattr(instance, '_status_changed', False):
-        old_status = getattr(instance, '_old_status', None)
+        notify_status_change(instance, getattr(instance, '_old_status', None))
+
+
+def notify_status_change(instance, old_status):
+    """
+    Email the teacher about an assignment status change.
+    
+    Also called by Assignment.apply_completed_delta(), whose UPDATE sends
+    no post_save.
+    """
+    # Notify teacher about status change
+    if instance.teacher and instance.teacher.email:
+        status_labels = dict(Assignment.STATUS_CHOICES)
+        old_label = status_labels.get(old_status, old_status)
+        new_label = status_labels.get(instance.status, instance.status)
         
-        # Notify teacher about status change
-        if instance.teacher and instance.teacher.email:
-            status_labels = dict(Assignment.STATUS_CHOICES)
-            old_label = status_labels.get(old_status, old_status)
-            new_label = status_labels.get(instance.status, instance.status)
-            
-            try:
-                send_mail(
-                    subject=f'Topshiriq holati o\'zgardi: {instance.title}',
-                    message=f'''
+        try:
+            send_mail(
+                subject=f'Topshiriq holati o\'zgardi: {instance.title}',
+                message=f'''
 Hurmatli {instance.teacher.get_full_name() or instance.teacher.username},
 
 "{instance.title}" topshirig'ingiz holati o'zgardi:
@@ -97,13 +106,13 @@ Tizimga kirib, batafsil ma'lumot olishingiz mumkin.
 
 Hurmat bilan,
 Portfolio Tizimi
-                    '''.strip(),
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[instance.teacher.email],
-                    fail_silently=True,
-                )
-            except Exception as e:
-                print(f"Email yuborishda xatolik: {e}")
+                '''.strip(),
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=[instance.teacher.email],
+                fail_silently=True,
+            )
+        except Exception as e:
+            print(f"Email yuborishda xatolik: {e}")
 
 
 @receiver(post_save, sender=AssignmentProgress)
@@ -115,12 +124,12 @@ def progress_notification(sender, instance, created, **kwargs):
         assignment = instance.assignment
         
         # Notify admin/creator about new progress
-        if assignment.created_by and assignment.created_by.email:
+        if assignment.assigned_by and assignment.assigned_by.email:
             try:
                 send_mail(
                     subject=f'Yangi progress: {assignment.title}',
                     message=f'''
-Hurmatli {assignment.created_by.get_full_name() or assignment.created_by.username},
+Hurmatli {assignment.assigned_by.get_full_name() or assignment.assigned_by.username},
 
 "{assignment.title}" topshirig'iga yangi progress qo'shildi:
 
@@ -133,7 +142,7 @@ Hurmat bilan,
 Portfolio Tizimi
                     '''.strip(),
                     from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[assignment.created_by.email],
+                    recipient_list=[assignment.assigned_by.email],
                     fail_silently=True,
                 )
             except Exception as e:
@@ -194,3 +203,40 @@ Portfolio Tizimi
                 )
             except Exception as e:
                 print(f"Email yuborishda xatolik: {e}")
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_versions(sender, **kwargs):
+    """Category writes invalidate the cached category list and its ETag."""
+    bump_category_version()
+
+
+@receiver([post_save, post_delete], sender=Assignment)
+def invalidate_assignment_versions(sender, instance, **kwargs):
+    """
+    Assignment writes change assignment lists, dashboards and the
+    category counts.
+    """
+    bump_assignment_versions(teacher_id=instance.teacher_id)
+
+
+@receiver([post_save, post_delete], sender=AssignmentProgress)
+def invalidate_progress_versions(sender, instance, **kwargs):
+    """Progress rows are embedded in assignment payloads."""
+    if AssignmentProgress.assignment.is_cached(instance):
+        teacher_id = instance.assignment.teacher_id
+    else:
+        teacher_id = Assignment.objects.filter(pk=instance.assignment_id).values_list(
+            'teacher_id', flat=True
+        ).first()
+    bump_assignment_versions(teacher_id=teacher_id)
+
+
+@receiver(post_delete, sender=AssignmentProgress)
+def release_counted_progress(sender, instance, origin=None, **kwargs):
+    """Deleting a counted progress item takes it off completed_quantity."""
+    if not instance.counted or isinstance(origin, Assignment):
+        return
+    assignment = Assignment.objects.filter(pk=instance.assignment_id).first()
+    if assignment:
+        assignment.apply_completed_delta(-1)
@@ -10,7 +10,7 @@ from django.utils import timezone
 from datetime import timedelta
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def send_assignment_notification(assignment_id, notification_type='created'):
     """
     Send email notification for assignment.
@@ -89,7 +89,7 @@ Portfolio Tizimi
         return f"Failed to send email: {str(e)}"
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def check_deadline_reminders():
     """
     Check for assignments with approaching deadlines and send reminders.
@@ -129,7 +129,7 @@ def check_deadline_reminders():
     return f"Sent {reminded_count} deadline reminders"
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def update_overdue_assignments():
     """
     Mark assignments as overdue if deadline has passed.
@@ -146,11 +146,14 @@ def update_overdue_assignments():
     )
     
     updated_count = overdue_assignments.update(status='overdue')
+    if updated_count:
+        from .cache import bump_assignment_versions
+        bump_assignment_versions()
     
     return f"Updated {updated_count} assignments to overdue"
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def send_submission_notification(submission_id, notification_type='submitted'):
     """
     Send email notification for submission.
@@ -290,3 +293,43 @@ def generate_assignment_report(user_id, date_from=None, date_to=None):
     stats['average_grade'] = round(avg_grade, 2) if avg_grade else None
     
     return stats
+
+
+@shared_task
+def rescore_progress(category_id=None, assignment_ids=None, changed_by_id=None, note=None, dry_run=False):
+    """
+    Recompute final scores after category/assignment score settings change.
+    
+    Args:
+        category_id: Rescore every assignment of this category
+        assignment_ids: Or only these assignments
+        changed_by_id: User recorded in ScoreHistory
+        note: ScoreHistory note
+        dry_run: Only report what would change
+    """
+    from .rescoring import rescore
+    
+    return rescore(
+        category_id=category_id,
+        assignment_ids=assignment_ids,
+        changed_by_id=changed_by_id,
+        note=note,
+        dry_run=dry_run,
+    )
+
+
+@shared_task(ignore_result=True)
+def run_assignment_bulk_action(action, assignment_ids, user_id=None, job_id=None):
+    """
+    Run an admin bulk action (see bulk.ACTIONS) on a large selection.
+    
+    Args:
+        action: Action name
+        assignment_ids: Selected assignment IDs
+        user_id: Admin who started it
+        job_id: Progress entry created by bulk.start_job()
+    """
+    from . import bulk
+    
+    done = bulk.run(action, assignment_ids, user_id=user_id, job_id=job_id)
+    return f"{action}: {done} assignments"
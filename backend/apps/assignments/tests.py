@@ -0,0 +1,301 @@
+"""
+Tests for assignments: conditional responses, query counts, the
+completed_quantity counter, rescoring and bulk actions.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.portfolios.models import Portfolio
+
+from config.conditional import get_versions
+
+from . import bulk, rescoring
+from .models import Assignment, AssignmentProgress, Category, ScoreHistory
+
+User = get_user_model()
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Assignment with teacher, category and assigner; progress items with portfolios
+ASSIGNMENT_DETAIL_QUERIES = 2
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AssignmentTestCase(TestCase):
+    """An admin, a teacher and one assignment in one category."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', email='admin@example.com', role=User.ROLE_ADMIN)
+        cls.teacher = User.objects.create_user(username='teacher', email='teacher@example.com', role=User.ROLE_TEACHER)
+        cls.category = Category.objects.create(name='Maqola', slug='maqola', default_score=10)
+        cls.assignment = Assignment.objects.create(
+            teacher=cls.teacher, category=cls.category, required_quantity=3,
+            title='Maqola yozish', deadline=timezone.now() + timedelta(days=30), assigned_by=cls.admin,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+
+class AssignmentETagTests(AssignmentTestCase):
+
+    def assert_category_edit_changes_etag(self, url, user):
+        self.client.force_login(user)
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.category.name = 'Ilmiy maqola'
+        self.category.save()
+
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], etag)
+        self.assertContains(second, 'Ilmiy maqola')
+
+    def test_detail_etag_changes_with_category(self):
+        url = reverse('assignments:detail', args=[self.assignment.pk])
+        self.assert_category_edit_changes_etag(url, self.admin)
+
+    def test_list_etag_changes_with_category(self):
+        self.assert_category_edit_changes_etag(reverse('assignments:list'), self.admin)
+
+    def test_teacher_dashboard_etag_changes_with_category(self):
+        self.assert_category_edit_changes_etag(reverse('assignments:teacher_dashboard'), self.teacher)
+
+
+class AssignmentDetailQueryTests(AssignmentTestCase):
+
+    def test_query_count_does_not_grow_with_progress_items(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse('accounts:current_user'))  # the request user is cached from here on
+        for size in (1, 25):
+            assignment = Assignment.objects.create(
+                teacher=self.teacher, category=self.category, required_quantity=size,
+                deadline=timezone.now() + timedelta(days=30), assigned_by=self.admin,
+            )
+            AssignmentProgress.objects.bulk_create([
+                AssignmentProgress(assignment=assignment, portfolio=Portfolio.objects.create(
+                    teacher=self.teacher, title=f'Maqola {i}', category='other',
+                ))
+                for i in range(size)
+            ])
+            with self.assertNumQueries(ASSIGNMENT_DETAIL_QUERIES):
+                response = self.client.get(reverse('assignments:detail', args=[assignment.pk]))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['progress_items']), size)
+
+
+class CompletedQuantityTests(AssignmentTestCase):
+
+    def submit(self, counted=True):
+        return AssignmentProgress.objects.create(assignment=self.assignment, counted=counted)
+
+    def test_counted_items_complete_the_assignment(self):
+        items = [self.submit() for _ in range(3)]
+        self.submit(counted=False)
+
+        self.assignment.refresh_from_db()
+        self.assertEqual(self.assignment.completed_quantity, 3)
+        self.assertEqual(self.assignment.status, Assignment.STATUS_COMPLETED)
+        self.assertIsNotNone(self.assignment.completed_at)
+
+        # A completed assignment keeps its status when an item is taken back
+        items[0].delete()
+        self.assignment.refresh_from_db()
+        self.assertEqual(self.assignment.completed_quantity, 2)
+        self.assertEqual(self.assignment.status, Assignment.STATUS_COMPLETED)
+
+    def test_uncounting_twice_counts_once(self):
+        progress = self.submit()
+        stale = AssignmentProgress.objects.get(pk=progress.pk)
+        for copy in (progress, stale):
+            copy.counted = False
+            copy.save()
+
+        self.assignment.refresh_from_db()
+        self.assertEqual(self.assignment.completed_quantity, 0)
+        self.assertEqual(self.assignment.status, Assignment.STATUS_ACTIVE)
+
+
+class SubmitEndpointTests(AssignmentTestCase):
+
+    def test_submit_keeps_status_and_concurrent_counts(self):
+        create = AssignmentProgress.objects.create
+
+        def create_while_another_item_is_counted(**kwargs):
+            # Another request counts an item after this one loaded the assignment
+            create(assignment=Assignment.objects.get(pk=self.assignment.pk), counted=True)
+            return create(**kwargs)
+
+        portfolio = Portfolio.objects.create(teacher=self.teacher, title='Maqola', category='other')
+        self.client.force_login(self.teacher)
+        with mock.patch.object(AssignmentProgress.objects, 'create', create_while_another_item_is_counted):
+            response = self.client.post(
+                reverse('assignments:assignment-submit', args=[self.assignment.pk]),
+                {'portfolio': portfolio.pk, 'note': 'Tayyor'},
+            )
+
+        self.assertEqual(response.status_code, 201)
+        self.assignment.refresh_from_db()
+        self.assertEqual(self.assignment.status, Assignment.STATUS_ACTIVE)
+        self.assertEqual(self.assignment.completed_quantity, 1)
+
+
+class RescoringTests(AssignmentTestCase):
+    """Items graded under the old settings, then the category reweighted."""
+
+    def grade(self, raw_score):
+        return AssignmentProgress.objects.create(assignment=self.assignment, raw_score=raw_score)
+
+    def reweight(self, score_weight, score_multiplier=Decimal('1.00')):
+        # Queryset updates, so nothing is rescored behind the test's back
+        Category.objects.filter(pk=self.category.pk).update(score_weight=score_weight)
+        Assignment.objects.filter(pk=self.assignment.pk).update(score_multiplier=score_multiplier)
+        self.assignment.refresh_from_db()
+        self.category.refresh_from_db()
+
+    def test_dry_run_reports_without_writing(self):
+        progress = self.grade(4)
+        self.reweight(Decimal('2.00'))
+        versions = get_versions(['assignments'])
+
+        summary = rescoring.rescore(dry_run=True)
+
+        self.assertEqual((summary['rows'], summary['assignments'], summary['delta']), (1, 1, 4.0))
+        self.assertEqual(summary['sample'], [
+            {'progress': progress.pk, 'assignment': self.assignment.pk, 'old': 4.0, 'new': 8.0},
+        ])
+        progress.refresh_from_db()
+        self.assertEqual(progress.final_score, Decimal('4.00'))
+        self.assertFalse(ScoreHistory.objects.exists())
+        self.assertEqual(get_versions(['assignments']), versions)
+
+    def test_rescore_updates_scores_history_and_etags(self):
+        progress = self.grade(4)
+        self.reweight(Decimal('2.00'))
+        versions = get_versions(['assignments'])
+
+        summary = rescoring.rescore(changed_by_id=self.admin.pk)
+
+        self.assertEqual(summary['rows'], 1)
+        progress.refresh_from_db()
+        self.assertEqual(progress.final_score, Decimal('8.00'))
+        history = ScoreHistory.objects.get()
+        self.assertEqual(
+            (history.progress_id, history.action, history.old_value, history.new_value, history.changed_by_id),
+            (progress.pk, 'score_changed', '4.00', '8.00', self.admin.pk),
+        )
+        self.assertNotEqual(get_versions(['assignments']), versions)
+        # Nothing is stale any more
+        self.assertEqual(rescoring.rescore()['rows'], 0)
+
+    def test_raw_scores_are_clamped_to_min_and_max(self):
+        Category.objects.filter(pk=self.category.pk).update(min_score=2)
+        low, high = self.grade(1), self.grade(15)
+        self.reweight(Decimal('1.50'))
+
+        rescoring.rescore()
+
+        low.refresh_from_db()
+        high.refresh_from_db()
+        self.assertEqual((low.final_score, high.final_score), (Decimal('3.00'), Decimal('15.00')))
+
+    def test_ties_round_half_up_like_calculate_final_score(self):
+        progress = self.grade(5)
+        self.reweight(Decimal('1.75'), Decimal('1.50'))  # 5 * 2.625 = 13.125
+
+        rescoring.rescore()
+
+        progress.refresh_from_db()
+        self.assertEqual(progress.final_score, Decimal('13.13'))
+        self.assertEqual(self.assignment.calculate_final_score(5), progress.final_score)
+
+
+class BulkActionTests(AssignmentTestCase):
+
+    def test_status_change_emails_each_teacher_once(self):
+        mail.outbox.clear()
+
+        bulk.run(bulk.MARK_COMPLETED, [self.assignment.pk], self.admin.pk)
+
+        self.assignment.refresh_from_db()
+        self.assertEqual(self.assignment.status, Assignment.STATUS_COMPLETED)
+        self.assertEqual([message.to for message in mail.outbox], [[self.teacher.email]])
+
+    def test_mail_failure_is_logged_and_keeps_the_changes(self):
+        with mock.patch.object(bulk, 'send_mass_mail', side_effect=ConnectionRefusedError), \
+                self.assertLogs(bulk.logger, 'ERROR'):
+            done = bulk.run(bulk.MARK_COMPLETED, [self.assignment.pk], self.admin.pk)
+
+        self.assertEqual(done, 1)
+        self.assignment.refresh_from_db()
+        self.assertEqual(self.assignment.status, Assignment.STATUS_COMPLETED)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'SQLite serializes writers')
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConcurrentCompletedQuantityTests(TransactionTestCase):
+    """Parallel writers on committed rows, each thread on its own connection."""
+
+    workers = 8
+    items = 40
+
+    def setUp(self):
+        cache.clear()
+        admin = User.objects.create_user(username='admin', email='admin@example.com', role=User.ROLE_ADMIN)
+        teacher = User.objects.create_user(username='teacher', email='teacher@example.com', role=User.ROLE_TEACHER)
+        category = Category.objects.create(name='Maqola', slug='maqola')
+        self.assignment = Assignment.objects.create(
+            teacher=teacher, category=category, required_quantity=self.items,
+            deadline=timezone.now() + timedelta(days=30), assigned_by=admin,
+        )
+
+    def run_parallel(self, func, args):
+        def run(arg):
+            try:
+                func(arg)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(self.workers) as pool:
+            list(pool.map(run, args))
+        self.assignment.refresh_from_db()
+
+    def test_parallel_submissions_are_not_lost(self):
+        def submit(_):
+            AssignmentProgress.objects.create(assignment=Assignment.objects.get(pk=self.assignment.pk), counted=True)
+
+        self.run_parallel(submit, range(self.items))
+
+        self.assertEqual(self.assignment.completed_quantity, self.items)
+        self.assertEqual(self.assignment.status, Assignment.STATUS_COMPLETED)
+
+    def test_racing_uncounts_count_once(self):
+        AssignmentProgress.objects.bulk_create([
+            AssignmentProgress(assignment=self.assignment, counted=True) for _ in range(self.items)
+        ])
+        Assignment.objects.filter(pk=self.assignment.pk).update(completed_quantity=self.items)
+
+        def uncount(pk):
+            progress = AssignmentProgress.objects.get(pk=pk)
+            progress.counted = False
+            progress.save()
+
+        # Every item is un-counted by two racing writers
+        self.run_parallel(uncount, list(self.assignment.progress_items.values_list('pk', flat=True)) * 2)
+
+        self.assertEqual(self.assignment.completed_quantity, 0)
@@ -5,19 +5,27 @@ Teachers can view their assignments.
 """
 
 import json
-from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.core.cache import cache
 from django.views import View
 from django.views.decorators.csrf import csrf_protect
 from django.utils.decorators import method_decorator
 from django.utils import timezone
 from django.utils.text import slugify
-from django.db.models import Q, Sum, Count
+from django.db.models import Q, Sum, Count, Min
 from django.core.paginator import Paginator
 
 from apps.accounts.permissions import admin_required, superadmin_required
 from apps.accounts.views import get_client_ip
 from apps.accounts.models import UserActivity
 from .models import Category, Assignment, AssignmentProgress
+from .cache import (
+    get_category_version, category_list_key, CATEGORY_LIST_TIMEOUT,
+    bump_assignment_versions, assignment_scopes,
+    teacher_dashboard_scopes, teacher_dashboard_key, TEACHER_DASHBOARD_TIMEOUT,
+)
+from config.conditional import condition_on_versions
+from config.fastjson import JsonResponse
 
 
 # ==================== CATEGORY VIEWS ====================
@@ -34,14 +42,34 @@ class CategoryListView(View):
         if not request.user.is_authenticated:
             return JsonResponse({'error': 'Authentication required'}, status=401)
         
-        # All authenticated users can see categories
-        categories = Category.objects.filter(is_active=True).order_by('order', 'name')
-        
         # For admin, show all including inactive
-        if request.user.is_superadmin or request.user.is_admin:
-            show_all = request.GET.get('all', 'false').lower() == 'true'
-            if show_all:
-                categories = Category.objects.all().order_by('order', 'name')
+        show_all = (
+            (request.user.is_superadmin or request.user.is_admin)
+            and request.GET.get('all', 'false').lower() == 'true'
+        )
+        variant = 'all' if show_all else 'active'
+        
+        # The list only changes when the version is bumped, so the ETag
+        # can be checked before touching the cache or the database
+        version = get_category_version()
+        etag = f'"categories-{variant}-{version}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            key = category_list_key(version, variant)
+            payload = cache.get(key)
+            if payload is None:
+                payload = self._build_payload(show_all)
+                cache.set(key, payload, CATEGORY_LIST_TIMEOUT)
+            response = JsonResponse(payload)
+        
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    
+    def _build_payload(self, show_all):
+        categories = Category.objects.with_assignment_stats().order_by('order', 'name')
+        if not show_all:
+            categories = categories.filter(is_active=True)
         
         data = [{
             'id': c.id,
@@ -56,13 +84,14 @@ class CategoryListView(View):
             'points': c.points,
             'is_active': c.is_active,
             'order': c.order,
+            'stats': c.assignment_stats,
             'created_at': c.created_at.isoformat(),
         } for c in categories]
         
-        return JsonResponse({
+        return {
             'categories': data,
             'count': len(data)
-        })
+        }
     
     @method_decorator(csrf_protect)
     @method_decorator(admin_required)
@@ -136,17 +165,10 @@ class CategoryDetailView(View):
             return JsonResponse({'error': 'Authentication required'}, status=401)
         
         try:
-            category = Category.objects.get(id=category_id)
+            category = Category.objects.with_assignment_stats().get(id=category_id)
         except Category.DoesNotExist:
             return JsonResponse({'error': 'Category not found'}, status=404)
         
-        # Get assignment stats for this category
-        assignment_stats = Assignment.objects.filter(category=category).aggregate(
-            total=Count('id'),
-            active=Count('id', filter=Q(status='active')),
-            completed=Count('id', filter=Q(status='completed'))
-        )
-        
         return JsonResponse({
             'id': category.id,
             'name': category.name,
@@ -162,7 +184,7 @@ class CategoryDetailView(View):
             'order': category.order,
             'created_at': category.created_at.isoformat(),
             'updated_at': category.updated_at.isoformat(),
-            'stats': assignment_stats
+            'stats': category.assignment_stats
         })
     
     @method_decorator(csrf_protect)
@@ -262,6 +284,8 @@ class AssignmentListView(View):
     POST /api/assignments/ - Create new assignment (Admin/SuperAdmin only)
     """
     
+    # 5 minute bucket: assignments turn overdue as deadlines pass
+    @method_decorator(condition_on_versions(assignment_scopes, bucket=300))
     def get(self, request):
         """List assignments based on user role."""
         if not request.user.is_authenticated:
@@ -294,10 +318,11 @@ class AssignmentListView(View):
         
         # Check and update overdue status
         now = timezone.now()
-        queryset.filter(
+        if queryset.filter(
             status='active',
             deadline__lt=now
-        ).update(status='overdue')
+        ).update(status='overdue'):
+            bump_assignment_versions()
         
         # Ordering
         ordering = request.GET.get('ordering', '-created_at')
@@ -307,11 +332,12 @@ class AssignmentListView(View):
         # Pagination
         page = int(request.GET.get('page', 1))
         page_size = int(request.GET.get('page_size', 20))
-        paginator = Paginator(queryset.select_related('teacher', 'category', 'assigned_by'), page_size)
+        paginator = Paginator(queryset.for_list(now, extra_fields=['description']), page_size)
         page_obj = paginator.get_page(page)
         
         assignments = []
         for a in page_obj:
+            remaining = a.time_remaining_at(now)
             assignments.append({
                 'id': a.id,
                 'title': a.title or f"{a.category.name} topshiriq",
@@ -330,9 +356,9 @@ class AssignmentListView(View):
                 'completed_quantity': a.completed_quantity,
                 'remaining_quantity': a.remaining_quantity,
                 'progress_percentage': a.progress_percentage,
-                'deadline': a.deadline.isoformat(),
-                'time_remaining': a.time_remaining_display,
-                'days_remaining': a.days_remaining,
+                'deadline': a.deadline,
+                'time_remaining': a.time_remaining_display_at(now),
+                'days_remaining': remaining.days,
                 'status': a.status,
                 'status_display': a.get_status_display(),
                 'priority': a.priority,
@@ -342,7 +368,7 @@ class AssignmentListView(View):
                     'id': a.assigned_by.id,
                     'username': a.assigned_by.username,
                 } if a.assigned_by else None,
-                'created_at': a.created_at.isoformat(),
+                'created_at': a.created_at,
             })
         
         return JsonResponse({
@@ -436,14 +462,13 @@ class AssignmentDetailView(View):
     GET/PUT/DELETE /api/assignments/<assignment_id>/
     """
     
+    @method_decorator(condition_on_versions(assignment_scopes, bucket=300))
     def get(self, request, assignment_id):
         if not request.user.is_authenticated:
             return JsonResponse({'error': 'Authentication required'}, status=401)
         
         try:
-            assignment = Assignment.objects.select_related(
-                'teacher', 'category', 'assigned_by'
-            ).get(id=assignment_id)
+            assignment = Assignment.objects.for_detail().get(id=assignment_id)
         except Assignment.DoesNotExist:
             return JsonResponse({'error': 'Assignment not found'}, status=404)
         
@@ -460,7 +485,7 @@ class AssignmentDetailView(View):
             'note': p.note,
             'counted': p.counted,
             'created_at': p.created_at.isoformat(),
-        } for p in assignment.progress_items.select_related('portfolio').all()]
+        } for p in assignment.progress_items.all()]
         
         return JsonResponse({
             'id': assignment.id,
@@ -681,8 +706,15 @@ class TeacherAssignmentDashboardView(View):
     """
     Teacher's assignment dashboard with summary and deadlines.
     GET /api/assignments/my-dashboard/
+    
+    The database part is cached per teacher under the teacher's version
+    scopes, until the next active deadline passes or enters the 7 day
+    urgent window. Time-dependent fields are rendered per request.
     """
     
+    URGENT_WINDOW = timezone.timedelta(days=7)
+    
+    @method_decorator(condition_on_versions(teacher_dashboard_scopes, bucket=300))
     def get(self, request):
         if not request.user.is_authenticated:
             return JsonResponse({'error': 'Authentication required'}, status=401)
@@ -692,58 +724,86 @@ class TeacherAssignmentDashboardView(View):
         if not user.is_teacher:
             return JsonResponse({'error': 'This endpoint is for teachers only'}, status=403)
         
-        # Update overdue assignments
         now = timezone.now()
-        Assignment.objects.filter(
-            teacher=user,
-            status='active',
-            deadline__lt=now
-        ).update(status='overdue')
+        key = teacher_dashboard_key(request)
+        snapshot = cache.get(key)
+        if snapshot is None or snapshot['expires_at'] <= now:
+            # Update overdue assignments
+            if Assignment.objects.filter(
+                teacher=user,
+                status='active',
+                deadline__lt=now
+            ).update(status='overdue'):
+                bump_assignment_versions(teacher_id=user.id)
+                key = teacher_dashboard_key(request)
+            
+            snapshot = self._build_snapshot(user, now)
+            timeout = (snapshot['expires_at'] - now).total_seconds()
+            cache.set(key, snapshot, max(1, int(timeout)))
         
-        # Get assignments
-        assignments = Assignment.objects.filter(teacher=user).select_related('category')
+        return JsonResponse(self._render(snapshot, now))
+    
+    def _build_snapshot(self, user, now):
+        """Per-category status counts in one aggregate, plus the urgent rows."""
+        open_q = Q(status__in=['active', 'overdue'])
+        upcoming = Q(status='active', deadline__gt=now)
         
-        # Stats
-        total = assignments.count()
-        active = assignments.filter(status='active').count()
-        completed = assignments.filter(status='completed').count()
-        overdue = assignments.filter(status='overdue').count()
+        rows = list(Assignment.objects.filter(teacher=user).values(
+            'category__id', 'category__name', 'category__color'
+        ).annotate(
+            total=Count('id'),
+            active=Count('id', filter=Q(status='active')),
+            completed=Count('id', filter=Q(status='completed')),
+            overdue=Count('id', filter=Q(status='overdue')),
+            open_count=Count('id', filter=open_q),
+            total_required=Sum('required_quantity', filter=open_q),
+            total_completed=Sum('completed_quantity', filter=open_q),
+            # The snapshot is valid until one of these moments
+            next_deadline=Min('deadline', filter=upcoming),
+            next_urgent=Min('deadline', filter=upcoming & Q(deadline__gt=now + self.URGENT_WINDOW)),
+        ).order_by())
         
         # Urgent (deadline within 7 days)
-        week_later = now + timezone.timedelta(days=7)
-        urgent = assignments.filter(
+        urgent = list(Assignment.objects.filter(
+            teacher=user,
             status='active',
-            deadline__lte=week_later
-        ).order_by('deadline')
-        
-        urgent_list = [{
-            'id': a.id,
-            'title': a.title or f"{a.category.name} topshiriq",
-            'category': {
-                'name': a.category.name,
-                'color': a.category.color,
-            },
-            'required_quantity': a.required_quantity,
-            'completed_quantity': a.completed_quantity,
-            'remaining_quantity': a.remaining_quantity,
-            'progress_percentage': a.progress_percentage,
-            'deadline': a.deadline.isoformat(),
-            'time_remaining': a.time_remaining_display,
-            'days_remaining': a.days_remaining,
-            'priority': a.priority,
-        } for a in urgent[:10]]
-        
-        # By category summary
-        category_summary = assignments.filter(
-            status__in=['active', 'overdue']
-        ).values(
-            'category__id', 'category__name', 'category__color'
-        ).annotate(
-            total_required=Sum('required_quantity'),
-            total_completed=Sum('completed_quantity'),
-            count=Count('id')
-        )
+            deadline__lte=now + self.URGENT_WINDOW
+        ).select_related('category').only(
+            'id', 'title', 'status', 'priority', 'deadline',
+            'required_quantity', 'completed_quantity',
+            'category__name', 'category__color',
+        ).order_by('deadline')[:10])
+        
+        expires_at = [now + timezone.timedelta(seconds=TEACHER_DASHBOARD_TIMEOUT)]
+        for c in rows:
+            if c['next_deadline']:
+                expires_at.append(c['next_deadline'])
+            if c['next_urgent']:
+                expires_at.append(c['next_urgent'] - self.URGENT_WINDOW)
+        
+        return {'rows': rows, 'urgent': urgent, 'expires_at': min(expires_at)}
+    
+    def _render(self, snapshot, now):
+        urgent_list = []
+        for a in snapshot['urgent']:
+            urgent_list.append({
+                'id': a.id,
+                'title': a.title or f"{a.category.name} topshiriq",
+                'category': {
+                    'name': a.category.name,
+                    'color': a.category.color,
+                },
+                'required_quantity': a.required_quantity,
+                'completed_quantity': a.completed_quantity,
+                'remaining_quantity': a.remaining_quantity,
+                'progress_percentage': a.progress_percentage,
+                'deadline': a.deadline,
+                'time_remaining': a.time_remaining_display_at(now),
+                'days_remaining': a.time_remaining_at(now).days,
+                'priority': a.priority,
+            })
         
+        # By category summary (active and overdue assignments)
         category_list = [{
             'category_id': c['category__id'],
             'category_name': c['category__name'],
@@ -751,28 +811,29 @@ class TeacherAssignmentDashboardView(View):
             'total_required': c['total_required'] or 0,
             'total_completed': c['total_completed'] or 0,
             'remaining': (c['total_required'] or 0) - (c['total_completed'] or 0),
-            'assignment_count': c['count'],
-        } for c in category_summary]
+            'assignment_count': c['open_count'],
+        } for c in snapshot['rows'] if c['open_count']]
         
         # Overall progress
         total_required = sum(c['total_required'] for c in category_list)
         total_completed_items = sum(c['total_completed'] for c in category_list)
         overall_progress = int((total_completed_items / total_required * 100)) if total_required > 0 else 0
         
-        return JsonResponse({
+        rows = snapshot['rows']
+        return {
             'summary': {
-                'total_assignments': total,
-                'active': active,
-                'completed': completed,
-                'overdue': overdue,
+                'total_assignments': sum(c['total'] for c in rows),
+                'active': sum(c['active'] for c in rows),
+                'completed': sum(c['completed'] for c in rows),
+                'overdue': sum(c['overdue'] for c in rows),
                 'total_required_items': total_required,
                 'total_completed_items': total_completed_items,
                 'overall_progress': overall_progress,
             },
             'urgent_assignments': urgent_list,
             'by_category': category_list,
-            'current_time': now.isoformat(),
-        })
+            'current_time': now,
+        }
 
 
 class AssignmentStatsView(View):
@@ -785,10 +846,11 @@ class AssignmentStatsView(View):
     def get(self, request):
         # Update overdue
         now = timezone.now()
-        Assignment.objects.filter(
+        if Assignment.objects.filter(
             status='active',
             deadline__lt=now
-        ).update(status='overdue')
+        ).update(status='overdue'):
+            bump_assignment_versions()
         
         # Overall stats
         total = Assignment.objects.count()
@@ -840,6 +902,7 @@ class AssignmentStatsView(View):
 # ==================== BALL (SCORE) TIZIMI VIEWS ====================
 
 from .models import ScoreHistory
+from .rescoring import schedule_rescore
 
 
 class AssignmentScoreUpdateView(View):
@@ -905,6 +968,7 @@ class AssignmentScoreUpdateView(View):
             return JsonResponse({'error': 'Minimal ball maksimal balldan kichik bo\'lishi kerak'}, status=400)
         
         assignment.save()
+        schedule_rescore(assignment_ids=[assignment.id], changed_by_id=request.user.id)
         
         # Create score history
         new_values = {
@@ -1123,7 +1187,7 @@ class ScoreHistoryListView(View):
             'new_value': h.new_value,
             'note': h.note,
             'changed_by': h.changed_by.get_full_name() if h.changed_by else None,
-            'created_at': h.created_at.isoformat()
+            'created_at': h.created_at
         } for h in page_obj]
         
         return JsonResponse({
@@ -1199,6 +1263,11 @@ class BulkScoreUpdateView(View):
                 'new_max_score': assignment.max_score
             })
         
+        schedule_rescore(
+            assignment_ids=[assignment.id for assignment in assignments], changed_by_id=request.user.id,
+            note=f'Bulk update: {score_note}',
+        )
+        
         # Log activity
         UserActivity.objects.create(
             user=request.user,
@@ -1269,6 +1338,7 @@ class CategoryScoreUpdateView(View):
             }, status=400)
         
         category.save()
+        schedule_rescore(category_id=category.id, changed_by_id=request.user.id)
         
         # Log activity
         UserActivity.objects.create(
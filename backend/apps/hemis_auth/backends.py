@@ -2,17 +2,28 @@
 Hemis OAuth 2.0 authentication backend.
 """
 
+import random
+import threading
 import requests
 import logging
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import BaseBackend
 from django.utils import timezone
 from datetime import timedelta
 
+from apps.accounts.cache import get_cached_user
+
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+# Usernames checked per query when picking a free one
+USERNAME_BATCH = 20
+
 
 class HemisOAuth2Backend(BaseBackend):
     """
@@ -32,19 +43,23 @@ class HemisOAuth2Backend(BaseBackend):
             return None
         
         try:
-            # Try to find existing user
-            user = User.objects.get(hemis_id=hemis_id)
+            # Token columns are only written, never read, during login
+            user = User.objects.defer('hemis_access_token', 'hemis_refresh_token').get(hemis_id=hemis_id)
+            
+            changed = []
             
             # Update tokens
             if access_token:
                 user.hemis_access_token = access_token
                 user.hemis_token_expires_at = timezone.now() + timedelta(hours=1)
+                changed += ['hemis_access_token', 'hemis_token_expires_at']
             
             # Update user data from Hemis if provided
             if user_data:
-                self._update_user_from_hemis(user, user_data)
+                changed += self._update_user_from_hemis(user, user_data)
             
-            user.save()
+            if changed:
+                user.save(update_fields=changed + ['updated_at'])
             logger.info(f"User {user.username} authenticated via Hemis OAuth 2.0")
             return user
             
@@ -63,26 +78,33 @@ class HemisOAuth2Backend(BaseBackend):
             return None
     
     def get_user(self, user_id):
-        """Get user by ID."""
-        try:
-            return User.objects.get(pk=user_id)
-        except User.DoesNotExist:
-            return None
+        """Get user by ID from the cached snapshot (token fields deferred)."""
+        return get_cached_user(user_id)
+    
+    def _allocate_username(self, base_username):
+        """
+        Return ``base_username`` or the first free ``base_username_<n>``.
+        Candidates are checked a batch at a time with ``username__in``,
+        which the username index answers.
+        """
+        start = 0
+        while True:
+            candidates = [
+                f"{base_username}_{n}" if n else base_username
+                for n in range(start, start + USERNAME_BATCH)
+            ]
+            taken = set(User.objects.filter(username__in=candidates).values_list('username', flat=True))
+            for candidate in candidates:
+                if candidate not in taken:
+                    return candidate
+            start += USERNAME_BATCH
     
     def _create_user_from_hemis(self, hemis_id, access_token, user_data):
         """Create a new user from Hemis data."""
-        username = user_data.get('username') or user_data.get('login') or f"hemis_{hemis_id}"
+        base_username = user_data.get('username') or user_data.get('login') or f"hemis_{hemis_id}"
         email = user_data.get('email', '')
         
-        # Ensure unique username
-        base_username = username
-        counter = 1
-        while User.objects.filter(username=username).exists():
-            username = f"{base_username}_{counter}"
-            counter += 1
-        
-        user = User.objects.create(
-            username=username,
+        user = User(
             email=email,
             hemis_id=hemis_id,
             hemis_access_token=access_token,
@@ -96,22 +118,128 @@ class HemisOAuth2Backend(BaseBackend):
         
         # Set unusable password since they authenticate via Hemis
         user.set_unusable_password()
-        user.save()
         
-        return user
+        # A concurrent login may claim the same username; allocate again
+        for attempt in range(3):
+            user.username = self._allocate_username(base_username)
+            try:
+                with transaction.atomic():
+                    user.save(force_insert=True)
+                return user
+            except IntegrityError:
+                if attempt == 2 or User.objects.filter(hemis_id=hemis_id).exists():
+                    raise
     
     def _update_user_from_hemis(self, user, user_data):
-        """Update existing user with data from Hemis."""
-        if user_data.get('email'):
-            user.email = user_data['email']
-        if user_data.get('first_name') or user_data.get('firstname'):
-            user.first_name = user_data.get('first_name', user_data.get('firstname', ''))
-        if user_data.get('last_name') or user_data.get('lastname'):
-            user.last_name = user_data.get('last_name', user_data.get('lastname', ''))
-        if user_data.get('department') or user_data.get('faculty'):
-            user.department = user_data.get('department', user_data.get('faculty', ''))
-        if user_data.get('position') or user_data.get('employee_type'):
-            user.position = user_data.get('position', user_data.get('employee_type', ''))
+        """
+        Apply changed Hemis profile data to ``user``.
+        
+        Returns:
+            List of field names that actually changed
+        """
+        incoming = {
+            'email': user_data.get('email'),
+            'first_name': user_data.get('first_name', user_data.get('firstname', '')),
+            'last_name': user_data.get('last_name', user_data.get('lastname', '')),
+            'department': user_data.get('department', user_data.get('faculty', '')),
+            'position': user_data.get('position', user_data.get('employee_type', '')),
+        }
+        
+        changed = []
+        for field, value in incoming.items():
+            # Empty values from Hemis never clear existing data
+            if value and getattr(user, field) != value:
+                setattr(user, field, value)
+                changed.append(field)
+        return changed
+
+
+class JitteredRetry(Retry):
+    """urllib3 Retry with randomized backoff so retries from many workers spread out."""
+    
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff else 0
+
+
+def build_session():
+    """
+    requests.Session with a keep-alive connection pool.
+    
+    Connection errors are retried for every method (nothing reached the
+    server). Read errors and 5xx responses are only retried for GET, since
+    re-posting an authorization code would fail with "code already used".
+    """
+    config = settings.HEMIS_OAUTH2
+    retry = JitteredRetry(
+        total=config.get('RETRIES', 2),
+        connect=config.get('RETRIES', 2),
+        read=config.get('RETRIES', 2),
+        status=config.get('RETRIES', 2),
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({'GET'}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=config.get('POOL_SIZE', 20),
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide pooled session shared by every HemisOAuth2Client."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+class CircuitBreaker:
+    """
+    Stop calling Hemis for a cool-down period after repeated failures.
+    
+    State lives in the shared cache so every gunicorn/Celery process
+    backs off together instead of each one timing out on its own.
+    """
+    
+    def __init__(self, name, threshold=5, window=60, cooldown=30):
+        self.failures_key = f'circuit:{name}:failures'
+        self.open_key = f'circuit:{name}:open'
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+    
+    def is_open(self):
+        return bool(cache.get(self.open_key))
+    
+    def record_success(self):
+        cache.delete(self.failures_key)
+    
+    def record_failure(self):
+        cache.add(self.failures_key, 0, self.window)
+        try:
+            failures = cache.incr(self.failures_key)
+        except ValueError:
+            failures = 1
+        if failures >= self.threshold:
+            logger.error(f"Circuit {self.open_key} opened after {failures} failures")
+            cache.set(self.open_key, True, self.cooldown)
+            cache.delete(self.failures_key)
+
+
+hemis_circuit = CircuitBreaker('hemis')
 
 
 class HemisOAuth2Client:
@@ -119,7 +247,7 @@ class HemisOAuth2Client:
     Client for Hemis OAuth 2.0 API.
     """
     
-    def __init__(self):
+    def __init__(self, session=None):
         self.config = settings.HEMIS_OAUTH2
         self.client_id = self.config['CLIENT_ID']
         self.client_secret = self.config['CLIENT_SECRET']
@@ -128,6 +256,11 @@ class HemisOAuth2Client:
         self.userinfo_url = self.config['USERINFO_URL']
         self.redirect_uri = self.config['REDIRECT_URI']
         self.scope = self.config.get('SCOPE', 'openid profile email')
+        self.timeout = (
+            self.config.get('CONNECT_TIMEOUT', 3.05),
+            self.config.get('READ_TIMEOUT', 10),
+        )
+        self.session = session or get_session()
     
     def get_authorization_url(self, state=None):
         """
@@ -152,6 +285,42 @@ class HemisOAuth2Client:
         query_string = '&'.join(f"{k}={v}" for k, v in params.items())
         return f"{self.authorization_url}?{query_string}"
     
+    def _request(self, method, url, description, rejected_statuses=(), **kwargs):
+        """
+        Send a request through the pooled session and circuit breaker.
+        
+        Raises:
+            HemisTokenRejected: The response status is in ``rejected_statuses``
+        
+        Returns:
+            Parsed JSON dict, or None on error / open circuit
+        """
+        if hemis_circuit.is_open():
+            logger.warning(f"{description} skipped: Hemis circuit is open")
+            return None
+        
+        try:
+            response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            hemis_circuit.record_failure()
+            logger.error(f"{description} request error: {e}")
+            return None
+        
+        # Only an answer that worked proves Hemis is healthy: a stream of
+        # 4xx (e.g. dead refresh tokens) must not keep resetting the breaker
+        if response.status_code >= 500 or response.status_code == 429:
+            hemis_circuit.record_failure()
+        elif response.status_code < 400:
+            hemis_circuit.record_success()
+        
+        if response.status_code == 200:
+            return response.json()
+        
+        logger.error(f"{description} failed: {response.status_code} - {response.text}")
+        if response.status_code in rejected_statuses:
+            raise HemisTokenRejected(f"{description} rejected with {response.status_code}")
+        return None
+    
     def exchange_code_for_token(self, code):
         """
         Exchange authorization code for access token.
@@ -162,28 +331,13 @@ class HemisOAuth2Client:
         Returns:
             Token response dict or None on error
         """
-        try:
-            response = requests.post(
-                self.token_url,
-                data={
-                    'grant_type': 'authorization_code',
-                    'code': code,
-                    'redirect_uri': self.redirect_uri,
-                    'client_id': self.client_id,
-                    'client_secret': self.client_secret,
-                },
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"Token exchange failed: {response.status_code} - {response.text}")
-                return None
-                
-        except requests.RequestException as e:
-            logger.error(f"Token exchange request error: {e}")
-            return None
+        return self._request('POST', self.token_url, 'Token exchange', data={
+            'grant_type': 'authorization_code',
+            'code': code,
+            'redirect_uri': self.redirect_uri,
+            'client_id': self.client_id,
+            'client_secret': self.client_secret,
+        })
     
     def get_user_info(self, access_token):
         """
@@ -195,24 +349,9 @@ class HemisOAuth2Client:
         Returns:
             User info dict or None on error
         """
-        try:
-            response = requests.get(
-                self.userinfo_url,
-                headers={
-                    'Authorization': f'Bearer {access_token}'
-                },
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"User info request failed: {response.status_code} - {response.text}")
-                return None
-                
-        except requests.RequestException as e:
-            logger.error(f"User info request error: {e}")
-            return None
+        return self._request('GET', self.userinfo_url, 'User info', headers={
+            'Authorization': f'Bearer {access_token}'
+        })
     
     def refresh_token(self, refresh_token):
         """
@@ -221,27 +360,59 @@ class HemisOAuth2Client:
         Args:
             refresh_token: OAuth 2.0 refresh token
             
+        Raises:
+            HemisTokenRejected: Hemis answered 400/401, the refresh token
+                is invalid, expired or revoked and retrying cannot help
+        
         Returns:
             New token response dict or None on error
         """
-        try:
-            response = requests.post(
-                self.token_url,
-                data={
-                    'grant_type': 'refresh_token',
-                    'refresh_token': refresh_token,
-                    'client_id': self.client_id,
-                    'client_secret': self.client_secret,
-                },
-                timeout=30
-            )
+        return self._request('POST', self.token_url, 'Token refresh', rejected_statuses=(400, 401), data={
+            'grant_type': 'refresh_token',
+            'refresh_token': refresh_token,
+            'client_id': self.client_id,
+            'client_secret': self.client_secret,
+        })
+    
+    def iter_employee_pages(self, updated_since=None, page_size=200):
+        """
+        Yield pages (lists of dicts) from the Hemis employee directory.
+        
+        Uses the service API token, not a user's access token. Stops at the
+        last page, or early (after logging) if a page cannot be fetched.
+        
+        Args:
+            updated_since: Only employees changed after this datetime
+            page_size: Items requested per page
+        """
+        params = {'limit': page_size}
+        if updated_since:
+            params['updated_since'] = int(updated_since.timestamp())
+        
+        page = 1
+        while True:
+            payload = self._request('GET', self.config['EMPLOYEES_URL'], 'Employee directory', params={
+                **params, 'page': page,
+            }, headers={
+                'Authorization': f"Bearer {self.config.get('API_TOKEN', '')}"
+            })
+            if payload is None:
+                raise HemisUnavailable(f"Employee directory page {page} could not be fetched")
             
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"Token refresh failed: {response.status_code} - {response.text}")
-                return None
-                
-        except requests.RequestException as e:
-            logger.error(f"Token refresh request error: {e}")
-            return None
+            data = payload.get('data', payload)
+            items = data.get('items', [])
+            if items:
+                yield items
+            
+            page_count = data.get('pagination', {}).get('pageCount', page)
+            if not items or page >= page_count:
+                return
+            page += 1
+
+
+class HemisUnavailable(Exception):
+    """Hemis could not be reached (network error, 5xx or open circuit)."""
+
+
+class HemisTokenRejected(Exception):
+    """Hemis refused a token (400/401); it will not work on a retry either."""
@@ -0,0 +1,180 @@
+"""
+Hemis employee directory sync.
+
+Pulls the employee list page by page and upserts teachers with
+``bulk_create(update_conflicts=True)`` keyed on ``hemis_id``: one INSERT
+... ON CONFLICT per page instead of one row write per login. The newest
+``updated_at`` seen becomes the watermark for the next incremental run.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from apps.accounts.cache import invalidate_cached_users
+from .backends import HemisOAuth2Client
+from .models import DirectorySyncState
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# Directory-owned columns refreshed on every sync. Email, role and tokens
+# stay under the control of login and the admins.
+SYNCED_FIELDS = ['first_name', 'last_name', 'department', 'position', 'updated_at']
+
+# Re-read a little before the watermark to tolerate clock skew in Hemis
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+
+def _name(value):
+    """Hemis returns related objects as {'name': ...} or plain strings."""
+    if isinstance(value, dict):
+        return value.get('name') or ''
+    return value or ''
+
+
+def normalize_employee(item):
+    """Map a Hemis employee record onto User field values."""
+    hemis_id = item.get('id') or item.get('employee_id_number')
+    return {
+        'hemis_id': str(hemis_id) if hemis_id else '',
+        'username': item.get('login') or item.get('employee_id_number') or '',
+        'email': item.get('email') or '',
+        'first_name': (item.get('first_name') or item.get('firstname') or '')[:150],
+        'last_name': (item.get('second_name') or item.get('last_name') or item.get('lastname') or '')[:150],
+        'department': _name(item.get('department') or item.get('faculty'))[:255],
+        'position': _name(item.get('staffPosition') or item.get('position') or item.get('employee_type'))[:255],
+        'changed_at': _parse_updated_at(item.get('updated_at')),
+    }
+
+
+def _parse_updated_at(value):
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=dt_timezone.utc)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    return None
+
+
+def upsert_employees(records):
+    """
+    Insert new teachers and refresh directory fields of existing ones.
+
+    Args:
+        records: Normalized employee dicts (see normalize_employee)
+
+    Returns:
+        (created, updated) counts
+    """
+    by_hemis_id = {r['hemis_id']: r for r in records if r['hemis_id']}
+    if not by_hemis_id:
+        return 0, 0
+
+    # hemis_id -> (pk, username); existing rows keep their own username so
+    # the insert can only conflict on hemis_id
+    existing = {
+        hemis_id: (pk, username)
+        for hemis_id, pk, username in User.objects.filter(
+            hemis_id__in=by_hemis_id
+        ).values_list('hemis_id', 'id', 'username')
+    }
+
+    # Usernames for new rows: the Hemis login if free, else hemis_<id>
+    new_ids = [h for h in by_hemis_id if h not in existing]
+    wanted = {h: (by_hemis_id[h]['username'] or f'hemis_{h}') for h in new_ids}
+    taken = set(
+        User.objects.filter(
+            username__in=list(wanted.values()) + [f'hemis_{h}' for h in new_ids]
+        ).values_list('username', flat=True)
+    )
+
+    now = timezone.now()
+    unusable_password = make_password(None)
+    users = []
+    for hemis_id, record in by_hemis_id.items():
+        if hemis_id in existing:
+            username = existing[hemis_id][1]
+        else:
+            username = wanted[hemis_id]
+            if username in taken:
+                username = f'hemis_{hemis_id}'
+                if username in taken:
+                    logger.warning(f"No free username for Hemis employee {hemis_id}, skipped")
+                    continue
+            taken.add(username)
+
+        users.append(User(
+            hemis_id=hemis_id,
+            username=username,
+            email=record['email'],
+            first_name=record['first_name'],
+            last_name=record['last_name'],
+            department=record['department'],
+            position=record['position'],
+            role=User.ROLE_TEACHER,
+            password=unusable_password,
+            date_joined=now,
+        ))
+
+    User.objects.bulk_create(
+        users,
+        update_conflicts=True,
+        unique_fields=['hemis_id'],
+        update_fields=SYNCED_FIELDS,
+    )
+
+    # bulk_create sends no signals; drop request.user snapshots ourselves
+    if existing:
+        invalidate_cached_users(pk for pk, _ in existing.values())
+
+    updated = len(existing)
+    return len(users) - updated, updated
+
+
+def sync_employees(full=False, page_size=200, client=None):
+    """
+    Run an employee directory sync.
+
+    Args:
+        full: Ignore the watermark and fetch the whole directory
+        page_size: Employees per Hemis page (and per upsert)
+        client: HemisOAuth2Client to use (defaults to a pooled one)
+
+    Returns:
+        Stats dict with created/updated/pages counts
+    """
+    client = client or HemisOAuth2Client()
+    state, _ = DirectorySyncState.objects.get_or_create(name='employees')
+    since = None if full or state.watermark is None else state.watermark - WATERMARK_OVERLAP
+
+    started_at = timezone.now()
+    stats = {'created': 0, 'updated': 0, 'pages': 0, 'full': since is None}
+    newest = state.watermark
+
+    for items in client.iter_employee_pages(updated_since=since, page_size=page_size):
+        records = [normalize_employee(item) for item in items]
+        created, updated = upsert_employees(records)
+        stats['created'] += created
+        stats['updated'] += updated
+        stats['pages'] += 1
+
+        for record in records:
+            changed_at = record['changed_at']
+            if changed_at and (newest is None or changed_at > newest):
+                newest = changed_at
+
+    # Only advance the watermark after every page was applied
+    state.watermark = newest or started_at
+    state.last_run_at = started_at
+    state.last_stats = stats
+    state.save()
+
+    logger.info(f"Hemis directory sync: {stats}")
+    return stats
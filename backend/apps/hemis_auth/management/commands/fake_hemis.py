@@ -0,0 +1,174 @@
+"""
+Management command to run a local fake Hemis OAuth 2.0 server.
+
+Useful for development and load testing the login flow without the real
+Hemis. Point the backend at it with:
+
+    HEMIS_AUTHORIZATION_URL=http://127.0.0.1:8090/oauth/authorize
+    HEMIS_TOKEN_URL=http://127.0.0.1:8090/oauth/token
+    HEMIS_USERINFO_URL=http://127.0.0.1:8090/oauth/userinfo
+    HEMIS_EMPLOYEES_URL=http://127.0.0.1:8090/rest/v1/data/employee-list
+
+The authorize endpoint redirects straight back with a code. Codes and
+access tokens encode the Hemis user id, so ``?login=<id>`` on the
+authorize URL selects which fake teacher signs in. The employee list
+serves ``--employees`` generated staff records for the directory sync.
+"""
+
+import json
+import random
+import secrets
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from django.core.management.base import BaseCommand
+
+
+class FakeHemisHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real server
+    latency = 0.0
+    failure_rate = 0.0
+    employees = 0
+    started_at = int(time.time())
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if url.path == '/oauth/authorize':
+            hemis_id = params.get('login', str(random.randint(1, 10000)))
+            query = urlencode({'code': f'code-{hemis_id}-{secrets.token_hex(4)}', 'state': params.get('state', '')})
+            self.send_response(302)
+            self.send_header('Location', f"{params.get('redirect_uri', '/')}?{query}")
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if url.path == '/oauth/userinfo':
+            if not self._simulate():
+                return
+            token = self.headers.get('Authorization', '').removeprefix('Bearer ')
+            if not token.startswith('access-'):
+                return self._json(401, {'error': 'invalid_token'})
+            hemis_id = token.split('-')[1]
+            return self._json(200, {
+                'id': hemis_id,
+                'login': f'teacher{hemis_id}',
+                'email': f'teacher{hemis_id}@hemis.example.uz',
+                'firstname': 'Test',
+                'lastname': f'Teacher {hemis_id}',
+                'faculty': 'Fake faculty',
+                'employee_type': "O'qituvchi",
+            })
+
+        if url.path == '/rest/v1/data/employee-list':
+            if not self._simulate():
+                return
+            return self._json(200, {'success': True, 'data': self._employee_page(params)})
+
+        self._json(404, {'error': 'not_found'})
+
+    def _employee_page(self, params):
+        """One page of generated employees; employee i was updated at started_at + i."""
+        limit = max(1, min(int(params.get('limit', 200)), 1000))
+        page = max(1, int(params.get('page', 1)))
+        first = 0
+        if params.get('updated_since'):
+            first = max(0, int(params['updated_since']) - self.started_at + 1)
+        total = max(0, self.employees - first)
+
+        start = first + (page - 1) * limit
+        items = [{
+            'id': 100000 + i,
+            'employee_id_number': f'EMP{i:06d}',
+            'first_name': f'Ism{i}',
+            'second_name': f'Familiya{i}',
+            'department': {'name': f'Kafedra {i % 40}'},
+            'staffPosition': {'name': "Katta o'qituvchi" if i % 3 else 'Dotsent'},
+            'updated_at': self.started_at + i,
+        } for i in range(start, min(start + limit, self.employees))]
+
+        return {
+            'items': items,
+            'pagination': {
+                'totalCount': total,
+                'pageSize': limit,
+                'pageCount': (total + limit - 1) // limit,
+                'page': page,
+            },
+        }
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        data = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+
+        if url.path != '/oauth/token':
+            return self._json(404, {'error': 'not_found'})
+        if not self._simulate():
+            return
+
+        if data.get('grant_type') == 'authorization_code':
+            hemis_id = data.get('code', '').split('-')[1] if data.get('code', '').startswith('code-') else None
+        elif data.get('grant_type') == 'refresh_token':
+            hemis_id = data.get('refresh_token', '').split('-')[1] if data.get('refresh_token', '').startswith('refresh-') else None
+        else:
+            return self._json(400, {'error': 'unsupported_grant_type'})
+
+        if not hemis_id:
+            return self._json(400, {'error': 'invalid_grant'})
+
+        self._json(200, {
+            'access_token': f'access-{hemis_id}-{secrets.token_hex(8)}',
+            'refresh_token': f'refresh-{hemis_id}-{secrets.token_hex(8)}',
+            'token_type': 'Bearer',
+            'expires_in': 3600,
+        })
+
+    def _simulate(self):
+        """Apply configured latency and random 503s. Returns False if failed."""
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            self._json(503, {'error': 'temporarily_unavailable'})
+            return False
+        return True
+
+    def _json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Run a fake Hemis OAuth 2.0 server for local development and load tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8090)
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to each API call')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of API calls answered with 503')
+        parser.add_argument('--employees', type=int, default=1000, help='Size of the fake employee directory')
+
+    def handle(self, *args, **options):
+        FakeHemisHandler.latency = options['latency']
+        FakeHemisHandler.failure_rate = options['failure_rate']
+        FakeHemisHandler.employees = options['employees']
+
+        server = ThreadingHTTPServer((options['host'], options['port']), FakeHemisHandler)
+        self.stdout.write(self.style.SUCCESS(
+            f"Fake Hemis listening on http://{options['host']}:{options['port']}/oauth/"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,40 @@
+"""
+Management command to sync teachers from the Hemis employee directory.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.hemis_auth.backends import HemisUnavailable
+from apps.hemis_auth.directory import sync_employees
+
+
+class Command(BaseCommand):
+    help = 'Upsert teachers and departments from the Hemis employee directory'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Ignore the stored watermark and fetch the whole directory',
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=200,
+            help='Employees per Hemis page',
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            stats = sync_employees(full=options['full'], page_size=options['page_size'])
+        except HemisUnavailable as e:
+            raise CommandError(str(e))
+
+        mode = 'full' if stats['full'] else 'incremental'
+        self.stdout.write(self.style.SUCCESS(
+            f"{mode} sync: {stats['created']} created, {stats['updated']} updated "
+            f"from {stats['pages']} pages in {time.perf_counter() - start:.1f}s"
+        ))
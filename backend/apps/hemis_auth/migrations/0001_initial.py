@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirectorySyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='name')),
+                ('watermark', models.DateTimeField(blank=True, help_text='Records updated in Hemis after this time are fetched on the next run', null=True, verbose_name='watermark')),
+                ('last_run_at', models.DateTimeField(blank=True, null=True, verbose_name='last run at')),
+                ('last_stats', models.JSONField(blank=True, default=dict, verbose_name='last stats')),
+            ],
+            options={
+                'verbose_name': 'directory sync state',
+                'verbose_name_plural': 'directory sync states',
+            },
+        ),
+    ]
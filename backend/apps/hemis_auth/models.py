@@ -0,0 +1,30 @@
+"""
+Models for Hemis integration state.
+"""
+
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class DirectorySyncState(models.Model):
+    """
+    Watermark for incremental Hemis directory syncs.
+    One row per synced resource (e.g. 'employees').
+    """
+    
+    name = models.CharField(_('name'), max_length=50, unique=True)
+    watermark = models.DateTimeField(
+        _('watermark'),
+        null=True,
+        blank=True,
+        help_text=_('Records updated in Hemis after this time are fetched on the next run')
+    )
+    last_run_at = models.DateTimeField(_('last run at'), null=True, blank=True)
+    last_stats = models.JSONField(_('last stats'), default=dict, blank=True)
+    
+    class Meta:
+        verbose_name = _('directory sync state')
+        verbose_name_plural = _('directory sync states')
+    
+    def __str__(self):
+        return f"{self.name} @ {self.watermark or 'never'}"
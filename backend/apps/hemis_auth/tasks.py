@@ -0,0 +1,108 @@
+"""
+Celery tasks for Hemis OAuth 2.0 integration.
+"""
+
+from celery import shared_task
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from datetime import timedelta
+import logging
+
+from .backends import HemisOAuth2Client, HemisTokenRejected, hemis_circuit
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+@shared_task(ignore_result=True)
+def refresh_expiring_hemis_tokens(batch_size=100):
+    """
+    Refresh Hemis access tokens that expire within REFRESH_AHEAD_MINUTES.
+    
+    Only tokens of users who logged in within SESSION_COOKIE_AGE (their
+    session may still be alive) and that expired at most
+    REFRESH_GRACE_MINUTES ago are considered; everyone else refreshes on
+    their next login. A refresh token Hemis rejects (400/401) is cleared
+    so it is not retried every run.
+    
+    Users are processed in batches and saved with one bulk_update per
+    batch. Stops early if the Hemis circuit breaker opens.
+    """
+    ahead = settings.HEMIS_OAUTH2.get('REFRESH_AHEAD_MINUTES', 10)
+    grace = settings.HEMIS_OAUTH2.get('REFRESH_GRACE_MINUTES', 60)
+    now = timezone.now()
+    
+    user_ids = list(
+        User.objects.filter(
+            is_active=True,
+            hemis_refresh_token__isnull=False,
+            hemis_token_expires_at__gt=now - timedelta(minutes=grace),
+            hemis_token_expires_at__lte=now + timedelta(minutes=ahead),
+            last_login__gte=now - timedelta(seconds=settings.SESSION_COOKIE_AGE),
+        )
+        .exclude(hemis_refresh_token='')
+        .order_by('hemis_token_expires_at')
+        .values_list('id', flat=True)
+    )
+    
+    client = HemisOAuth2Client()
+    refreshed = failed = rejected = 0
+    
+    for start in range(0, len(user_ids), batch_size):
+        if hemis_circuit.is_open():
+            logger.warning("Hemis circuit open, postponing remaining token refreshes")
+            break
+        
+        users = User.objects.filter(id__in=user_ids[start:start + batch_size]).only(
+            'id', 'hemis_access_token', 'hemis_refresh_token', 'hemis_token_expires_at'
+        )
+        updated = []
+        for user in users:
+            try:
+                token_response = client.refresh_token(user.hemis_refresh_token)
+            except HemisTokenRejected:
+                # Dead token: the user has to log in through Hemis again
+                user.hemis_refresh_token = ''
+                updated.append(user)
+                rejected += 1
+                continue
+            if not token_response or not token_response.get('access_token'):
+                failed += 1
+                continue
+            
+            user.hemis_access_token = token_response['access_token']
+            # Refresh tokens may be rotated
+            user.hemis_refresh_token = token_response.get('refresh_token') or user.hemis_refresh_token
+            user.hemis_token_expires_at = timezone.now() + timedelta(
+                seconds=int(token_response.get('expires_in', 3600))
+            )
+            updated.append(user)
+            refreshed += 1
+        
+        User.objects.bulk_update(
+            updated, ['hemis_access_token', 'hemis_refresh_token', 'hemis_token_expires_at']
+        )
+    
+    return f"Refreshed {refreshed} Hemis tokens, {rejected} rejected, {failed} failed"
+
+
+@shared_task(ignore_result=True)
+def sync_hemis_directory(full=False):
+    """
+    Incrementally sync the Hemis employee directory into User rows.
+    
+    Args:
+        full: Ignore the stored watermark and fetch everything
+    """
+    from .backends import HemisUnavailable
+    from .directory import sync_employees
+    
+    try:
+        stats = sync_employees(full=full)
+    except HemisUnavailable as e:
+        logger.error(f"Hemis directory sync aborted: {e}")
+        return f"Aborted: {e}"
+    
+    return f"Created {stats['created']}, updated {stats['updated']} users from {stats['pages']} pages"
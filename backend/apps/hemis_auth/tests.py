@@ -0,0 +1,235 @@
+"""
+Tests for the Hemis integration, run against the fake Hemis server
+(``manage.py fake_hemis``) on a free local port.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from http.server import ThreadingHTTPServer
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .backends import USERNAME_BATCH, HemisOAuth2Backend, HemisUnavailable, hemis_circuit
+from .directory import WATERMARK_OVERLAP, sync_employees
+from .management.commands.fake_hemis import FakeHemisHandler
+from .models import DirectorySyncState
+from .tasks import refresh_expiring_hemis_tokens
+
+User = get_user_model()
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class FakeHemisTestCase(TestCase):
+    """Serves a fresh FakeHemisHandler subclass for the test class."""
+
+    employees = 0
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.handler = type('Handler', (FakeHemisHandler,), {
+            'employees': cls.employees,
+            'started_at': int(time.time()),
+            'failure_rate': 0.0,
+            'token_requests': 0,
+            'do_POST': cls._counting_post,
+        })
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), cls.handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+        base = f'http://127.0.0.1:{cls.server.server_port}'
+        cls.fake_settings = override_settings(CACHES=LOCMEM_CACHES, HEMIS_OAUTH2={
+            **settings.HEMIS_OAUTH2,
+            'TOKEN_URL': f'{base}/oauth/token',
+            'USERINFO_URL': f'{base}/oauth/userinfo',
+            'EMPLOYEES_URL': f'{base}/rest/v1/data/employee-list',
+        })
+        cls.fake_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.fake_settings.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    @staticmethod
+    def _counting_post(handler):
+        type(handler).token_requests += 1
+        FakeHemisHandler.do_POST(handler)
+
+    def setUp(self):
+        cache.clear()
+        self.handler.failure_rate = 0.0
+        self.handler.token_requests = 0
+
+
+class RefreshExpiringTokensTests(FakeHemisTestCase):
+
+    def make_user(self, name, refresh_token=None, expires_in=timedelta(minutes=5), last_login=timedelta(hours=1)):
+        now = timezone.now()
+        return User.objects.create_user(
+            username=name, email=f'{name}@example.com', role='teacher',
+            hemis_id=name, hemis_access_token=f'access-{name}-old',
+            hemis_refresh_token=refresh_token if refresh_token is not None else f'refresh-{name}-old',
+            hemis_token_expires_at=now + expires_in, last_login=now - last_login,
+        )
+
+    def test_refreshes_only_active_users_within_window(self):
+        due = self.make_user('due')
+        idle = self.make_user('idle', last_login=timedelta(days=30))
+        long_expired = self.make_user('stale', expires_in=-timedelta(days=2))
+        not_due = self.make_user('later', expires_in=timedelta(hours=2))
+
+        refresh_expiring_hemis_tokens()
+
+        self.assertEqual(self.handler.token_requests, 1)
+        due.refresh_from_db()
+        self.assertTrue(due.hemis_access_token.startswith('access-due-'))
+        self.assertNotEqual(due.hemis_access_token, 'access-due-old')
+        self.assertGreater(due.hemis_token_expires_at, timezone.now() + timedelta(minutes=50))
+        for user in (idle, long_expired, not_due):
+            user.refresh_from_db()
+            self.assertTrue(user.hemis_access_token.endswith('-old'))
+
+    def test_rejected_refresh_token_is_cleared_and_not_retried(self):
+        user = self.make_user('revoked', refresh_token='revoked-token')
+
+        result = refresh_expiring_hemis_tokens()
+
+        self.assertIn('1 rejected', result)
+        user.refresh_from_db()
+        self.assertEqual(user.hemis_refresh_token, '')
+        refresh_expiring_hemis_tokens()
+        self.assertEqual(self.handler.token_requests, 1)
+
+    def test_server_errors_open_the_circuit_and_keep_tokens_for_retry(self):
+        users = [self.make_user(f'user{i}') for i in range(8)]
+        self.handler.failure_rate = 1.0
+
+        result = refresh_expiring_hemis_tokens()
+
+        self.assertTrue(hemis_circuit.is_open())
+        self.assertEqual(self.handler.token_requests, hemis_circuit.threshold)
+        self.assertIn('8 failed', result)
+        for user in users:
+            user.refresh_from_db()
+            self.assertTrue(user.hemis_refresh_token.endswith('-old'))
+
+        # Once Hemis recovers and the circuit closes, the same users are retried
+        cache.delete(hemis_circuit.open_key)
+        self.handler.failure_rate = 0.0
+        refresh_expiring_hemis_tokens()
+        users[0].refresh_from_db()
+        self.assertFalse(users[0].hemis_access_token.endswith('-old'))
+
+    def test_rejections_do_not_reset_the_circuit_breaker(self):
+        self.make_user('revoked', refresh_token='revoked-token')
+        for _ in range(hemis_circuit.threshold - 1):
+            hemis_circuit.record_failure()
+
+        refresh_expiring_hemis_tokens()
+        hemis_circuit.record_failure()
+
+        self.assertTrue(hemis_circuit.is_open())
+
+
+class DirectorySyncTests(FakeHemisTestCase):
+
+    employees = 25
+
+    def setUp(self):
+        super().setUp()
+        self.handler.employees = self.employees
+
+    def test_full_sync_creates_teachers_and_sets_watermark(self):
+        stats = sync_employees(page_size=10)
+
+        self.assertEqual((stats['created'], stats['updated'], stats['pages']), (25, 0, 3))
+        self.assertTrue(stats['full'])
+        teacher = User.objects.get(hemis_id='100007')
+        self.assertEqual(teacher.username, 'EMP000007')
+        self.assertEqual((teacher.first_name, teacher.last_name), ('Ism7', 'Familiya7'))
+        self.assertEqual(teacher.department, 'Kafedra 7')
+        self.assertEqual(teacher.role, User.ROLE_TEACHER)
+        self.assertFalse(teacher.has_usable_password())
+
+        state = DirectorySyncState.objects.get(name='employees')
+        newest = self.handler.started_at + self.employees - 1
+        self.assertEqual(int(state.watermark.timestamp()), newest)
+
+    def test_upsert_updates_directory_fields_and_keeps_local_ones(self):
+        sync_employees(page_size=10)
+        teacher = User.objects.get(hemis_id='100003')
+        User.objects.filter(pk=teacher.pk).update(
+            username='renamed', email='own@example.com', role=User.ROLE_ADMIN, department='Old',
+        )
+
+        stats = sync_employees(full=True, page_size=10)
+
+        self.assertEqual((stats['created'], stats['updated']), (0, 25))
+        self.assertEqual(User.objects.filter(hemis_id__isnull=False).count(), 25)
+        teacher.refresh_from_db()
+        self.assertEqual(teacher.department, 'Kafedra 3')
+        self.assertEqual(
+            (teacher.username, teacher.email, teacher.role), ('renamed', 'own@example.com', User.ROLE_ADMIN)
+        )
+
+    def test_incremental_sync_reads_from_the_watermark(self):
+        sync_employees(page_size=10)
+        state = DirectorySyncState.objects.get(name='employees')
+        # Only the last 3 of the 25 employees are newer than watermark - overlap
+        since = self.handler.started_at + 21
+        state.watermark = datetime.fromtimestamp(since, tz=dt_timezone.utc) + WATERMARK_OVERLAP
+        state.save()
+        self.handler.employees = 30
+
+        stats = sync_employees(page_size=10)
+
+        self.assertFalse(stats['full'])
+        self.assertEqual((stats['created'], stats['updated'], stats['pages']), (5, 3, 1))
+        self.assertEqual(User.objects.filter(hemis_id__isnull=False).count(), 30)
+
+    def test_unreachable_directory_keeps_the_watermark(self):
+        sync_employees(page_size=10)
+        watermark = DirectorySyncState.objects.get(name='employees').watermark
+        self.handler.failure_rate = 1.0
+
+        with self.assertRaises(HemisUnavailable):
+            sync_employees(page_size=10)
+
+        self.assertEqual(DirectorySyncState.objects.get(name='employees').watermark, watermark)
+
+
+class AllocateUsernameTests(TestCase):
+
+    def allocate(self, base):
+        with CaptureQueriesContext(connection) as queries:
+            username = HemisOAuth2Backend()._allocate_username(base)
+        self.assertTrue(all('username" IN (' in query['sql'] for query in queries))
+        return username, len(queries)
+
+    def test_free_base_username_is_used(self):
+        self.assertEqual(self.allocate('EMP000001'), ('EMP000001', 1))
+
+    def test_first_free_suffix_is_used(self):
+        for name in ('EMP000001', 'EMP000001_1', 'EMP000001_3', 'EMP000001x_2'):
+            User.objects.create_user(username=name, email=f'{name}@example.com')
+
+        self.assertEqual(self.allocate('EMP000001'), ('EMP000001_2', 1))
+
+    def test_full_batch_moves_on_to_the_next(self):
+        User.objects.bulk_create([
+            User(username=f'EMP000001_{n}' if n else 'EMP000001', email=f'emp{n}@example.com')
+            for n in range(USERNAME_BATCH)
+        ])
+
+        self.assertEqual(self.allocate('EMP000001'), (f'EMP000001_{USERNAME_BATCH}', 2))
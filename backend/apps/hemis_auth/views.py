@@ -5,7 +5,6 @@ Views for Hemis OAuth 2.0 authentication.
 import json
 import secrets
 import logging
-from django.http import JsonResponse
 from django.shortcuts import redirect
 from django.views import View
 from django.contrib.auth import login, logout, authenticate
@@ -13,6 +12,7 @@ from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_protect, csrf_exempt
 from django.conf import settings
 
+from config.fastjson import JsonResponse
 from .backends import HemisOAuth2Client
 from apps.accounts.models import UserActivity
 from apps.accounts.views import get_client_ip
@@ -117,7 +117,7 @@ class HemisCallbackView(View):
         # Update refresh token
         if refresh_token:
             user.hemis_refresh_token = refresh_token
-            user.save()
+            user.save(update_fields=['hemis_refresh_token'])
         
         # Login user
         login(request, user, backend='apps.hemis_auth.backends.HemisOAuth2Backend')
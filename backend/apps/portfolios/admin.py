@@ -6,7 +6,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 
-from .models import Portfolio, PortfolioAttachment, PortfolioComment, PortfolioHistory
+from .models import Portfolio, PortfolioAttachment, PortfolioComment, PortfolioHistory, AttachmentBlob
 
 
 class PortfolioAttachmentInline(admin.TabularInline):
@@ -168,6 +168,22 @@ class PortfolioAttachmentAdmin(admin.ModelAdmin):
     file_size_display.short_description = _('File Size')
 
 
+@admin.register(AttachmentBlob)
+class AttachmentBlobAdmin(admin.ModelAdmin):
+    """Admin configuration for deduplicated attachment blobs."""
+    
+    list_display = ('sha256', 'size', 'ref_count', 'created_at')
+    search_fields = ('sha256',)
+    ordering = ('-created_at',)
+    readonly_fields = ('sha256', 'file', 'size', 'ref_count', 'created_at')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(PortfolioComment)
 class PortfolioCommentAdmin(admin.ModelAdmin):
     """Admin configuration for PortfolioComment model."""
@@ -9,3 +9,7 @@ class PortfoliosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.portfolios'
     verbose_name = 'Portfolios'
+    
+    def ready(self):
+        """Import signals when app is ready."""
+        import apps.portfolios.signals  # noqa
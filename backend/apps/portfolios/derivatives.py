@@ -0,0 +1,146 @@
+"""
+Thumbnail and preview derivatives for attachments and avatars.
+
+Derivatives are JPEGs stored next to the media under deterministic names
+(``derivatives/<size>/<key[:2]>/<key>.jpg``). They are warmed by Celery
+after upload and generated lazily on a cache miss. Like the originals they
+are private: views check permissions and then send them with
+``config.downloads.protected_file_response()``, never by public URL.
+"""
+
+import hashlib
+import io
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.fields.files import FieldFile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = {
+    'thumb': 160,
+    'preview': 800,
+}
+
+JPEG_QUALITY = 82
+
+
+def get_sizes():
+    """Configured derivative sizes: name -> bounding box in pixels."""
+    return getattr(settings, 'DERIVATIVE_SIZES', DEFAULT_SIZES)
+
+
+def source_key(fieldfile, digest=None):
+    """
+    Stable cache key for a source file. Content digests are preferred so
+    deduplicated attachments share their derivatives too.
+    """
+    if digest:
+        return digest
+    return hashlib.sha1(fieldfile.name.encode('utf-8')).hexdigest()
+
+
+def derivative_name(key, size):
+    return f"derivatives/{size}/{key[:2]}/{key}.jpg"
+
+
+def derivative_file(fieldfile, name):
+    """The derivative ``name`` as a file of the source's field, for downloads."""
+    return FieldFile(fieldfile.instance, fieldfile.field, name)
+
+
+def ensure_derivative(fieldfile, size, key):
+    """
+    Return the storage name of the derivative, rendering it if missing.
+    Returns None when the source cannot be rendered (e.g. a DOCX file).
+    """
+    if size not in get_sizes():
+        raise ValueError(f"Unknown derivative size: {size}")
+
+    name = derivative_name(key, size)
+    if default_storage.exists(name):
+        return name
+
+    image = _load_source_image(fieldfile, get_sizes()[size])
+    if image is None:
+        return None
+
+    image.thumbnail((get_sizes()[size], get_sizes()[size]))
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+
+    saved = default_storage.save(name, ContentFile(output.getvalue()))
+    if saved != name:
+        # A concurrent worker rendered the same derivative first
+        default_storage.delete(saved)
+    return name
+
+
+def ensure_all_derivatives(fieldfile, key):
+    """Render every configured size. Returns the names that now exist."""
+    generated = {}
+    for size in get_sizes():
+        name = ensure_derivative(fieldfile, size, key)
+        if name is None:
+            break
+        generated[size] = name
+    return generated
+
+
+def delete_derivatives(key):
+    """Remove every size of a derivative (e.g. when its source is deleted)."""
+    for size in get_sizes():
+        default_storage.delete(derivative_name(key, size))
+
+
+def _load_source_image(fieldfile, box):
+    """Open an image, or rasterize the first page of a PDF, as RGB."""
+    from PIL import Image, UnidentifiedImageError
+
+    with fieldfile.open('rb') as fh:
+        header = fh.read(5)
+        fh.seek(0)
+
+        if header == b'%PDF-':
+            image = _render_pdf_first_page(fh.read(), box)
+        else:
+            try:
+                image = Image.open(fh)
+                image.draft('RGB', (box, box))  # Cheap JPEG downscale on decode
+                image.load()
+            except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+                return None
+
+    if image is None:
+        return None
+
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        return background
+    return image.convert('RGB')
+
+
+def _render_pdf_first_page(data, box):
+    try:
+        import fitz  # PyMuPDF
+    except ImportError:
+        logger.warning("PyMuPDF o'rnatilmagan, PDF preview yaratilmaydi. pip install PyMuPDF")
+        return None
+
+    from PIL import Image
+
+    try:
+        with fitz.open(stream=data, filetype='pdf') as doc:
+            if doc.page_count == 0:
+                return None
+            page = doc.load_page(0)
+            zoom = box / max(page.rect.width, page.rect.height)
+            pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            return Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+    except RuntimeError as e:
+        logger.warning(f"PDF preview failed: {e}")
+        return None
@@ -0,0 +1,87 @@
+"""
+Management command to check the review queue under concurrent reviewers.
+
+Creates ``--portfolios`` pending portfolios, then ``--reviewers`` threads
+claim batches and approve them until the queue is empty. Fails if any
+portfolio was handed to two reviewers or left unreviewed, and prints
+the throughput so runs with different reviewer counts can be compared.
+Rows are committed so the threads see them and are deleted afterwards.
+Run it against PostgreSQL: SQLite has no SKIP LOCKED and serializes
+writers. The claim rules themselves are covered by apps/portfolios/tests.py.
+"""
+
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+
+from apps.portfolios import review_queue
+from apps.portfolios.models import Portfolio
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Check that concurrent reviewers never claim the same portfolio'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reviewers', type=int, default=8, help='Concurrent reviewers')
+        parser.add_argument('--portfolios', type=int, default=400, help='Pending portfolios to review')
+        parser.add_argument('--batch', type=int, default=5, help='Portfolios claimed per request')
+        parser.add_argument('--review-ms', type=float, default=20.0, help='Simulated review time per portfolio')
+
+    def handle(self, *args, **options):
+        overrides = {'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}}
+        with override_settings(**overrides):
+            teacher = User.objects.create_user(
+                username='__queue_check_teacher__', email='queue-check@example.com', role='teacher'
+            )
+            reviewers = [
+                User.objects.create_user(
+                    username=f'__queue_check_reviewer_{i}__', email=f'queue-check-{i}@example.com', role='admin'
+                )
+                for i in range(options['reviewers'])
+            ]
+            Portfolio.objects.bulk_create([
+                Portfolio(teacher=teacher, title=f'Queue check {i}', description='', category='other')
+                for i in range(options['portfolios'])
+            ])
+            try:
+                self._check(teacher, reviewers, options)
+            finally:
+                Portfolio.objects.filter(teacher=teacher).delete()
+                User.objects.filter(pk__in=[teacher.pk] + [r.pk for r in reviewers]).delete()
+
+    def _check(self, teacher, reviewers, options):
+        def review(reviewer):
+            handled = []
+            try:
+                while claims := review_queue.claim(reviewer, options['batch']):
+                    for portfolio in claims:
+                        time.sleep(options['review_ms'] / 1000)
+                        portfolio.approve(reviewer)
+                        handled.append(portfolio.pk)
+            finally:
+                connection.close()
+            return handled
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(len(reviewers)) as pool:
+            handled = [pk for batch in pool.map(review, reviewers) for pk in batch]
+        elapsed = time.perf_counter() - start
+
+        duplicates = [pk for pk, n in Counter(handled).items() if n > 1]
+        left = Portfolio.objects.filter(teacher=teacher, status=Portfolio.STATUS_PENDING).count()
+        self.stdout.write(
+            f'{len(reviewers)} reviewers: {len(handled)} reviews in {elapsed:.2f} s '
+            f'({len(handled) / elapsed:.1f}/s)'
+        )
+        if duplicates:
+            raise CommandError(f'{len(duplicates)} portfolios were reviewed twice, e.g. {duplicates[:5]}')
+        if left:
+            raise CommandError(f'{left} portfolios left pending')
+        self.stdout.write(self.style.SUCCESS('OK: every portfolio was claimed by exactly one reviewer'))
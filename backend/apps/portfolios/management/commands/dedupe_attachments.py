@@ -0,0 +1,137 @@
+"""
+Management command to move existing attachments into content-addressed storage.
+
+Hashes every attachment that has no blob yet, shares one blob per distinct
+SHA-256 and deletes the now-redundant duplicate files.
+"""
+
+import hashlib
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F
+
+from apps.portfolios.models import AttachmentBlob, PortfolioAttachment
+
+
+class Command(BaseCommand):
+    help = 'Deduplicate existing portfolio attachment files by SHA-256'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how much space would be reclaimed',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of attachments loaded per query',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+
+        pending_ids = list(
+            PortfolioAttachment.objects.filter(blob__isnull=True)
+            .exclude(file='')
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        self.stdout.write(f'{len(pending_ids)} attachment(s) without a content blob')
+
+        seen = {}  # digest -> stored name (dry run bookkeeping)
+        processed = duplicates = missing = 0
+        reclaimed = 0
+
+        for start in range(0, len(pending_ids), batch_size):
+            batch = PortfolioAttachment.objects.filter(
+                id__in=pending_ids[start:start + batch_size]
+            ).only('id', 'file')
+
+            for attachment in batch:
+                storage = attachment.file.storage
+                name = attachment.file.name
+
+                if not storage.exists(name):
+                    missing += 1
+                    self.stdout.write(self.style.WARNING(f'Missing file for attachment {attachment.id}: {name}'))
+                    continue
+
+                digest = self._hash(storage, name)
+                size = storage.size(name)
+                processed += 1
+
+                if dry_run:
+                    if digest in seen or AttachmentBlob.objects.filter(sha256=digest).exists():
+                        if seen.get(digest) != name:
+                            duplicates += 1
+                            reclaimed += size
+                    else:
+                        seen[digest] = name
+                    continue
+
+                freed = self._attach_blob(attachment, name, digest, size)
+                if freed is not None:
+                    duplicates += 1
+                    reclaimed += freed
+
+        if not dry_run:
+            self._recount()
+
+        prefix = '[dry run] ' if dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}Processed {processed}, duplicates {duplicates}, missing {missing}, '
+            f'reclaimed {reclaimed / (1024 * 1024):.1f} MB'
+        ))
+
+    def _hash(self, storage, name):
+        digest = hashlib.sha256()
+        with storage.open(name, 'rb') as fh:
+            for chunk in fh.chunks():
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _attach_blob(self, attachment, name, digest, size):
+        """
+        Point the attachment at the blob for ``digest``. The first file seen
+        for a digest is adopted in place; later copies are deleted.
+        Returns the number of bytes freed, or None if nothing was deleted.
+        """
+        with transaction.atomic():
+            blob = AttachmentBlob.objects.select_for_update().filter(sha256=digest).first()
+            if blob is None:
+                blob = AttachmentBlob.objects.create(sha256=digest, file=name, size=size, ref_count=0)
+
+            AttachmentBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+            PortfolioAttachment.objects.filter(pk=attachment.pk).update(
+                blob=blob, file=blob.file.name, file_size=blob.size
+            )
+
+            if name == blob.file.name:
+                return None
+
+            # Another legacy row may still point at the same path
+            if PortfolioAttachment.objects.filter(file=name).exists():
+                return None
+
+            storage = attachment.file.storage
+            transaction.on_commit(lambda: storage.delete(name))
+        return size
+
+    def _recount(self):
+        """Reset ref_count from actual references and drop orphaned blobs."""
+        fixed = 0
+        blobs = AttachmentBlob.objects.annotate(refs=Count('attachments')).exclude(ref_count=F('refs'))
+        for blob in blobs:
+            if blob.refs == 0:
+                blob.file.delete(save=False)
+                blob.delete()
+            else:
+                AttachmentBlob.objects.filter(pk=blob.pk).update(ref_count=blob.refs)
+            fixed += 1
+
+        if fixed:
+            self.stdout.write(self.style.WARNING(f'Corrected reference counts on {fixed} blob(s)'))
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttachmentBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('file', models.FileField(max_length=255, upload_to='portfolio_attachments/blobs/', verbose_name='file')),
+                ('size', models.PositiveBigIntegerField(default=0, help_text='File size in bytes', verbose_name='size')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='reference count')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'attachment blob',
+                'verbose_name_plural': 'attachment blobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='portfolioattachment',
+            name='file',
+            field=models.FileField(max_length=255, upload_to='portfolio_attachments/%Y/%m/', verbose_name='file'),
+        ),
+        migrations.AddField(
+            model_name='portfolioattachment',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='attachments', to='portfolios.attachmentblob'),
+        ),
+    ]
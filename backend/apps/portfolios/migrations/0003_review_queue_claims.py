@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('portfolios', '0002_attachment_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='portfolio',
+            name='claim_expires_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='claim expires at'),
+        ),
+        migrations.AddField(
+            model_name='portfolio',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='claimed at'),
+        ),
+        migrations.AddField(
+            model_name='portfolio',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claimed_portfolios', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='portfolio',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['created_at'], name='portfolio_review_queue_idx'),
+        ),
+    ]
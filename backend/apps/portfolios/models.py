@@ -2,11 +2,40 @@
 Portfolio model for the portfolio management system.
 """
 
-from django.db import models
+import hashlib
+import os
+
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 
 
+class PortfolioQuerySet(models.QuerySet):
+    
+    DETAIL_HISTORY_LIMIT = 10
+    
+    def for_detail(self):
+        """
+        Related rows for the detail payload in four queries, regardless of
+        how many attachments or comments exist. Comments of every depth
+        land in ``all_comments``, the latest history in ``recent_history``.
+        """
+        return self.select_related('teacher', 'reviewed_by').prefetch_related(
+            'attachments',
+            models.Prefetch(
+                'comments',
+                queryset=PortfolioComment.objects.select_related('author'),
+                to_attr='all_comments',
+            ),
+            models.Prefetch(
+                'history',
+                queryset=PortfolioHistory.objects.select_related('changed_by')[:self.DETAIL_HISTORY_LIMIT],
+                to_attr='recent_history',
+            ),
+        )
+
+
 class Portfolio(models.Model):
     """
     Portfolio model for teachers.
@@ -27,6 +56,8 @@ class Portfolio(models.Model):
         (STATUS_REJECTED, _('Rejected')),
     ]
     
+    objects = PortfolioQuerySet.as_manager()
+    
     CATEGORY_CHOICES = [
         ('teaching', _('Teaching Materials')),
         ('research', _('Research & Publications')),
@@ -88,6 +119,25 @@ class Portfolio(models.Model):
         null=True
     )
     
+    # Review queue claim (see review_queue.py); free once expired
+    claimed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='claimed_portfolios'
+    )
+    claimed_at = models.DateTimeField(
+        _('claimed at'),
+        null=True,
+        blank=True
+    )
+    claim_expires_at = models.DateTimeField(
+        _('claim expires at'),
+        null=True,
+        blank=True
+    )
+    
     # Additional metadata (JSON field for flexible data)
     meta_data = models.JSONField(
         _('metadata'),
@@ -118,6 +168,12 @@ class Portfolio(models.Model):
             models.Index(fields=['category']),
             models.Index(fields=['created_at']),
             models.Index(fields=['status', 'teacher']),
+            # Review queue: oldest pending first
+            models.Index(
+                fields=['created_at'],
+                condition=models.Q(status='pending'),
+                name='portfolio_review_queue_idx',
+            ),
         ]
     
     def __str__(self):
@@ -144,6 +200,7 @@ class Portfolio(models.Model):
         self.reviewed_at = timezone.now()
         if comment:
             self.review_comment = comment
+        self.release_claim()
         self.save()
     
     def reject(self, reviewer, comment=None):
@@ -155,6 +212,7 @@ class Portfolio(models.Model):
         self.reviewed_at = timezone.now()
         if comment:
             self.review_comment = comment
+        self.release_claim()
         self.save()
     
     def reset_to_pending(self):
@@ -163,7 +221,133 @@ class Portfolio(models.Model):
         self.reviewed_by = None
         self.reviewed_at = None
         self.review_comment = None
+        self.release_claim()
         self.save()
+    
+    def release_claim(self):
+        """Drop the review queue claim (saved by the caller)."""
+        self.claimed_by = None
+        self.claimed_at = None
+        self.claim_expires_at = None
+    
+    def is_claimed_by_other(self, user, now=None):
+        """Whether another reviewer holds an unexpired claim."""
+        from django.utils import timezone
+        
+        now = now or timezone.now()
+        return bool(
+            self.claimed_by_id and self.claimed_by_id != user.pk
+            and self.claim_expires_at and self.claim_expires_at > now
+        )
+
+
+class AttachmentBlob(models.Model):
+    """
+    Content-addressed storage for attachment files.
+    
+    Each distinct file body is stored once, keyed by its SHA-256 digest.
+    PortfolioAttachment rows point at a blob and ``ref_count`` tracks how
+    many attachments share it; the file is deleted with the last reference.
+    """
+    
+    sha256 = models.CharField(
+        _('SHA-256'),
+        max_length=64,
+        unique=True
+    )
+    file = models.FileField(
+        _('file'),
+        upload_to='portfolio_attachments/blobs/',
+        max_length=255
+    )
+    size = models.PositiveBigIntegerField(
+        _('size'),
+        default=0,
+        help_text=_('File size in bytes')
+    )
+    ref_count = models.PositiveIntegerField(
+        _('reference count'),
+        default=0
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = _('attachment blob')
+        verbose_name_plural = _('attachment blobs')
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+    
+    @staticmethod
+    def compute_digest(file):
+        """Hash a file chunk by chunk without reading it into memory."""
+        digest = hashlib.sha256()
+        if hasattr(file, 'seek'):
+            file.seek(0)
+        for chunk in file.chunks():
+            digest.update(chunk)
+        if hasattr(file, 'seek'):
+            file.seek(0)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def blob_name(digest, original_name=''):
+        """Deterministic storage name: blobs/ab/cd/<digest><ext>."""
+        ext = os.path.splitext(original_name or '')[1].lower()[:10]
+        return f"{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+    
+    @classmethod
+    def acquire(cls, uploaded_file):
+        """
+        Return the blob for ``uploaded_file``, storing it only if unseen.
+        
+        The digest is taken from ``uploaded_file.sha256`` when the hashing
+        upload handler already computed it while streaming the request body.
+        A duplicate upload costs one UPDATE and never touches storage.
+        
+        Call it in the same ``transaction.atomic()`` as the insert of the
+        referencing attachment, so a failed insert takes the reference back.
+        """
+        digest = getattr(uploaded_file, 'sha256', None) or cls.compute_digest(uploaded_file)
+        
+        if cls.objects.filter(sha256=digest).update(ref_count=F('ref_count') + 1):
+            return cls.objects.get(sha256=digest)
+        
+        blob = cls(sha256=digest, size=uploaded_file.size, ref_count=1)
+        blob.file.save(cls.blob_name(digest, uploaded_file.name), uploaded_file, save=False)
+        try:
+            with transaction.atomic():
+                blob.save()
+        except IntegrityError:
+            # A concurrent upload of the same content won the insert race
+            blob.file.delete(save=False)
+            cls.objects.filter(sha256=digest).update(ref_count=F('ref_count') + 1)
+            return cls.objects.get(sha256=digest)
+        return blob
+    
+    def release(self):
+        """
+        Drop one reference. Deletes the row and the stored file when the
+        last reference goes. Returns True if the file was removed.
+        """
+        with transaction.atomic():
+            blob = type(self).objects.select_for_update().get(pk=self.pk)
+            if blob.ref_count > 1:
+                type(self).objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+                return False
+            
+            storage, name, digest = blob.file.storage, blob.file.name, blob.sha256
+            blob.delete()
+            transaction.on_commit(lambda: storage.delete(name))
+            transaction.on_commit(lambda: _delete_derivatives(digest))
+        return True
+
+
+def _delete_derivatives(key):
+    from .derivatives import delete_derivatives
+    delete_derivatives(key)
 
 
 class PortfolioAttachment(models.Model):
@@ -190,7 +374,15 @@ class PortfolioAttachment(models.Model):
     )
     file = models.FileField(
         _('file'),
-        upload_to='portfolio_attachments/%Y/%m/'
+        upload_to='portfolio_attachments/%Y/%m/',
+        max_length=255
+    )
+    blob = models.ForeignKey(
+        AttachmentBlob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='attachments'
     )
     file_type = models.CharField(
         _('file type'),
@@ -214,8 +406,21 @@ class PortfolioAttachment(models.Model):
     def __str__(self):
         return f"{self.title} - {self.portfolio.title}"
     
+    @property
+    def derivative_key(self):
+        """Cache key for thumbnails/previews (shared by identical files)."""
+        from .derivatives import source_key
+        return source_key(self.file, self.blob.sha256 if self.blob_id else None)
+    
+    @property
+    def has_preview(self):
+        """Whether thumbnails can be rendered for this file type."""
+        return self.file_type.startswith('image') or self.file_type in ('application/pdf', 'document')
+    
     def save(self, *args, **kwargs):
-        if self.file:
+        if self.blob_id:
+            self.file_size = self.blob.size
+        elif self.file:
             self.file_size = self.file.size
         super().save(*args, **kwargs)
 
@@ -0,0 +1,133 @@
+"""
+Review queue for pending portfolios.
+
+Reviewers claim the oldest pending portfolios instead of picking them
+from the list and racing each other. Claiming locks candidate rows with
+``SELECT ... FOR UPDATE SKIP LOCKED``, so concurrent reviewers get
+disjoint batches without waiting on each other, and stamps them with a
+lease (``settings.PORTFOLIO_REVIEW_LEASE_SECONDS``). A claim that is not
+approved, rejected or released before its lease runs out is simply
+claimable again.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Portfolio
+
+MAX_CLAIM = 50
+
+
+def lease_duration():
+    return timedelta(seconds=settings.PORTFOLIO_REVIEW_LEASE_SECONDS)
+
+
+def claims_of(reviewer, now=None):
+    """The reviewer's unexpired claims, oldest submission first."""
+    now = now or timezone.now()
+    return Portfolio.objects.filter(
+        status=Portfolio.STATUS_PENDING, claimed_by=reviewer, claim_expires_at__gt=now,
+    ).select_related('teacher').order_by('created_at')
+
+
+def claim(reviewer, limit):
+    """
+    Claim up to ``limit`` pending portfolios for ``reviewer``.
+
+    Claims the reviewer already holds count towards ``limit`` and get
+    their lease renewed.
+
+    Returns:
+        The claimed portfolios, oldest submission first
+    """
+    now = timezone.now()
+    limit = max(1, min(limit, MAX_CLAIM))
+    claimable = Q(claimed_by__isnull=True) | Q(claim_expires_at__lte=now) | Q(claimed_by=reviewer)
+    with transaction.atomic():
+        ids = list(
+            Portfolio.objects.filter(claimable, status=Portfolio.STATUS_PENDING)
+            .order_by('created_at')
+            .select_for_update(skip_locked=True, of=('self',))
+            .values_list('id', flat=True)[:limit]
+        )
+        Portfolio.objects.filter(id__in=ids).update(
+            claimed_by=reviewer, claimed_at=now, claim_expires_at=now + lease_duration(),
+        )
+    return list(claims_of(reviewer, now).filter(id__in=ids))
+
+
+def release(reviewer, ids=None):
+    """
+    Give claims back to the queue.
+
+    Returns:
+        Number of portfolios released
+    """
+    queryset = Portfolio.objects.filter(claimed_by=reviewer, status=Portfolio.STATUS_PENDING)
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    return queryset.update(claimed_by=None, claimed_at=None, claim_expires_at=None)
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    return round(values[min(len(values) - 1, int(len(values) * fraction))], 1)
+
+
+def metrics(window_hours=24):
+    """
+    Queue depth, throughput and wait times.
+
+    Wait time is submission to review for portfolios reviewed within the
+    last ``window_hours``; throughput is those reviews per hour, overall
+    and per reviewer.
+    """
+    now = timezone.now()
+    since = now - timedelta(hours=window_hours)
+
+    queue = Portfolio.objects.filter(status=Portfolio.STATUS_PENDING).aggregate(
+        pending=Count('id'),
+        claimed=Count('id', filter=Q(claimed_by__isnull=False, claim_expires_at__gt=now)),
+        expired_claims=Count('id', filter=Q(claimed_by__isnull=False, claim_expires_at__lte=now)),
+    )
+    oldest = Portfolio.objects.filter(status=Portfolio.STATUS_PENDING).order_by('created_at').values_list(
+        'created_at', flat=True
+    ).first()
+
+    reviewed = Portfolio.objects.filter(reviewed_at__gte=since).exclude(status=Portfolio.STATUS_PENDING)
+    waits = sorted(
+        (reviewed_at - created_at).total_seconds()
+        for created_at, reviewed_at in reviewed.values_list('created_at', 'reviewed_at')
+    )
+    by_reviewer = reviewed.values('reviewed_by', 'reviewed_by__username').annotate(
+        reviews=Count('id')
+    ).order_by('-reviews')
+
+    return {
+        'window_hours': window_hours,
+        'queue': {
+            **queue,
+            'oldest_pending_seconds': (now - oldest).total_seconds() if oldest else None,
+        },
+        'throughput': {
+            'reviewed': len(waits),
+            'per_hour': round(len(waits) / window_hours, 2),
+            'by_reviewer': [{
+                'reviewer_id': row['reviewed_by'],
+                'username': row['reviewed_by__username'],
+                'reviews': row['reviews'],
+                'per_hour': round(row['reviews'] / window_hours, 2),
+            } for row in by_reviewer],
+        },
+        'wait_seconds': {
+            'avg': round(sum(waits) / len(waits), 1) if waits else None,
+            'p50': _percentile(waits, 0.5),
+            'p95': _percentile(waits, 0.95),
+            'max': round(waits[-1], 1) if waits else None,
+        },
+    }
@@ -2,44 +2,36 @@
 Signal handlers for the portfolios app.
 """
 
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import Portfolio, PortfolioHistory
-
-
-@receiver(pre_save, sender=Portfolio)
-def track_status_change(sender, instance, **kwargs):
-    """Track portfolio status changes before save."""
-    if instance.pk:
-        try:
-            old_instance = Portfolio.objects.get(pk=instance.pk)
-            instance._old_status = old_instance.status
-        except Portfolio.DoesNotExist:
-            instance._old_status = None
-    else:
-        instance._old_status = None
-
-
-@receiver(post_save, sender=Portfolio)
-def create_history_on_status_change(sender, instance, created, **kwargs):
-    """Create history entry when portfolio status changes."""
-    if created:
-        # History for new portfolio is created in the view
-        return
-    
-    old_status = getattr(instance, '_old_status', None)
-    
-    if old_status and old_status != instance.status:
-        # Status has changed, but history should be created by the view
-        # This is a fallback for direct model saves
-        existing_history = PortfolioHistory.objects.filter(
-            portfolio=instance,
-            new_status=instance.status
-        ).order_by('-created_at').first()
-        
-        # Only create if no recent history exists
-        if not existing_history or (
-            existing_history.old_status != old_status
-        ):
-            # This will be a rare case since views handle this
-            pass
+
+from config.conditional import bump_versions
+from .models import Portfolio, PortfolioAttachment, PortfolioComment, PortfolioHistory
+
+
+@receiver(post_delete, sender=PortfolioAttachment)
+def release_attachment_blob(sender, instance, **kwargs):
+    """
+    Drop the attachment's reference to its content blob.
+    Also runs for cascades (e.g. deleting a whole portfolio).
+    """
+    if instance.blob_id:
+        instance.blob.release()
+
+
+@receiver([post_save, post_delete], sender=Portfolio)
+def invalidate_portfolio_versions(sender, instance, **kwargs):
+    """Invalidate ETags of portfolio lists and of this portfolio's detail."""
+    bump_versions(
+        'portfolios',
+        f'portfolios:teacher:{instance.teacher_id}',
+        f'portfolio:{instance.pk}',
+    )
+
+
+@receiver([post_save, post_delete], sender=PortfolioAttachment)
+@receiver([post_save, post_delete], sender=PortfolioComment)
+@receiver([post_save, post_delete], sender=PortfolioHistory)
+def invalidate_portfolio_detail_version(sender, instance, **kwargs):
+    """Attachments, comments and history are embedded in the detail payload."""
+    bump_versions(f'portfolio:{instance.portfolio_id}')
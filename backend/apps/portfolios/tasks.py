@@ -10,7 +10,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-@shared_task(bind=True, max_retries=3)
+@shared_task(bind=True, max_retries=3, ignore_result=True)
 def send_notification_email(self, user_email, subject, message):
     """
     Send notification email asynchronously.
@@ -35,7 +35,7 @@ def send_notification_email(self, user_email, subject, message):
         raise self.retry(exc=exc, countdown=60)
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def notify_portfolio_status_change(portfolio_id, old_status, new_status, reviewer_name=None):
     """
     Notify teacher when their portfolio status changes.
@@ -80,7 +80,33 @@ def notify_portfolio_status_change(portfolio_id, old_status, new_status, reviewe
         return False
 
 
-@shared_task
+@shared_task(bind=True, max_retries=2, ignore_result=True)
+def generate_attachment_derivatives(self, attachment_id):
+    """
+    Render thumbnail/preview derivatives for an uploaded attachment.
+    
+    Args:
+        attachment_id: ID of the PortfolioAttachment
+    """
+    from apps.portfolios.models import PortfolioAttachment
+    from apps.portfolios.derivatives import ensure_all_derivatives
+    
+    try:
+        attachment = PortfolioAttachment.objects.select_related('blob').get(id=attachment_id)
+    except PortfolioAttachment.DoesNotExist:
+        logger.warning(f"Attachment {attachment_id} not found")
+        return []
+    
+    try:
+        generated = ensure_all_derivatives(attachment.file, attachment.derivative_key)
+    except Exception as exc:
+        logger.error(f"Failed to render derivatives for attachment {attachment_id}: {exc}")
+        raise self.retry(exc=exc, countdown=30)
+    
+    return list(generated)
+
+
+@shared_task(ignore_result=True)
 def cleanup_old_activities():
     """
     Cleanup old user activities (older than 90 days).
@@ -0,0 +1,312 @@
+"""
+Tests for portfolio reads, attachments and the review queue.
+"""
+
+import io
+import shutil
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import review_queue
+from .tasks import generate_attachment_derivatives
+from .models import AttachmentBlob, Portfolio, PortfolioAttachment, PortfolioComment, PortfolioHistory
+
+User = get_user_model()
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Portfolio with teacher and reviewer, attachments, comments with authors,
+# latest history with users
+PORTFOLIO_DETAIL_QUERIES = 4
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PortfolioTestCase(TestCase):
+    """A superadmin and a teacher."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', email='admin@example.com', role=User.ROLE_SUPERADMIN)
+        cls.teacher = User.objects.create_user(username='teacher', email='teacher@example.com', role=User.ROLE_TEACHER)
+
+    def setUp(self):
+        cache.clear()
+
+    def make_portfolio(self, size):
+        """A portfolio with ``size`` attachments, comments, replies and history rows."""
+        commenters = User.objects.bulk_create([
+            User(username=f'commenter-{size}-{i}', email=f'commenter-{size}-{i}@example.com')
+            for i in range(size)
+        ])
+        portfolio = Portfolio.objects.create(teacher=self.teacher, title=f'Portfolio {size}', category='other')
+        PortfolioAttachment.objects.bulk_create([
+            PortfolioAttachment(
+                portfolio=portfolio, title=f'File {i}', file=f'portfolio_attachments/file-{i}.pdf',
+                file_type='document',
+            )
+            for i in range(size)
+        ])
+        roots = PortfolioComment.objects.bulk_create([
+            PortfolioComment(portfolio=portfolio, author=author, content='Comment')
+            for author in commenters
+        ])
+        PortfolioComment.objects.bulk_create([
+            PortfolioComment(portfolio=portfolio, author=root.author, content='Reply', parent=root)
+            for root in roots
+        ])
+        PortfolioHistory.objects.bulk_create([
+            PortfolioHistory(portfolio=portfolio, changed_by=author, new_status='pending')
+            for author in commenters
+        ])
+        return portfolio
+
+
+class PortfolioDetailQueryTests(PortfolioTestCase):
+
+    def test_query_count_does_not_grow_with_related_rows(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse('accounts:current_user'))  # the request user is cached from here on
+        for size in (1, 25):
+            portfolio = self.make_portfolio(size)
+            with self.assertNumQueries(PORTFOLIO_DETAIL_QUERIES):
+                response = self.client.get(reverse('portfolios:detail', args=[portfolio.pk]))
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertEqual(len(data['attachments']), size)
+            self.assertEqual(len(data['comments']), size)
+            self.assertEqual(sum(len(comment['replies']) for comment in data['comments']), size)
+
+
+class AttachmentTestCase(PortfolioTestCase):
+    """Uploads go to a temporary MEDIA_ROOT; derivative tasks are not queued."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        self.portfolio = Portfolio.objects.create(teacher=self.teacher, title='Portfolio', category='other')
+        self.client.force_login(self.teacher)
+        patcher = mock.patch.object(generate_attachment_derivatives, 'delay')
+        self.derivatives_delay = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upload(self, content=b'%PDF-1.4 test', name='hujjat.pdf', content_type='application/pdf'):
+        return self.client.post(
+            reverse('portfolios:attachments', args=[self.portfolio.pk]),
+            {'files': SimpleUploadedFile(name, content, content_type=content_type)},
+        )
+
+
+class PortfolioAttachmentTests(AttachmentTestCase):
+
+    def test_owner_uploads_and_deletes_attachments(self):
+        response = self.upload()
+        self.assertEqual(response.status_code, 201)
+        attachment_id = response.json()['attachments'][0]['id']
+
+        response = self.client.delete(reverse('portfolios:attachment_delete', args=[self.portfolio.pk, attachment_id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(PortfolioAttachment.objects.filter(pk=attachment_id).exists())
+        self.assertFalse(AttachmentBlob.objects.exists())
+
+    def test_responses_link_the_protected_download_not_media(self):
+        uploaded = self.upload().json()['attachments'][0]
+        detail = self.client.get(reverse('portfolios:detail', args=[self.portfolio.pk])).json()['attachments'][0]
+
+        download = reverse('portfolios:attachment_download', args=[self.portfolio.pk, uploaded['id']])
+        for attachment in (uploaded, detail):
+            self.assertEqual((attachment['file'], attachment['download_url']), (download, download))
+        response = self.client.get(download)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 test')
+
+    def test_duplicate_uploads_share_one_blob(self):
+        self.upload()
+        self.upload(name='nusxa.pdf')
+
+        blob = AttachmentBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(PortfolioAttachment.objects.filter(blob=blob).count(), 2)
+
+    def test_failed_attachment_insert_takes_the_blob_reference_back(self):
+        self.upload()
+
+        with mock.patch.object(PortfolioAttachment.objects, 'create', side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            self.upload(name='nusxa.pdf')
+
+        self.assertEqual(AttachmentBlob.objects.get().ref_count, 1)
+
+    def test_other_teachers_cannot_upload(self):
+        other = User.objects.create_user(username='other', email='other@example.com', role=User.ROLE_TEACHER)
+        self.client.force_login(other)
+
+        self.assertEqual(self.upload().status_code, 403)
+
+
+class AttachmentDerivativeTests(AttachmentTestCase):
+
+    def png(self, size=(400, 300)):
+        from PIL import Image
+
+        output = io.BytesIO()
+        Image.new('RGB', size, (200, 30, 30)).save(output, format='PNG')
+        return output.getvalue()
+
+    def upload_image(self):
+        response = self.upload(self.png(), name='rasm.png', content_type='image/png')
+        return response.json()['attachments'][0]
+
+    def test_derivative_is_sent_after_the_permission_check(self):
+        url = self.upload_image()['thumb_url']
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertNotIn('Location', response)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'\xff\xd8'))
+
+        other = User.objects.create_user(username='other', email='other@example.com', role=User.ROLE_TEACHER)
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    @override_settings(DOWNLOAD_BACKEND='nginx')
+    def test_derivative_goes_through_the_protected_location(self):
+        response = self.client.get(self.upload_image()['preview_url'])
+
+        self.assertTrue(response['X-Accel-Redirect'].startswith('/protected/derivatives/preview/'))
+
+    def test_decompression_bomb_has_no_preview(self):
+        url = self.upload_image()['thumb_url']
+
+        with mock.patch('PIL.Image.MAX_IMAGE_PIXELS', 100):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_rendering_is_queued_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            attachment = self.upload_image()
+            self.derivatives_delay.assert_not_called()
+
+        for callback in callbacks:
+            callback()
+        self.derivatives_delay.assert_called_once_with(attachment['id'])
+
+
+class PortfolioSaveTests(PortfolioTestCase):
+
+    def test_save_runs_only_the_update(self):
+        portfolio = Portfolio.objects.create(teacher=self.teacher, title='Portfolio', category='other')
+        portfolio.status = Portfolio.STATUS_APPROVED
+
+        with self.assertNumQueries(1):
+            portfolio.save()
+
+
+class ReviewQueueTests(PortfolioTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.reviewer = User.objects.create_user(username='reviewer', email='reviewer@example.com', role=User.ROLE_ADMIN)
+        cls.pending = [
+            Portfolio.objects.create(teacher=cls.teacher, title=f'Pending {i}', category='other')
+            for i in range(5)
+        ]
+
+    def test_reviewers_get_disjoint_batches_oldest_first(self):
+        first = review_queue.claim(self.admin, 2)
+        second = review_queue.claim(self.reviewer, 10)
+
+        self.assertEqual([p.pk for p in first], [p.pk for p in self.pending[:2]])
+        self.assertEqual([p.pk for p in second], [p.pk for p in self.pending[2:]])
+
+    def test_claims_held_count_towards_the_limit(self):
+        review_queue.claim(self.admin, 2)
+
+        again = review_queue.claim(self.admin, 3)
+
+        self.assertEqual([p.pk for p in again], [p.pk for p in self.pending[:3]])
+
+    def test_expired_and_released_claims_are_claimable_again(self):
+        review_queue.claim(self.admin, 2)
+        Portfolio.objects.filter(pk=self.pending[0].pk).update(claim_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(review_queue.release(self.admin, [self.pending[1].pk]), 1)
+
+        claimed = review_queue.claim(self.reviewer, 2)
+
+        self.assertEqual([p.pk for p in claimed], [p.pk for p in self.pending[:2]])
+        self.assertEqual(list(review_queue.claims_of(self.admin)), [])
+
+    def test_reviewed_portfolios_leave_the_queue(self):
+        for portfolio in review_queue.claim(self.admin, 2):
+            portfolio.approve(self.admin)
+
+        claimed = review_queue.claim(self.reviewer, 10)
+
+        self.assertEqual([p.pk for p in claimed], [p.pk for p in self.pending[2:]])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'SQLite has no SKIP LOCKED and serializes writers')
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConcurrentReviewQueueTests(TransactionTestCase):
+    """Reviewers in parallel threads, each on its own connection."""
+
+    reviewers = 8
+    portfolios = 120
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(username='teacher', email='teacher@example.com', role=User.ROLE_TEACHER)
+        Portfolio.objects.bulk_create([
+            Portfolio(teacher=self.teacher, title=f'Pending {i}', category='other')
+            for i in range(self.portfolios)
+        ])
+
+    def test_every_portfolio_is_reviewed_exactly_once(self):
+        reviewers = [
+            User.objects.create_user(username=f'reviewer{i}', email=f'reviewer{i}@example.com', role=User.ROLE_ADMIN)
+            for i in range(self.reviewers)
+        ]
+
+        def review(reviewer):
+            handled = []
+            try:
+                while claims := review_queue.claim(reviewer, 5):
+                    for portfolio in claims:
+                        portfolio.approve(reviewer)
+                        handled.append(portfolio.pk)
+            finally:
+                connection.close()
+            return handled
+
+        with ThreadPoolExecutor(self.reviewers) as pool:
+            handled = [pk for batch in pool.map(review, reviewers) for pk in batch]
+
+        self.assertEqual([pk for pk, n in Counter(handled).items() if n > 1], [])
+        self.assertEqual(len(handled), self.portfolios)
+        self.assertFalse(Portfolio.objects.filter(status=Portfolio.STATUS_PENDING).exists())
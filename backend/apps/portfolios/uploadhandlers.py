@@ -0,0 +1,44 @@
+"""
+Upload handlers that hash files while the request body streams in.
+
+The computed digest is exposed as ``uploaded_file.sha256`` so
+AttachmentBlob.acquire() can deduplicate without a second read.
+"""
+
+import hashlib
+
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+
+
+class HashingUploadMixin:
+    """Compute a SHA-256 digest of every chunk this handler consumes."""
+
+    def new_file(self, *args, **kwargs):
+        # Must be set before super(): the memory handler raises
+        # StopFutureHandlers from new_file() when it takes the upload.
+        self._sha256 = hashlib.sha256()
+        return super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        result = super().receive_data_chunk(raw_data, start)
+        if result is None:
+            # None means this handler kept the chunk
+            self._sha256.update(raw_data)
+        return result
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self._sha256.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    """In-memory upload handler with streaming SHA-256."""
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    """Temporary-file upload handler with streaming SHA-256."""
@@ -16,12 +16,27 @@ urlpatterns = [
     path('<int:portfolio_id>/approve/', views.PortfolioApproveView.as_view(), name='approve'),
     path('<int:portfolio_id>/reject/', views.PortfolioRejectView.as_view(), name='reject'),
     
+    # Review queue
+    path('review-queue/', views.PortfolioReviewQueueView.as_view(), name='review_queue'),
+    path('review-queue/release/', views.PortfolioReviewQueueReleaseView.as_view(), name='review_queue_release'),
+    path('review-queue/metrics/', views.PortfolioReviewQueueMetricsView.as_view(), name='review_queue_metrics'),
+    
     # Comments
     path('<int:portfolio_id>/comments/', views.PortfolioCommentView.as_view(), name='comments'),
     
     # Attachments
     path('<int:portfolio_id>/attachments/', views.PortfolioAttachmentView.as_view(), name='attachments'),
     path('<int:portfolio_id>/attachments/<int:attachment_id>/', views.PortfolioAttachmentView.as_view(), name='attachment_delete'),
+    path(
+        '<int:portfolio_id>/attachments/<int:attachment_id>/download/',
+        views.PortfolioAttachmentDownloadView.as_view(),
+        name='attachment_download'
+    ),
+    path(
+        '<int:portfolio_id>/attachments/<int:attachment_id>/derivatives/<str:size>/',
+        views.PortfolioAttachmentDerivativeView.as_view(),
+        name='attachment_derivative'
+    ),
     
     # Statistics
     path('stats/', views.PortfolioStatsView.as_view(), name='stats'),
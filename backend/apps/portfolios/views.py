@@ -3,19 +3,95 @@ Views for portfolios app.
 """
 
 import json
-from django.http import JsonResponse
+import os
+from django.conf import settings
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
 from django.views import View
 from django.views.decorators.csrf import csrf_protect
 from django.utils.decorators import method_decorator
+from django.db import transaction
 from django.db.models import Q
 from django.utils import timezone
 from django.core.paginator import Paginator
-import rules
 
-from apps.accounts.permissions import role_required, admin_required, superadmin_required
+from apps.accounts.permissions import (
+    role_required, admin_required, superadmin_required, check_perm, portfolio_permissions,
+)
 from apps.accounts.models import UserActivity
 from apps.accounts.views import get_client_ip
-from .models import Portfolio, PortfolioAttachment, PortfolioComment, PortfolioHistory
+from config.conditional import condition_on_versions
+from config.fastjson import JsonResponse
+from config.downloads import protected_file_response
+from . import review_queue
+from .models import Portfolio, PortfolioAttachment, PortfolioComment, PortfolioHistory, AttachmentBlob
+from .derivatives import derivative_file, get_sizes, ensure_derivative
+from .tasks import generate_attachment_derivatives
+
+
+def portfolio_list_scopes(request, *args, **kwargs):
+    """Version scopes for list reads: every portfolio for admins, own for teachers."""
+    user = request.user
+    if user.is_superadmin or user.is_admin:
+        return ['portfolios']
+    return [f'portfolios:teacher:{user.pk}']
+
+
+def portfolio_detail_scopes(request, portfolio_id, *args, **kwargs):
+    return [f'portfolio:{portfolio_id}']
+
+
+def attachment_download_url(attachment):
+    """Protected download endpoint of an attachment; media URLs are never exposed."""
+    return reverse('portfolios:attachment_download', kwargs={
+        'portfolio_id': attachment.portfolio_id, 'attachment_id': attachment.id,
+    })
+
+
+def attachment_derivative_urls(attachment):
+    """Thumbnail/preview endpoint URLs for an attachment (None if not renderable)."""
+    return {
+        f'{size}_url': reverse('portfolios:attachment_derivative', kwargs={
+            'portfolio_id': attachment.portfolio_id,
+            'attachment_id': attachment.id,
+            'size': size,
+        }) if attachment.has_preview else None
+        for size in get_sizes()
+    }
+
+
+def comment_threads(comments):
+    """
+    Nest comments under their parents in memory.
+    
+    Args:
+        comments: Every comment of a portfolio in created_at order,
+            with ``author`` selected
+    
+    Returns:
+        Top-level comment dicts, each with its ``replies`` nested
+    """
+    nodes = {}
+    for c in comments:
+        nodes[c.id] = {
+            'id': c.id,
+            'author': {
+                'id': c.author.id,
+                'username': c.author.username,
+                'full_name': c.author.get_full_name(),
+            },
+            'content': c.content,
+            'created_at': c.created_at,
+            'replies': [],
+        }
+    
+    roots = []
+    for c in comments:
+        if c.parent_id is None:
+            roots.append(nodes[c.id])
+        elif c.parent_id in nodes:
+            nodes[c.parent_id]['replies'].append(nodes[c.id])
+    return roots
 
 
 class PortfolioListView(View):
@@ -28,6 +104,7 @@ class PortfolioListView(View):
     - Teacher: See only their own portfolios
     """
     
+    @method_decorator(condition_on_versions(portfolio_list_scopes))
     def get(self, request):
         if not request.user.is_authenticated:
             return JsonResponse({'error': 'Authentication required'}, status=401)
@@ -71,11 +148,17 @@ class PortfolioListView(View):
         # Pagination
         page = int(request.GET.get('page', 1))
         page_size = int(request.GET.get('page_size', 20))
-        paginator = Paginator(queryset, page_size)
+        paginator = Paginator(queryset.select_related('teacher', 'reviewed_by'), page_size)
         page_obj = paginator.get_page(page)
+        permissions = portfolio_permissions(user, page_obj.object_list, [
+            'portfolios.change_portfolio',
+            'portfolios.delete_portfolio',
+            'portfolios.approve_portfolio',
+        ])
         
         portfolios = []
         for p in page_obj:
+            perms = permissions[p.id]
             portfolios.append({
                 'id': p.id,
                 'title': p.title,
@@ -97,6 +180,11 @@ class PortfolioListView(View):
                 'reviewed_at': p.reviewed_at.isoformat() if p.reviewed_at else None,
                 'created_at': p.created_at.isoformat(),
                 'updated_at': p.updated_at.isoformat(),
+                'permissions': {
+                    'can_edit': perms['portfolios.change_portfolio'],
+                    'can_delete': perms['portfolios.delete_portfolio'],
+                    'can_approve': perms['portfolios.approve_portfolio'],
+                },
             })
         
         return JsonResponse({
@@ -181,40 +269,34 @@ class PortfolioDetailView(View):
     GET/PUT/DELETE /api/portfolios/<portfolio_id>/
     """
     
+    @method_decorator(condition_on_versions(portfolio_detail_scopes))
     def get(self, request, portfolio_id):
         if not request.user.is_authenticated:
             return JsonResponse({'error': 'Authentication required'}, status=401)
         
         try:
-            portfolio = Portfolio.objects.select_related('teacher', 'reviewed_by').get(id=portfolio_id)
+            portfolio = Portfolio.objects.for_detail().get(id=portfolio_id)
         except Portfolio.DoesNotExist:
             return JsonResponse({'error': 'Portfolio not found'}, status=404)
         
         # Check permission
-        if not rules.has_perm('portfolios.view_portfolio', request.user, portfolio):
+        if not check_perm(request.user, 'portfolios.view_portfolio', portfolio):
             return JsonResponse({'error': 'Permission denied'}, status=403)
         
         # Get attachments
         attachments = [{
             'id': a.id,
             'title': a.title,
-            'file': a.file.url if a.file else None,
+            'file': attachment_download_url(a),
             'file_type': a.file_type,
             'file_size': a.file_size,
+            'download_url': attachment_download_url(a),
+            **attachment_derivative_urls(a),
             'created_at': a.created_at.isoformat(),
         } for a in portfolio.attachments.all()]
         
-        # Get comments
-        comments = [{
-            'id': c.id,
-            'author': {
-                'id': c.author.id,
-                'username': c.author.username,
-                'full_name': c.author.get_full_name(),
-            },
-            'content': c.content,
-            'created_at': c.created_at.isoformat(),
-        } for c in portfolio.comments.filter(parent__isnull=True)]
+        # Get comments (threaded)
+        comments = comment_threads(portfolio.all_comments)
         
         # Get history
         history = [{
@@ -224,7 +306,7 @@ class PortfolioDetailView(View):
             'new_status': h.new_status,
             'comment': h.comment,
             'created_at': h.created_at.isoformat(),
-        } for h in portfolio.history.all()[:10]]
+        } for h in portfolio.recent_history]
         
         return JsonResponse({
             'id': portfolio.id,
@@ -256,9 +338,9 @@ class PortfolioDetailView(View):
             'created_at': portfolio.created_at.isoformat(),
             'updated_at': portfolio.updated_at.isoformat(),
             'permissions': {
-                'can_edit': rules.has_perm('portfolios.change_portfolio', request.user, portfolio),
-                'can_delete': rules.has_perm('portfolios.delete_portfolio', request.user, portfolio),
-                'can_approve': rules.has_perm('portfolios.approve_portfolio', request.user, portfolio),
+                'can_edit': check_perm(request.user, 'portfolios.change_portfolio', portfolio),
+                'can_delete': check_perm(request.user, 'portfolios.delete_portfolio', portfolio),
+                'can_approve': check_perm(request.user, 'portfolios.approve_portfolio', portfolio),
             }
         })
     
@@ -274,7 +356,7 @@ class PortfolioDetailView(View):
             return JsonResponse({'error': 'Portfolio not found'}, status=404)
         
         # Check permission
-        if not rules.has_perm('portfolios.change_portfolio', request.user, portfolio):
+        if not check_perm(request.user, 'portfolios.change_portfolio', portfolio):
             return JsonResponse({'error': 'Permission denied'}, status=403)
         
         try:
@@ -338,7 +420,7 @@ class PortfolioDetailView(View):
             return JsonResponse({'error': 'Portfolio not found'}, status=404)
         
         # Check permission
-        if not rules.has_perm('portfolios.delete_portfolio', request.user, portfolio):
+        if not check_perm(request.user, 'portfolios.delete_portfolio', portfolio):
             return JsonResponse({'error': 'Permission denied'}, status=403)
         
         title = portfolio.title
@@ -368,19 +450,32 @@ class PortfolioApproveView(View):
     @method_decorator(csrf_protect)
     @method_decorator(admin_required)
     def post(self, request, portfolio_id):
-        try:
-            portfolio = Portfolio.objects.get(id=portfolio_id)
-        except Portfolio.DoesNotExist:
-            return JsonResponse({'error': 'Portfolio not found'}, status=404)
-        
-        if portfolio.status == 'approved':
-            return JsonResponse({'error': 'Portfolio is already approved'}, status=400)
-        
         try:
             data = json.loads(request.body) if request.body else {}
         except json.JSONDecodeError:
             data = {}
         
+        with transaction.atomic():
+            # Lock the row: concurrent reviewers of the same portfolio are
+            # serialized and the loser sees the new status
+            try:
+                portfolio = Portfolio.objects.select_for_update().get(id=portfolio_id)
+            except Portfolio.DoesNotExist:
+                return JsonResponse({'error': 'Portfolio not found'}, status=404)
+            
+            if portfolio.status == 'approved':
+                return JsonResponse({'error': 'Portfolio is already approved'}, status=400)
+            
+            if portfolio.is_claimed_by_other(request.user):
+                return JsonResponse({
+                    'error': 'Portfolio is claimed by another reviewer',
+                    'claim_expires_at': portfolio.claim_expires_at,
+                }, status=409)
+            
+            response = self._approve(request, portfolio, data)
+        return response
+    
+    def _approve(self, request, portfolio, data):
         comment = data.get('comment', '')
         old_status = portfolio.status
         
@@ -426,19 +521,32 @@ class PortfolioRejectView(View):
     @method_decorator(csrf_protect)
     @method_decorator(admin_required)
     def post(self, request, portfolio_id):
-        try:
-            portfolio = Portfolio.objects.get(id=portfolio_id)
-        except Portfolio.DoesNotExist:
-            return JsonResponse({'error': 'Portfolio not found'}, status=404)
-        
-        if portfolio.status == 'rejected':
-            return JsonResponse({'error': 'Portfolio is already rejected'}, status=400)
-        
         try:
             data = json.loads(request.body) if request.body else {}
         except json.JSONDecodeError:
             data = {}
         
+        with transaction.atomic():
+            # Lock the row: concurrent reviewers of the same portfolio are
+            # serialized and the loser sees the new status
+            try:
+                portfolio = Portfolio.objects.select_for_update().get(id=portfolio_id)
+            except Portfolio.DoesNotExist:
+                return JsonResponse({'error': 'Portfolio not found'}, status=404)
+            
+            if portfolio.status == 'rejected':
+                return JsonResponse({'error': 'Portfolio is already rejected'}, status=400)
+            
+            if portfolio.is_claimed_by_other(request.user):
+                return JsonResponse({
+                    'error': 'Portfolio is claimed by another reviewer',
+                    'claim_expires_at': portfolio.claim_expires_at,
+                }, status=409)
+            
+            response = self._reject(request, portfolio, data)
+        return response
+    
+    def _reject(self, request, portfolio, data):
         comment = data.get('comment', '')
         if not comment:
             return JsonResponse({'error': 'Rejection comment is required'}, status=400)
@@ -478,6 +586,90 @@ class PortfolioRejectView(View):
         })
 
 
+def review_queue_item(portfolio, now):
+    return {
+        'id': portfolio.id,
+        'title': portfolio.title,
+        'category': portfolio.category,
+        'teacher': {
+            'id': portfolio.teacher.id,
+            'username': portfolio.teacher.username,
+            'full_name': portfolio.teacher.get_full_name(),
+        },
+        'created_at': portfolio.created_at,
+        'waiting_seconds': int((now - portfolio.created_at).total_seconds()),
+        'claim_expires_at': portfolio.claim_expires_at,
+    }
+
+
+class PortfolioReviewQueueView(View):
+    """
+    Review queue for admins.
+    GET  /api/portfolios/review-queue/  - my current claims
+    POST /api/portfolios/review-queue/  - claim the next ``limit`` pending portfolios
+    
+    Claims are leased; approve/reject within the lease or release them.
+    """
+    
+    @method_decorator(admin_required)
+    def get(self, request):
+        now = timezone.now()
+        claims = review_queue.claims_of(request.user, now)
+        return JsonResponse({
+            'claims': [review_queue_item(p, now) for p in claims],
+            'lease_seconds': settings.PORTFOLIO_REVIEW_LEASE_SECONDS,
+        })
+    
+    @method_decorator(csrf_protect)
+    @method_decorator(admin_required)
+    def post(self, request):
+        try:
+            data = json.loads(request.body) if request.body else {}
+            limit = int(data.get('limit', 10))
+        except (json.JSONDecodeError, TypeError, ValueError):
+            return JsonResponse({'error': 'limit must be an integer'}, status=400)
+        
+        claims = review_queue.claim(request.user, limit)
+        now = timezone.now()
+        return JsonResponse({
+            'claims': [review_queue_item(p, now) for p in claims],
+            'lease_seconds': settings.PORTFOLIO_REVIEW_LEASE_SECONDS,
+        })
+
+
+class PortfolioReviewQueueReleaseView(View):
+    """
+    Give claimed portfolios back to the queue.
+    POST /api/portfolios/review-queue/release/  {"ids": [...]} (all claims if omitted)
+    """
+    
+    @method_decorator(csrf_protect)
+    @method_decorator(admin_required)
+    def post(self, request):
+        try:
+            data = json.loads(request.body) if request.body else {}
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        
+        released = review_queue.release(request.user, data.get('ids'))
+        return JsonResponse({'released': released})
+
+
+class PortfolioReviewQueueMetricsView(View):
+    """
+    Queue depth, review throughput and wait times.
+    GET /api/portfolios/review-queue/metrics/?hours=24
+    """
+    
+    @method_decorator(admin_required)
+    def get(self, request):
+        try:
+            hours = max(1, min(int(request.GET.get('hours', 24)), 24 * 30))
+        except ValueError:
+            return JsonResponse({'error': 'hours must be an integer'}, status=400)
+        return JsonResponse(review_queue.metrics(hours))
+
+
 class PortfolioStatsView(View):
     """
     Get portfolio statistics.
@@ -548,7 +740,7 @@ class PortfolioCommentView(View):
             return JsonResponse({'error': 'Portfolio not found'}, status=404)
         
         # Check permission to view (commenting requires at least view permission)
-        if not rules.has_perm('portfolios.view_portfolio', request.user, portfolio):
+        if not check_perm(request.user, 'portfolios.view_portfolio', portfolio):
             return JsonResponse({'error': 'Permission denied'}, status=403)
         
         try:
@@ -611,7 +803,7 @@ class PortfolioAttachmentView(View):
             return JsonResponse({'error': 'Portfolio not found'}, status=404)
         
         # Check permission (only owner or superadmin can upload)
-        if not rules.has_perm('portfolios.edit_portfolio', request.user, portfolio):
+        if not check_perm(request.user, 'portfolios.change_portfolio', portfolio):
             return JsonResponse({'error': 'Permission denied'}, status=403)
         
         files = request.FILES.getlist('files')
@@ -624,19 +816,29 @@ class PortfolioAttachmentView(View):
             if f.size > 10 * 1024 * 1024:
                 continue
             
-            attachment = PortfolioAttachment.objects.create(
-                portfolio=portfolio,
-                title=f.name,
-                file=f,
-                file_type=f.content_type,
-                file_size=f.size
-            )
+            # Identical content is stored once and shared between attachments;
+            # the blob reference commits together with the attachment row
+            with transaction.atomic():
+                blob = AttachmentBlob.acquire(f)
+                attachment = PortfolioAttachment.objects.create(
+                    portfolio=portfolio,
+                    title=f.name,
+                    blob=blob,
+                    file=blob.file.name,
+                    file_type=f.content_type,
+                    file_size=blob.size
+                )
+            if attachment.has_preview:
+                transaction.on_commit(lambda pk=attachment.id: generate_attachment_derivatives.delay(pk))
+            
             uploaded.append({
                 'id': attachment.id,
                 'title': attachment.title,
-                'file': attachment.file.url,
+                'file': attachment_download_url(attachment),
                 'file_type': attachment.file_type,
                 'file_size': attachment.file_size,
+                'download_url': attachment_download_url(attachment),
+                **attachment_derivative_urls(attachment),
             })
         
         return JsonResponse({
@@ -655,7 +857,7 @@ class PortfolioAttachmentView(View):
             return JsonResponse({'error': 'Portfolio not found'}, status=404)
         
         # Check permission
-        if not rules.has_perm('portfolios.edit_portfolio', request.user, portfolio):
+        if not check_perm(request.user, 'portfolios.change_portfolio', portfolio):
             return JsonResponse({'error': 'Permission denied'}, status=403)
         
         if not attachment_id:
@@ -663,8 +865,82 @@ class PortfolioAttachmentView(View):
         
         try:
             attachment = PortfolioAttachment.objects.get(id=attachment_id, portfolio=portfolio)
-            attachment.file.delete()  # Delete actual file
+            # The post_delete signal releases the shared blob; the stored
+            # file is only removed when no other attachment references it.
+            if not attachment.blob_id:
+                attachment.file.delete(save=False)  # Legacy, non-deduplicated file
             attachment.delete()
             return JsonResponse({'message': 'Attachment deleted successfully'})
         except PortfolioAttachment.DoesNotExist:
             return JsonResponse({'error': 'Attachment not found'}, status=404)
+
+
+class PortfolioAttachmentDerivativeView(View):
+    """
+    Send a thumbnail/preview of an attachment.
+    GET /api/portfolios/<id>/attachments/<attachment_id>/derivatives/<size>/
+    
+    Served like the attachment itself, through protected_file_response()
+    after the permission check. It is rendered here only on a cache miss
+    (normally Celery has already produced it).
+    """
+    
+    def get(self, request, portfolio_id, attachment_id, size):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+        
+        if size not in get_sizes():
+            return JsonResponse({'error': f"Invalid size. Valid: {', '.join(get_sizes())}"}, status=400)
+        
+        try:
+            attachment = PortfolioAttachment.objects.select_related('portfolio', 'blob').get(
+                id=attachment_id, portfolio_id=portfolio_id
+            )
+        except PortfolioAttachment.DoesNotExist:
+            return JsonResponse({'error': 'Attachment not found'}, status=404)
+        
+        if not check_perm(request.user, 'portfolios.view_portfolio', attachment.portfolio):
+            return JsonResponse({'error': 'Permission denied'}, status=403)
+        
+        name = ensure_derivative(attachment.file, size, attachment.derivative_key)
+        if name is None:
+            return JsonResponse({'error': 'Preview not available for this file type'}, status=404)
+        
+        response = protected_file_response(
+            request, derivative_file(attachment.file, name), filename=f'{size}.jpg', as_attachment=False
+        )
+        if attachment.blob_id:
+            # Keyed by content digest: the bytes behind this URL never change
+            patch_cache_control(response, private=True, max_age=86400)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class PortfolioAttachmentDownloadView(View):
+    """
+    Download an attachment after a permission check.
+    GET /api/portfolios/<id>/attachments/<attachment_id>/download/
+    """
+    
+    def get(self, request, portfolio_id, attachment_id):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+        
+        try:
+            attachment = PortfolioAttachment.objects.select_related('portfolio').get(
+                id=attachment_id, portfolio_id=portfolio_id
+            )
+        except PortfolioAttachment.DoesNotExist:
+            return JsonResponse({'error': 'Attachment not found'}, status=404)
+        
+        if not check_perm(request.user, 'portfolios.view_portfolio', attachment.portfolio):
+            return JsonResponse({'error': 'Permission denied'}, status=403)
+        
+        if not attachment.file:
+            return JsonResponse({'error': 'File not found'}, status=404)
+        
+        # Stored names are content hashes; offer the title with the original extension
+        ext = os.path.splitext(attachment.file.name)[1]
+        filename = attachment.title if attachment.title.endswith(ext) else f"{attachment.title}{ext}"
+        return protected_file_response(request, attachment.file, filename=filename)
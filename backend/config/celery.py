@@ -5,6 +5,7 @@ Celery configuration for proft project.
 import os
 from celery import Celery
 from celery.schedules import crontab
+from kombu import Queue
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
@@ -29,6 +30,16 @@ app.conf.beat_schedule = {
         'task': 'apps.assignments.tasks.update_overdue_assignments',
         'schedule': crontab(minute='*/30'),  # Every 30 minutes
     },
+    # Refresh Hemis access tokens before they expire
+    'refresh-expiring-hemis-tokens': {
+        'task': 'apps.hemis_auth.tasks.refresh_expiring_hemis_tokens',
+        'schedule': crontab(minute='*/5'),
+    },
+    # Incremental Hemis employee directory sync
+    'sync-hemis-directory-hourly': {
+        'task': 'apps.hemis_auth.tasks.sync_hemis_directory',
+        'schedule': crontab(minute=15),
+    },
     # Refresh dashboard cache every 5 minutes
     'refresh-dashboard-cache': {
         'task': 'apps.analytics.tasks.refresh_dashboard_cache',
@@ -58,7 +69,89 @@ app.conf.beat_schedule = {
 
 app.conf.timezone = 'Asia/Tashkent'
 
+# ==================== QUEUES & ROUTING ====================
+# Each queue is served by its own worker (``python -m config.worker <queue>``)
+# so an hour-long yearly report cannot hold up deadline reminders.
+# concurrency / prefetch_multiplier / max_tasks_per_child configure that
+# worker; time_limit / soft_time_limit apply to the tasks routed to the
+# queue. Unrouted tasks go to the default 'celery' queue and keep
+# CELERY_TASK_TIME_LIMIT.
+DEFAULT_QUEUE = 'celery'
+
+QUEUES = {
+    'notifications': {
+        'concurrency': 4, 'prefetch_multiplier': 4, 'max_tasks_per_child': None,
+        'time_limit': 60, 'soft_time_limit': 45,
+    },
+    'reports': {
+        'concurrency': 2, 'prefetch_multiplier': 1, 'max_tasks_per_child': 20,
+        'time_limit': 60 * 60, 'soft_time_limit': 55 * 60,
+    },
+    'maintenance': {
+        'concurrency': 1, 'prefetch_multiplier': 1, 'max_tasks_per_child': None,
+        'time_limit': 15 * 60, 'soft_time_limit': 14 * 60,
+    },
+    DEFAULT_QUEUE: {
+        'concurrency': 2, 'prefetch_multiplier': 1, 'max_tasks_per_child': None,
+        'time_limit': None, 'soft_time_limit': None,
+    },
+}
+
+TASK_QUEUES = {
+    'notifications': [
+        'apps.assignments.tasks.send_assignment_notification',
+        'apps.assignments.tasks.send_submission_notification',
+        'apps.assignments.tasks.check_deadline_reminders',
+        'apps.portfolios.tasks.send_notification_email',
+        'apps.portfolios.tasks.notify_portfolio_status_change',
+    ],
+    'reports': [
+        'apps.analytics.tasks.generate_report',
+        'apps.analytics.tasks.generate_monthly_report',
+        'apps.analytics.tasks.generate_yearly_report',
+        'apps.assignments.tasks.generate_assignment_report',
+        'apps.portfolios.tasks.generate_portfolio_report',
+    ],
+    'maintenance': [
+        'apps.analytics.tasks.refresh_dashboard_cache',
+        'apps.analytics.tasks.cleanup_expired_cache',
+        'apps.analytics.tasks.cleanup_old_reports',
+        'apps.assignments.tasks.update_overdue_assignments',
+        'apps.portfolios.tasks.cleanup_old_activities',
+    ],
+}
+
+app.conf.task_queues = [Queue(name) for name in QUEUES]
+app.conf.task_default_queue = DEFAULT_QUEUE
+app.conf.task_routes = {
+    task: {'queue': queue} for queue, tasks in TASK_QUEUES.items() for task in tasks
+}
+app.conf.task_annotations = {
+    task: {
+        'time_limit': QUEUES[queue]['time_limit'],
+        'soft_time_limit': QUEUES[queue]['soft_time_limit'],
+    }
+    for queue, tasks in TASK_QUEUES.items() for task in tasks
+}
+
+# Priorities within a queue. The Redis transport keeps one list per
+# priority step and serves 0 first; a message sent without a priority
+# gets task_default_priority.
+PRIORITY_INTERACTIVE = 0  # a user is waiting, e.g. a requested export
+PRIORITY_DEFAULT = 5
+PRIORITY_SCHEDULED = 9  # beat-generated batch work
+
+app.conf.task_default_priority = PRIORITY_DEFAULT
+app.conf.broker_transport_options = {
+    'priority_steps': list(range(10)),
+    'queue_order_strategy': 'priority',
+}
+
 
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
+
+
+# Task runtime, queue lag, retry and failure metrics (see config/task_metrics.py)
+from . import task_metrics  # noqa: E402,F401
@@ -0,0 +1,145 @@
+"""
+Protected file downloads.
+
+Views do their permission checks and then hand the file to
+``protected_file_response()``. Depending on ``settings.DOWNLOAD_BACKEND``
+the bytes are sent by:
+
+- ``nginx``: an ``X-Accel-Redirect`` to an ``internal`` location, nginx
+  streams the file and handles Range / If-Modified-Since itself
+- ``xsendfile``: an ``X-Sendfile`` header (Apache mod_xsendfile, lighttpd)
+- ``django``: Python streams the file (development default), with
+  single-range and conditional request support so behaviour matches
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+CHUNK_SIZE = 64 * 1024
+
+
+def protected_file_response(request, fieldfile, filename=None, as_attachment=True):
+    """
+    Build a response that delivers ``fieldfile`` to an already-authorized user.
+
+    Args:
+        request: The current request (used for Range / conditional headers)
+        fieldfile: A FieldFile from a FileField
+        filename: Download name shown to the user (defaults to the basename)
+        as_attachment: Send ``Content-Disposition: attachment`` instead of inline
+    """
+    backend = getattr(settings, 'DOWNLOAD_BACKEND', 'django')
+    filename = filename or os.path.basename(fieldfile.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if backend == 'nginx':
+        prefix = getattr(settings, 'DOWNLOAD_ACCEL_PREFIX', '/protected/')
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(fieldfile.name)
+    elif backend == 'xsendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = fieldfile.path
+    else:
+        return _django_file_response(request, fieldfile, filename, content_type, as_attachment)
+
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _django_file_response(request, fieldfile, filename, content_type, as_attachment):
+    storage = fieldfile.storage
+    size = storage.size(fieldfile.name)
+    last_modified = storage.get_modified_time(fieldfile.name).timestamp()
+    etag = f'"{int(last_modified):x}-{size:x}"'
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if not_modified is not None:
+        return not_modified
+
+    byte_range = _parse_range(request, size, etag, last_modified)
+    if byte_range == 'invalid':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(
+            fieldfile.open('rb'),
+            as_attachment=as_attachment,
+            filename=filename,
+            content_type=content_type,
+        )
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read_range(fieldfile.open('rb'), start, end),
+            status=206,
+            content_type=content_type,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _parse_range(request, size, etag, last_modified):
+    """
+    Return (start, end) for a satisfiable single range, None to send the
+    whole file, or 'invalid' for an unsatisfiable range.
+    """
+    header = request.META.get('HTTP_RANGE')
+    if not header or size == 0:
+        return None
+
+    # If-Range: only honour the range if the file is unchanged
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != etag and if_range != http_date(last_modified):
+        return None
+
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        # Multi-range and malformed headers fall back to the full body
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+
+    if start >= size or start > end:
+        return 'invalid'
+    return start, end
+
+
+def _read_range(fh, start, end):
+    try:
+        fh.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = fh.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        fh.close()
@@ -0,0 +1,140 @@
+"""
+Fast JSON encoding for views and the REST API.
+
+``settings.JSON_BACKEND`` selects the encoder:
+
+- ``orjson``: Rust encoder, serializes datetime/date/time/UUID natively
+  (default when orjson is installed)
+- ``stdlib``: the standard ``json`` module
+
+Both backends produce the same output: datetimes as ``isoformat()``,
+timedeltas as seconds, Decimals and lazy translation strings as
+strings. Views can therefore put model values straight into the
+payload instead of converting them one by one.
+
+Usage::
+
+    from config.fastjson import JsonResponse
+
+    return JsonResponse({'created_at': obj.created_at})
+"""
+
+import datetime
+import decimal
+import json
+import uuid
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.functional import Promise
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _default(obj):
+    """Types neither encoder handles natively (and the stdlib's datetimes)."""
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, datetime.timedelta):
+        # Same as DRF's encoder
+        return str(obj.total_seconds())
+    if isinstance(obj, (decimal.Decimal, uuid.UUID, Promise)):
+        return str(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def use_orjson():
+    return orjson is not None and getattr(settings, 'JSON_BACKEND', 'orjson') == 'orjson'
+
+
+def dumps(data):
+    """Serialize ``data`` to UTF-8 JSON bytes with the configured backend."""
+    if use_orjson():
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_default, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def loads(data):
+    if use_orjson():
+        return orjson.loads(data)
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode()
+    return json.loads(data)
+
+
+class JsonResponse(HttpResponse):
+    """
+    Drop-in replacement for ``django.http.JsonResponse`` using ``dumps()``.
+
+    Passing ``encoder`` or ``json_dumps_params`` falls back to the stdlib
+    path so existing calls keep their exact behaviour.
+    """
+
+    def __init__(self, data, encoder=None, safe=True, json_dumps_params=None, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                'In order to allow non-dict objects to be serialized set the '
+                'safe parameter to False.'
+            )
+        kwargs.setdefault('content_type', 'application/json')
+        if encoder is not None or json_dumps_params:
+            content = json.dumps(data, cls=encoder, default=None if encoder else _default,
+                                 **(json_dumps_params or {}))
+        else:
+            content = dumps(data)
+        super().__init__(content=content, **kwargs)
+
+
+class StreamingJsonResponse(StreamingHttpResponse):
+    """
+    A JSON object whose ``key`` is filled from already-serialized chunks.
+    
+    Used for large stored payloads: the chunks are passed through as they
+    are read, without being parsed or held in memory as a whole.
+    """
+
+    def __init__(self, data, key, chunks, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(self._stream(data, key, chunks), **kwargs)
+
+    @staticmethod
+    def _stream(data, key, chunks):
+        head = dumps(data)[:-1]
+        yield head + (b',' if data else b'') + dumps(key) + b':'
+        yield from chunks
+        yield b'}'
+
+
+class FastJSONRenderer(JSONRenderer):
+    """DRF renderer using ``dumps()``; browsable-API indentation uses the stdlib."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not self.get_indent(accepted_media_type, renderer_context or {}):
+            try:
+                return dumps(data)
+            except TypeError:
+                # Types only DRF's encoder knows (querysets, generators, ...)
+                pass
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class FastJSONParser(JSONParser):
+    """DRF parser using ``loads()``."""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
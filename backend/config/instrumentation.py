@@ -0,0 +1,137 @@
+"""
+Per-route latency and database instrumentation.
+
+``InstrumentationMiddleware`` times each request and, through
+``connection.execute_wrapper()``, each query it runs (no DEBUG query log
+needed). Per route pattern, method and status class it records in
+``config.metrics``:
+
+- ``http_request_duration_seconds``: latency histogram
+- ``http_request_db_queries_total`` / ``http_request_db_seconds_total``
+- ``http_slow_requests_total``
+
+Methods outside ``HTTP_METHODS`` are labelled ``OTHER``, so arbitrary
+request methods cannot grow the label set.
+
+With ``settings.INSTRUMENTATION_SERVER_TIMING`` the response gets a
+``Server-Timing`` header (``db``, ``app``, ``total``) so browser dev tools
+show where the time went. It is off by default: the timings would tell
+any client how much database work an endpoint does. Requests slower than
+``settings.INSTRUMENTATION_SLOW_REQUEST_MS`` are sampled, at
+``INSTRUMENTATION_SLOW_SAMPLE_RATE``, to the ``config.instrumentation``
+logger with their most expensive statements, identical SQL grouped so
+N+1 patterns stand out.
+
+Place it first in MIDDLEWARE so the timing covers the whole stack.
+"""
+
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+TOP_QUERIES = 5
+
+HTTP_METHODS = frozenset(['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE', 'CONNECT'])
+
+metrics.describe('http_request_duration_seconds', 'histogram', 'Request latency by route')
+metrics.describe('http_request_db_queries_total', 'counter', 'Database queries run by requests')
+metrics.describe('http_request_db_seconds_total', 'counter', 'Time requests spent in the database')
+metrics.describe('http_slow_requests_total', 'counter', 'Requests above the slow request threshold')
+
+
+class QueryTimer:
+    """``execute_wrapper`` that counts and times queries, grouped by SQL."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.by_sql = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            entry = self.by_sql.get(sql)
+            if entry is None:
+                self.by_sql[sql] = [1, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+
+    def top(self, limit=TOP_QUERIES):
+        ranked = sorted(self.by_sql.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [
+            {'sql': sql, 'count': count, 'ms': round(seconds * 1000, 2)}
+            for sql, (count, seconds) in ranked
+        ]
+
+
+class InstrumentationMiddleware:
+    """Records per-route metrics and adds Server-Timing (see module docstring)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_seconds = getattr(settings, 'INSTRUMENTATION_SLOW_REQUEST_MS', 1000) / 1000
+        self.sample_rate = getattr(settings, 'INSTRUMENTATION_SLOW_SAMPLE_RATE', 1.0)
+        self.server_timing = getattr(settings, 'INSTRUMENTATION_SERVER_TIMING', False)
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else '<unmatched>'
+        method = request.method if request.method in HTTP_METHODS else 'OTHER'
+        labels = (('route', route), ('method', method), ('status', f'{response.status_code // 100}xx'))
+        metrics.observe('http_request_duration_seconds', labels, total)
+        if timer.count:
+            metrics.inc('http_request_db_queries_total', labels, timer.count)
+            metrics.inc('http_request_db_seconds_total', labels, timer.seconds)
+
+        if total >= self.slow_seconds:
+            metrics.inc('http_slow_requests_total', labels)
+            if random.random() < self.sample_rate:
+                self._log_slow(request, response, route, total, timer)
+
+        if self.server_timing:
+            timing = (
+                f'db;dur={timer.seconds * 1000:.1f};desc="{timer.count} queries", '
+                f'app;dur={(total - timer.seconds) * 1000:.1f}, total;dur={total * 1000:.1f}'
+            )
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+
+        metrics.maybe_publish()
+        return response
+
+    def _log_slow(self, request, response, route, total, timer):
+        user = getattr(request, 'user', None)
+        logger.warning('slow request %s', json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'route': route,
+            'status': response.status_code,
+            'user_id': user.pk if user is not None and user.is_authenticated else None,
+            'ms': round(total * 1000, 1),
+            'db_ms': round(timer.seconds * 1000, 1),
+            'queries': timer.count,
+            'top_queries': timer.top(),
+        }, ensure_ascii=False))
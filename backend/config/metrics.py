@@ -0,0 +1,269 @@
+"""
+In-process metrics exposed in the Prometheus text format.
+
+Each process (gunicorn worker, Celery worker) records counters and
+histograms in memory, which costs a dict update and no I/O. At most every
+``settings.METRICS_FLUSH_SECONDS`` the process publishes a snapshot of
+them to the cache; ``GET /metrics`` returns the snapshots of all
+processes seen within ``SNAPSHOT_TTL``, so a scrape sees the whole
+deployment no matter which worker answers it. Every process is its own
+series, labelled ``process="<host>:<pid>"``: counters of a process that
+goes away end with its series instead of dropping out of a sum, which
+Prometheus would read as a counter reset. Aggregate with
+``sum without (process) (rate(...))``. Celery workers publish after every
+task and keep their snapshots longer (see ``config/task_metrics.py``).
+
+Usage::
+
+    from config import metrics
+
+    metrics.describe('reports_built_total', 'counter', 'Reports built')
+    metrics.inc('reports_built_total', (('kind', 'excel'),))
+    metrics.observe('report_build_seconds', (('kind', 'excel'),), elapsed)
+    metrics.maybe_publish()
+
+Labels are tuples of (name, value) pairs; keep their values to a small
+fixed set (route patterns, not paths).
+"""
+
+import bisect
+import hmac
+import os
+import socket
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+# Seconds; suits both request latency and short Celery tasks
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# A process that has not published for this long is left out of /metrics
+SNAPSHOT_TTL = 60 * 60
+
+INDEX_KEY = 'metrics:processes'
+PROCESS_KEY_PREFIX = 'metrics:process:'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_descriptions = {}
+
+
+def describe(name, kind, help_text):
+    """Declare a metric's type (``counter``/``histogram``) and HELP text."""
+    _descriptions[name] = (kind, help_text)
+
+
+class Registry:
+    """Thread-safe counters and histograms of one process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(float)
+        # (name, labels) -> [bucket bounds, per-bucket counts (+Inf last), sum]
+        self.histograms = {}
+
+    def inc(self, name, labels=(), value=1):
+        with self._lock:
+            self.counters[(name, labels)] += value
+
+    def observe(self, name, labels, value, buckets=DEFAULT_BUCKETS):
+        index = bisect.bisect_left(buckets, value)
+        with self._lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[(name, labels)] = [buckets, [0] * (len(buckets) + 1), 0.0]
+            histogram[1][index] += 1
+            histogram[2] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'histograms': {
+                    key: [buckets, list(counts), total]
+                    for key, (buckets, counts, total) in self.histograms.items()
+                },
+            }
+
+
+registry = Registry()
+inc = registry.inc
+observe = registry.observe
+
+_last_publish = 0.0
+
+
+def _process_key():
+    # Looked up on every publish: workers forked from a preloaded master
+    # share the import-time pid
+    return f'{PROCESS_KEY_PREFIX}{socket.gethostname()}:{os.getpid()}'
+
+
+def publish(ttl=SNAPSHOT_TTL):
+    """Store this process's snapshot in the cache for ``ttl`` seconds."""
+    global _last_publish
+    _last_publish = time.monotonic()
+    key = _process_key()
+    cache.set(key, registry.snapshot(), ttl)
+    keys = cache.get(INDEX_KEY) or []
+    if key not in keys:
+        # Read-modify-write: a key lost to a concurrent update is re-added
+        # on that process's next publish
+        cache.set(INDEX_KEY, keys + [key], None)
+
+
+def maybe_publish():
+    """``publish()`` unless this process published recently."""
+    if time.monotonic() - _last_publish >= getattr(settings, 'METRICS_FLUSH_SECONDS', 10):
+        publish()
+
+
+def collect_processes():
+    """Snapshot of every live process, this one included, by ``<host>:<pid>``."""
+    publish()
+    keys = cache.get(INDEX_KEY) or []
+    snapshots = cache.get_many(keys)
+    if len(snapshots) != len(keys):
+        cache.set(INDEX_KEY, [key for key in keys if key in snapshots], None)
+    if _process_key() not in snapshots:
+        # Cache unavailable (errors are ignored): report this process alone
+        snapshots[_process_key()] = registry.snapshot()
+    return {key[len(PROCESS_KEY_PREFIX):]: snapshot for key, snapshot in snapshots.items()}
+
+
+def collect():
+    """Sum of the snapshots of every live process, this one included."""
+    counters = defaultdict(float)
+    histograms = {}
+    for snapshot in collect_processes().values():
+        for key, value in snapshot['counters'].items():
+            counters[key] += value
+        for key, histogram in snapshot['histograms'].items():
+            merged = histograms.get(key)
+            histograms[key] = histogram if merged is None else merge_histograms(merged, histogram)
+    return counters, histograms
+
+
+def by_process(snapshots):
+    """Counters and histograms of ``collect_processes()``, each with a ``process`` label."""
+    counters = {}
+    histograms = {}
+    for process, snapshot in snapshots.items():
+        extra = (('process', process),)
+        for (name, labels), value in snapshot['counters'].items():
+            counters[(name, labels + extra)] = value
+        for (name, labels), histogram in snapshot['histograms'].items():
+            histograms[(name, labels + extra)] = histogram
+    return counters, histograms
+
+
+def merge_histograms(first, second):
+    """Sum of two histograms; the later one wins if their buckets differ."""
+    if first[0] != second[0]:
+        return second
+    return [first[0], [a + b for a, b in zip(first[1], second[1])], first[2] + second[2]]
+
+
+def histogram_quantile(histogram, quantile):
+    """
+    Estimate a quantile by linear interpolation inside its bucket, like
+    Prometheus' ``histogram_quantile()``. Values past the last bound
+    report that bound.
+    """
+    buckets, counts, _ = histogram
+    total = sum(counts)
+    if not total:
+        return None
+    rank = quantile * total
+    cumulative = 0
+    for index, bound in enumerate(buckets):
+        if counts[index] and cumulative + counts[index] >= rank:
+            lower = buckets[index - 1] if index else 0.0
+            return lower + (bound - lower) * (rank - cumulative) / counts[index]
+        cumulative += counts[index]
+    return buckets[-1]
+
+
+def histogram_stats(histogram):
+    """Count, mean and estimated p50/p95/p99 of a histogram, in its unit."""
+    count = sum(histogram[1])
+    if not count:
+        return {'count': 0, 'avg': None, 'p50': None, 'p95': None, 'p99': None}
+    return {
+        'count': count,
+        'avg': round(histogram[2] / count, 3),
+        **{f'p{int(q * 100)}': round(histogram_quantile(histogram, q), 3) for q in (0.5, 0.95, 0.99)},
+    }
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, extra=()):
+    pairs = tuple(labels) + tuple(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == int(value):
+        return str(int(value))
+    return repr(round(value, 6))
+
+
+def render(counters, histograms):
+    """Prometheus text exposition of collected metrics."""
+    by_name = defaultdict(list)
+    for (name, labels), value in counters.items():
+        by_name[name].append((labels, value))
+    for (name, labels), histogram in histograms.items():
+        by_name[name].append((labels, histogram))
+
+    lines = []
+    for name in sorted(by_name):
+        is_histogram = isinstance(by_name[name][0][1], list)
+        kind, help_text = _descriptions.get(name, ('histogram' if is_histogram else 'counter', ''))
+        if help_text:
+            lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(by_name[name], key=lambda item: item[0]):
+            if not is_histogram:
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                continue
+            buckets, counts, total = value
+            cumulative = 0
+            for bound, count in zip(buckets, counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels, [("le", bound)])} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{name}_bucket{_labels(labels, [("le", "+Inf")])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(total)}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def _allowed(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if hmac.compare_digest(header.encode(), f'Bearer {token}'.encode()):
+            return True
+    return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ())
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint.
+
+    Open to ``settings.METRICS_ALLOWED_IPS`` and to requests carrying
+    ``Authorization: Bearer <settings.METRICS_TOKEN>``.
+    """
+    if not _allowed(request):
+        return HttpResponse('Forbidden\n', status=403, content_type='text/plain')
+    return HttpResponse(render(*by_process(collect_processes())), content_type=CONTENT_TYPE)
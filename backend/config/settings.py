@@ -59,9 +59,11 @@ LOCAL_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    'config.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'apps.accounts.middleware.SessionRefreshMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -137,7 +139,10 @@ SESSION_COOKIE_AGE = 60 * 60 * 24 * 7  # 1 week
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SECURE = not DEBUG
 SESSION_COOKIE_SAMESITE = 'Lax'
-SESSION_SAVE_EVERY_REQUEST = True
+# Sessions are only written when modified; SessionRefreshMiddleware slides
+# the expiry forward at most once per SESSION_REFRESH_INTERVAL seconds
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_INTERVAL = config('SESSION_REFRESH_INTERVAL', default=15 * 60, cast=int)
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -163,6 +168,49 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Upload handlers hash files while streaming so attachments can be deduplicated
+FILE_UPLOAD_HANDLERS = [
+    'apps.portfolios.uploadhandlers.HashingMemoryFileUploadHandler',
+    'apps.portfolios.uploadhandlers.HashingTemporaryFileUploadHandler',
+]
+
+# Protected downloads: 'django' streams in Python, 'nginx' emits X-Accel-Redirect,
+# 'xsendfile' emits X-Sendfile (see config/downloads.py)
+DOWNLOAD_BACKEND = config('DOWNLOAD_BACKEND', default='django')
+DOWNLOAD_ACCEL_PREFIX = config('DOWNLOAD_ACCEL_PREFIX', default='/protected/')
+
+# Codec for stored report payloads: 'zstd' or 'zlib' (see apps/analytics/payloads.py)
+REPORT_PAYLOAD_CODEC = config('REPORT_PAYLOAD_CODEC', default='zstd')
+
+# Seconds a claimed portfolio stays reserved for its reviewer (see apps/portfolios/review_queue.py)
+PORTFOLIO_REVIEW_LEASE_SECONDS = config('PORTFOLIO_REVIEW_LEASE_SECONDS', default=15 * 60, cast=int)
+
+# Request instrumentation (see config/instrumentation.py): requests slower than
+# INSTRUMENTATION_SLOW_REQUEST_MS are logged to logs/slow_requests.log with their
+# top queries, a fraction INSTRUMENTATION_SLOW_SAMPLE_RATE of them
+INSTRUMENTATION_SLOW_REQUEST_MS = config('INSTRUMENTATION_SLOW_REQUEST_MS', default=1000, cast=int)
+INSTRUMENTATION_SLOW_SAMPLE_RATE = config('INSTRUMENTATION_SLOW_SAMPLE_RATE', default=1.0, cast=float)
+# Server-Timing shows every client the per-request DB time; enable in development
+INSTRUMENTATION_SERVER_TIMING = config('INSTRUMENTATION_SERVER_TIMING', default=False, cast=bool)
+
+# Prometheus /metrics (see config/metrics.py): scrapable from METRICS_ALLOWED_IPS
+# or with "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_FLUSH_SECONDS = config('METRICS_FLUSH_SECONDS', default=10, cast=int)
+# Celery pool processes publish after every task; their snapshots outlive
+# recycled processes by this long so the task report's counts do not drop
+METRICS_WORKER_SNAPSHOT_TTL = config('METRICS_WORKER_SNAPSHOT_TTL', default=7 * 24 * 60 * 60, cast=int)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1,::1', cast=Csv())
+
+# JSON encoder for JsonResponse and DRF: 'orjson' or 'stdlib' (see config/fastjson.py)
+JSON_BACKEND = config('JSON_BACKEND', default='orjson')
+
+# Thumbnail/preview derivative sizes (bounding box in pixels)
+DERIVATIVE_SIZES = {
+    'thumb': 160,
+    'preview': 800,
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -175,10 +223,16 @@ SITE_ID = 1
 # Authentication Backends
 AUTHENTICATION_BACKENDS = [
     'rules.permissions.ObjectPermissionBackend',
+    'apps.accounts.backends.CachedModelBackend',
+    # Sessions store the backend that logged the user in; keep the plain
+    # ModelBackend so sessions created before the cached one stay valid
     'django.contrib.auth.backends.ModelBackend',
     'apps.hemis_auth.backends.HemisOAuth2Backend',
 ]
 
+# Lifetime of the cached request.user snapshot (see apps/accounts/cache.py)
+USER_CACHE_TIMEOUT = 300
+
 # AllAuth Configuration
 ACCOUNT_EMAIL_REQUIRED = False
 ACCOUNT_USERNAME_REQUIRED = False
@@ -203,10 +257,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'config.fastjson.FastJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'config.fastjson.FastJSONParser',
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FormParser',
     ],
@@ -297,6 +351,18 @@ HEMIS_OAUTH2 = {
     'USERINFO_URL': config('HEMIS_USERINFO_URL', default='https://hemis.example.uz/oauth/userinfo'),
     'REDIRECT_URI': config('HEMIS_REDIRECT_URI', default='http://localhost:8000/auth/hemis/callback/'),
     'SCOPE': 'openid profile email',
+    # Pooled HTTP client (see apps/hemis_auth/backends.py)
+    'CONNECT_TIMEOUT': config('HEMIS_CONNECT_TIMEOUT', default=3.05, cast=float),
+    'READ_TIMEOUT': config('HEMIS_READ_TIMEOUT', default=10, cast=float),
+    'RETRIES': 2,
+    'POOL_SIZE': 20,
+    # Service API used by the directory sync
+    'EMPLOYEES_URL': config('HEMIS_EMPLOYEES_URL', default='https://hemis.example.uz/rest/v1/data/employee-list'),
+    'API_TOKEN': config('HEMIS_API_TOKEN', default=''),
+    # Tokens expiring within this many minutes are refreshed by Celery
+    'REFRESH_AHEAD_MINUTES': 10,
+    # Tokens that expired longer ago than this are left for the next login
+    'REFRESH_GRACE_MINUTES': 60,
 }
 
 # CORS Configuration (for Vue.js frontend)
@@ -339,14 +405,17 @@ if not DEBUG:
 
 # Celery Configuration
 CELERY_BROKER_URL = REDIS_URL
-CELERY_RESULT_BACKEND = 'django-db'
+# Results live in Redis and expire; fire-and-forget and periodic tasks set
+# ignore_result=True and store nothing
+CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default=REDIS_URL)
+CELERY_RESULT_EXPIRES = config('CELERY_RESULT_EXPIRES', default=24 * 60 * 60, cast=int)
 CELERY_CACHE_BACKEND = 'default'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
-CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
+CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes; routed queues set their own (config/celery.py)
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
 # Logging Configuration
@@ -385,6 +454,14 @@ LOGGING = {
             'backupCount': 5,
             'formatter': 'verbose',
         },
+        'slow_requests': {
+            'level': 'WARNING',
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': BASE_DIR / 'logs' / 'slow_requests.log',
+            'maxBytes': 1024 * 1024 * 5,  # 5 MB
+            'backupCount': 5,
+            'formatter': 'simple',
+        },
         'mail_admins': {
             'level': 'ERROR',
             'filters': ['require_debug_false'],
@@ -406,6 +483,11 @@ LOGGING = {
             'level': 'ERROR',
             'propagate': False,
         },
+        'config.instrumentation': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
         'apps': {
             'handlers': ['console', 'file'],
             'level': 'DEBUG' if DEBUG else 'INFO',
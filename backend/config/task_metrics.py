@@ -0,0 +1,200 @@
+"""
+Celery task metrics from Celery signals.
+
+Per task name, recorded in ``config.metrics`` by each worker process:
+
+- ``celery_task_runtime_seconds``: histogram by final state
+- ``celery_task_queue_lag_seconds``: enqueue-to-start histogram, from an
+  ``enqueued_at`` header stamped by the publisher
+- ``celery_task_retries_total``, ``celery_task_failures_total`` (by
+  exception class)
+- ``celery_task_overlaps_total``: starts while another run of the same
+  task was still going, e.g. a 5-minute beat job taking over 5 minutes
+
+Overlaps are only tracked for periodic tasks (those in the beat schedule)
+and tasks declared with ``track_overlaps=True``; parallel runs of other
+tasks, such as emails, are normal. Their runs in progress are counted in
+the cache across all workers, with the task's time limit as timeout so a
+killed worker cannot leave a task marked running forever.
+
+Workers publish their metrics after every task and once more when a pool
+process exits. Their snapshots are kept for
+``settings.METRICS_WORKER_SNAPSHOT_TTL``, so the counts of recycled
+processes stay in the totals instead of dropping out after an hour.
+
+``task_summary()`` turns all of it into the per-task report served by
+``/api/analytics/tasks/``.
+
+Connected from ``config/celery.py``, so publishers (web processes) and
+workers both load it.
+"""
+
+import logging
+import time
+
+from celery import signals
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Seconds; from quick email tasks to reports that run for minutes
+TASK_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+ENQUEUED_AT_HEADER = 'enqueued_at'
+
+metrics.describe('celery_task_runtime_seconds', 'histogram', 'Task run time by final state')
+metrics.describe('celery_task_queue_lag_seconds', 'histogram', 'Time from enqueue to start')
+metrics.describe('celery_task_retries_total', 'counter', 'Task retries')
+metrics.describe('celery_task_failures_total', 'counter', 'Task failures by exception')
+metrics.describe('celery_task_overlaps_total', 'counter', 'Task starts while a previous run was still going')
+
+# task_id -> (perf_counter at start, start datetime); per worker process
+_started = {}
+
+
+def _running_key(task_name):
+    return f'metrics:celery:running:{task_name}'
+
+
+def _last_run_key(task_name):
+    return f'metrics:celery:last_run:{task_name}'
+
+
+def _running_timeout(task):
+    return task.time_limit or getattr(settings, 'CELERY_TASK_TIME_LIMIT', None) or 30 * 60
+
+
+def tracks_overlaps(task):
+    """Whether overlapping runs of ``task`` are counted."""
+    if getattr(task, 'track_overlaps', False):
+        return True
+    return any(entry['task'] == task.name for entry in task.app.conf.beat_schedule.values())
+
+
+def _publish():
+    metrics.publish(ttl=getattr(settings, 'METRICS_WORKER_SNAPSHOT_TTL', 7 * 24 * 60 * 60))
+
+
+@signals.before_task_publish.connect
+def stamp_enqueued_at(sender=None, headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault(ENQUEUED_AT_HEADER, time.time())
+
+
+@signals.task_prerun.connect
+def task_started(task_id=None, task=None, **kwargs):
+    _started[task_id] = (time.perf_counter(), timezone.now())
+    labels = (('task', task.name),)
+
+    enqueued_at = getattr(task.request, ENQUEUED_AT_HEADER, None)
+    if enqueued_at is not None:
+        lag = max(0.0, time.time() - enqueued_at)
+        metrics.observe('celery_task_queue_lag_seconds', labels, lag, TASK_BUCKETS)
+
+    if not tracks_overlaps(task):
+        return
+    key = _running_key(task.name)
+    cache.add(key, 0, _running_timeout(task))
+    try:
+        running = cache.incr(key)
+    except ValueError:  # expired between add() and incr()
+        cache.set(key, 1, _running_timeout(task))
+        running = 1
+    if running and running > 1:
+        metrics.inc('celery_task_overlaps_total', labels)
+        logger.warning('%s started while %d earlier run(s) are still going', task.name, running - 1)
+
+
+@signals.task_postrun.connect
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    started = _started.pop(task_id, None)
+    if tracks_overlaps(task):
+        try:
+            cache.decr(_running_key(task.name))
+        except ValueError:
+            pass
+    if started is None:
+        return
+
+    runtime = time.perf_counter() - started[0]
+    metrics.observe('celery_task_runtime_seconds', (('task', task.name), ('state', state or 'UNKNOWN')),
+                    runtime, TASK_BUCKETS)
+    cache.set(_last_run_key(task.name), {
+        'started_at': started[1], 'runtime': round(runtime, 3), 'state': state,
+    }, None)
+    _publish()
+
+
+@signals.task_retry.connect
+def task_retried(sender=None, **kwargs):
+    metrics.inc('celery_task_retries_total', (('task', sender.name),))
+
+
+@signals.task_failure.connect
+def task_failed(sender=None, exception=None, **kwargs):
+    metrics.inc('celery_task_failures_total', (('task', sender.name), ('exception', type(exception).__name__)))
+    # Also sent by the pool's main process, e.g. when a time limit killed
+    # the child, and that process runs no task_postrun to publish it
+    _publish()
+
+
+@signals.worker_process_shutdown.connect
+def worker_process_exiting(**kwargs):
+    _publish()
+
+
+def task_summary():
+    """
+    Per-task runs, failure rate, retries, overlaps, runtime and lag
+    percentiles (estimated from the histograms), across all processes.
+    """
+    counters, histograms = metrics.collect()
+    tasks = {}
+
+    def entry(name):
+        return tasks.setdefault(name, {
+            'task': name, 'runs': 0, 'states': {}, 'failures': 0, 'retries': 0, 'overlaps': 0,
+            'runtime': None, 'queue_lag': None,
+        })
+
+    runtime_by_task = {}
+    for (name, labels), histogram in histograms.items():
+        labels = dict(labels)
+        if name == 'celery_task_runtime_seconds':
+            item = entry(labels['task'])
+            runs = sum(histogram[1])
+            item['runs'] += runs
+            item['states'][labels['state']] = runs
+            merged = runtime_by_task.get(labels['task'])
+            if merged is not None:
+                histogram = metrics.merge_histograms(merged, histogram)
+            runtime_by_task[labels['task']] = histogram
+        elif name == 'celery_task_queue_lag_seconds':
+            entry(labels['task'])['queue_lag'] = metrics.histogram_stats(histogram)
+    for task_name, histogram in runtime_by_task.items():
+        tasks[task_name]['runtime'] = metrics.histogram_stats(histogram)
+
+    fields = {
+        'celery_task_failures_total': 'failures',
+        'celery_task_retries_total': 'retries',
+        'celery_task_overlaps_total': 'overlaps',
+    }
+    for (name, labels), value in counters.items():
+        if name in fields:
+            entry(dict(labels)['task'])[fields[name]] += int(value)
+
+    names = sorted(tasks)
+    running = cache.get_many([_running_key(name) for name in names])
+    last_runs = cache.get_many([_last_run_key(name) for name in names])
+    for name in names:
+        item = tasks[name]
+        # Retried attempts are not outcomes
+        finished = item['runs'] - item['states'].get('RETRY', 0)
+        item['failure_rate'] = round(item['failures'] / finished, 4) if finished else None
+        item['running'] = max(0, running.get(_running_key(name), 0))
+        item['last_run'] = last_runs.get(_last_run_key(name))
+    return [tasks[name] for name in names]
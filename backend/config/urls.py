@@ -7,6 +7,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from config.metrics import metrics_view
+
 urlpatterns = [
     # Admin
     path('admin/', admin.site.urls),
@@ -23,6 +25,9 @@ urlpatterns = [
     
     # API Documentation (Swagger/OpenAPI)
     path('api/docs/', include('apps.swagger.urls', namespace='swagger')),
+
+    # Prometheus scrape endpoint
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 # Serve media files in development
@@ -0,0 +1,45 @@
+"""
+Start a Celery worker for one queue, using its profile from config/celery.py.
+
+Usage::
+
+    python -m config.worker notifications
+    python -m config.worker reports --loglevel=warning
+
+Extra arguments are passed on to ``celery worker``. The worker consumes
+only its own queue, with that queue's concurrency, prefetch multiplier
+and child recycling, and ``-O fair`` so a busy child is never handed
+prefetched work.
+"""
+
+import sys
+
+from config.celery import QUEUES, app
+
+
+def worker_argv(queue, extra=()):
+    """``celery worker`` arguments for ``queue``'s profile."""
+    profile = QUEUES[queue]
+    argv = [
+        'worker',
+        '--queues', queue,
+        '--hostname', f'{queue}@%h',
+        '--concurrency', str(profile['concurrency']),
+        '--prefetch-multiplier', str(profile['prefetch_multiplier']),
+        '-O', 'fair',
+        '--loglevel', 'info',
+    ]
+    if profile['max_tasks_per_child']:
+        argv += ['--max-tasks-per-child', str(profile['max_tasks_per_child'])]
+    return argv + list(extra)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in QUEUES:
+        sys.exit(f'usage: python -m config.worker {{{",".join(QUEUES)}}} [celery worker options]')
+    app.worker_main(worker_argv(argv[0], argv[1:]))
+
+
+if __name__ == '__main__':
+    main()